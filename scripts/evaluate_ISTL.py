@@ -7,17 +7,26 @@
 @usage: evaluate_ISTL.py -m <Pretrained h5 model file>
 					-d <Directory Path containing the test set to evaluate>
 					-l <File containing the test labels>
+					[--label_rule <any, majority or all>] Rule labelling the
+						test cuboids from the frame labels of each video
 					-a <Anomaly threshold values to evaluate>
 					-t <Temporal threshold values to evaluate>
 					-o <Output directory>
 					[-c <Directory Path containing the train set used for
 						fitting the reconstruction error scaling>]
+					[--calibration <JSON file in which the reconstruction
+						error scaling fitted to the train set is saved for
+						the online prediction>]
 					[-s] Perform spatial location over the test samples
 					[-n] Sets normalization between 0 and 1 when escaling the
 						reconstruction error over the test reconstruction error
 						(not -c option used).
 					[--train_cons_cuboids] Use consecutive cuboids extraction
 						for training set
+					[--feature_cache] Encode each test frame only once for
+						scoring the overlapping test cuboids
+					[--score_batch_size <Number of test cuboids scored at
+						once>]
 """
 # Modules imported
 import sys
@@ -59,10 +68,17 @@ parser.add_argument('-m', '--model', help='A pretrained model stored on a'\
 					' h5 file', type=str)
 parser.add_argument('-c', '--train_folder', help='Path to folder'\
 					' containing the train dataset', type=str, nargs='?')
+parser.add_argument('--calibration', help='JSON file in which the'\
+					' reconstruction error scaling fitted to the train set is'\
+					' saved', type=str, nargs='?')
 parser.add_argument('-d', '--data_folder', help='Path to folder'\
 					' containing the test dataset', type=str)
 parser.add_argument('-l', '--labels', help='Path to file containing the test'\
-					' labels', type=str)
+					' labels of each cuboid or of each frame of each video',
+					type=str)
+parser.add_argument('--label_rule', help='Rule labelling the test cuboids as'\
+					' anomalous from its frames labels', type=str,
+					choices=istl.labels.FrameLabelStore.RULES, default='any')
 parser.add_argument('-a', '--anom_threshold',
 					help='Anomaly threshold values to test', type=float,
 					nargs='+')
@@ -76,18 +92,27 @@ parser.add_argument('-n', '--norm_zero_one', help='Set the normalization between
 					' sample', action='store_true')
 parser.add_argument('--train_cons_cuboids', help='Set the usage of overlapping'\
 					' cuboids for the training set', action='store_true')
+parser.add_argument('--feature_cache', help='Encode each frame of the test'\
+					' videos only once for scoring the overlapping test'\
+					' cuboids', action='store_true')
+parser.add_argument('--score_batch_size', help='Number of test cuboids'\
+					' scored at once', type=int, default=None)
 
 args = parser.parse_args()
 
 model_fn = args.model
 train_video_dir = args.train_folder
+calibration_fn = args.calibration
 test_video_dir = args.data_folder
 labels_path = args.labels
+label_rule = args.label_rule
 anom_threshold = args.anom_threshold
 temp_threshold = args.temp_threshold
 output = args.output
 norm_zero_one = args.norm_zero_one
 train_cons_cuboids = args.train_cons_cuboids
+feature_cache = args.feature_cache
+score_batch_size = args.score_batch_size
 
 dot_pos = output.rfind('.')
 if dot_pos != -1:
@@ -133,7 +158,9 @@ except Exception as e:
 	exit(-1)
 
 try:
-	test_labels = np.loadtxt(labels_path, dtype='int8')
+	test_labels = istl.labels.load_cuboid_labels(labels_path, CUBOIDS_LENGTH,
+									data_test.cum_cuboids_per_video,
+									rule=label_rule)
 except Exception as e:
 	print('Cannot load {}: '.format(labels_path), str(e), file=sys.stderr)
 	exit(-1)
@@ -146,10 +173,15 @@ evaluator = istl.EvaluatorISTL(model=model,
 									# It's required to put any value
 									anom_thresh=0.1,
 									temp_thresh=1)
+evaluator.feature_cache = feature_cache
+evaluator.score_batch_size = score_batch_size
 
 if data_train is not None:
 	sc_train = evaluator.fit(data_train)
 
+	if calibration_fn:
+		evaluator.save_calibration(calibration_fn)
+
 try:
 	scale = data_test.cum_cuboids_per_video if data_train is None else None
 
@@ -7,12 +7,18 @@
 @usage: evaluate_ISTL_detailed.py -m <Pretrained model's h5 file>
 					-d <Directory Path containing the test set to evaluate>
 					-l <File containing the test labels>
+					[--label_rule <any, majority or all>] Rule labelling the
+						test cuboids from the frame labels of each video
 					-a <Anomaly threshold values to evaluate>
 					-t <Temporal threshold values to evaluate>
 					-o <Output directory>
 					[-c <Directory Path containing the train set used for
 						fitting the reconstruction error scaling>]
 					[-s] Perform spatial location over the test samples
+					[--feature_cache] Encode each test frame only once for
+						scoring the overlapping test cuboids
+					[--score_batch_size <Number of test cuboids scored at
+						once>]
 """
 # Modules imported
 import os
@@ -99,7 +105,11 @@ parser.add_argument('-c', '--train_folder', help='Path to folder'\
 parser.add_argument('-d', '--data_folder', help='Path to folder'\
 					' containing the test dataset', type=str)
 parser.add_argument('-l', '--labels', help='Path to file containing the test'\
-					' labels', type=str)
+					' labels of each cuboid or of each frame of each video',
+					type=str)
+parser.add_argument('--label_rule', help='Rule labelling the test cuboids as'\
+					' anomalous from its frames labels', type=str,
+					choices=istl.labels.FrameLabelStore.RULES, default='any')
 parser.add_argument('-a', '--anom_threshold',
 					help='Anomaly threshold values to evaluate', type=float,
 					nargs=1)
@@ -111,6 +121,11 @@ parser.add_argument('-o', '--output', help='Output file in which the results'\
 parser.add_argument('-s', '--spatial_location', help='Perform spatial location'\
 					' of cuboids',
 					action='store_true', default=False)
+parser.add_argument('--feature_cache', help='Encode each frame of the test'\
+					' videos only once for scoring the overlapping test'\
+					' cuboids', action='store_true')
+parser.add_argument('--score_batch_size', help='Number of test cuboids'\
+					' scored at once', type=int, default=None)
 
 
 args = parser.parse_args()
@@ -119,8 +134,11 @@ model_fn = args.model
 train_video_dir = args.train_folder
 test_video_dir = args.data_folder
 labels_path = args.labels
+label_rule = args.label_rule
 anom_threshold = args.anom_threshold[0]
 temp_threshold = args.temp_threshold[0]
+feature_cache = args.feature_cache
+score_batch_size = args.score_batch_size
 output = args.output
 spatial_location = args.spatial_location
 
@@ -177,7 +195,9 @@ except Exception as e:
 cum_cuboids_per_video = data_test.cum_cuboids_per_video
 
 try:
-	test_labels = np.loadtxt(labels_path, dtype='int8')
+	test_labels = istl.labels.load_cuboid_labels(labels_path, CUBOIDS_LENGTH,
+									data_test.cum_cuboids_per_video,
+									rule=label_rule)
 except Exception as e:
 	print('Cannot load {}: '.format(labels_path), str(e), file=sys.stderr)
 	exit(-1)
@@ -188,6 +208,8 @@ evaluator = istl.EvaluatorISTL(model=model,
 									cub_frames=CUBOIDS_LENGTH,
 									anom_thresh=anom_threshold,
 									temp_thresh=temp_threshold)
+evaluator.feature_cache = feature_cache
+evaluator.score_batch_size = score_batch_size
 
 if data_train is not None:
 	sc_train = evaluator.fit(data_train)
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+
+@author: Nicolás Cubero Torres
+@description: Export the reconstruction error model of an ISTL model to
+			TensorFlow Lite and compare the AUC and EER reached by the exported
+			model on the test sets with the ones of the float Keras model.
+
+@usage: export_tflite_ISTL.py -m <Pretrained h5 model file>
+					-o <Output TensorFlow Lite model file>
+					[-q <none, dynamic or int8>] Quantization of the
+						exported model
+					[-c <Directory Path containing the train set from which
+						the int8 quantization is calibrated>]
+					[--calib_cuboids <Number of train cuboids used for the
+						calibration>]
+					[-d <Directory Paths containing the test sets to
+						evaluate>]
+					[-l <Files containing the test labels of each test
+						set>]
+					[--label_rule <any, majority or all>] Rule labelling the
+						test cuboids from the frame labels of each video
+					[--num_threads <Number of threads of the TensorFlow Lite
+						interpreter>]
+					[--score_batch_size <Number of test cuboids scored at
+						once>]
+					[-r <JSON file in which the parity report is saved>]
+"""
+# Modules imported
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from cv2 import resize, cvtColor, COLOR_BGR2GRAY
+import tensorflow
+from tensorflow.keras.models import load_model
+from sklearn.metrics import roc_auc_score
+from models import istl
+from utils import root_sum_squared_error, equal_error_rate
+
+if tensorflow.__version__.startswith('1'):
+	from tensorflow import ConfigProto, Session
+
+	config = ConfigProto()
+	config.gpu_options.allow_growth = True
+	sess = Session(config=config)
+else:
+	from tensorflow import config
+
+	physical_devices = config.experimental.list_physical_devices('GPU')
+	if physical_devices:
+		config.experimental.set_memory_growth(physical_devices[0], True)
+
+# Constants
+CUBOIDS_LENGTH = 8
+CUBOIDS_WIDTH = 224
+CUBOIDS_HEIGHT = 224
+
+# Image resize function
+resize_fn = lambda img: np.expand_dims(resize(cvtColor(img, COLOR_BGR2GRAY),
+						(CUBOIDS_WIDTH, CUBOIDS_HEIGHT))/255, axis=2)
+
+### Input Arguments
+parser = argparse.ArgumentParser(description='Export an Incremental Spatio'\
+							' Temporal Learner model to TensorFlow Lite and'\
+							' compare its performance with the float model')
+parser.add_argument('-m', '--model', help='A pretrained model stored on a'\
+					' h5 file', type=str)
+parser.add_argument('-o', '--output', help='Output file in which the'\
+					' TensorFlow Lite model will be saved', type=str)
+parser.add_argument('-q', '--quantization', help='Quantization of the'\
+					' exported model', type=str,
+					choices=('none', 'dynamic', 'int8'), default='none')
+parser.add_argument('-c', '--train_folder', help='Path to folder'\
+					' containing the train dataset used for calibrating the'\
+					' int8 quantization', type=str, nargs='?')
+parser.add_argument('--calib_cuboids', help='Number of train cuboids used'\
+					' for calibrating the int8 quantization', type=int,
+					default=100)
+parser.add_argument('-d', '--data_folder', help='Paths to folders'\
+					' containing the test datasets', type=str, nargs='*',
+					default=[])
+parser.add_argument('-l', '--labels', help='Paths to files containing the'\
+					' test labels of each cuboid or of each frame of each'\
+					' video of each test dataset', type=str, nargs='*',
+					default=[])
+parser.add_argument('--label_rule', help='Rule labelling the test cuboids as'\
+					' anomalous from its frames labels', type=str,
+					choices=istl.labels.FrameLabelStore.RULES, default='any')
+parser.add_argument('--num_threads', help='Number of threads of the'\
+					' TensorFlow Lite interpreter', type=int, default=None)
+parser.add_argument('--score_batch_size', help='Number of test cuboids'\
+					' scored at once', type=int, default=None)
+parser.add_argument('-r', '--report', help='Output file in which the parity'\
+					' report will be saved', type=str, nargs='?')
+
+args = parser.parse_args()
+
+model_fn = args.model
+output = args.output
+quantization = None if args.quantization == 'none' else args.quantization
+train_video_dir = args.train_folder
+calib_cuboids = args.calib_cuboids
+test_video_dirs = args.data_folder
+labels_paths = args.labels
+label_rule = args.label_rule
+num_threads = args.num_threads
+score_batch_size = args.score_batch_size
+report_fn = args.report
+
+if len(test_video_dirs) != len(labels_paths):
+	print('A labels file is required for each test dataset', file=sys.stderr)
+	exit(-1)
+
+if quantization == 'int8' and not train_video_dir:
+	print('The train dataset is required for the int8 quantization',
+															file=sys.stderr)
+	exit(-1)
+
+### Loads model
+try:
+	model = load_model(model_fn, custom_objects={'root_sum_squared_error':
+							root_sum_squared_error})
+except Exception as e:
+	print('Cannot load the model: ', str(e), file=sys.stderr)
+	exit(-1)
+
+### Load the video train dataset for the calibration
+if train_video_dir:
+	try:
+		data_train = istl.generators.CuboidsGeneratorFromImgs(
+										source=train_video_dir,
+										cub_frames=CUBOIDS_LENGTH,
+										prep_fn=resize_fn)
+	except Exception as e:
+		print('Cannot load {}: '.format(train_video_dir), str(e), file=sys.stderr)
+		exit(-1)
+else:
+	data_train = None
+
+### Export the model
+print('Exporting the model to {}'.format(output))
+tflite_model = istl.tflite.export_tflite(model, output,
+										quantization=quantization,
+										calib_data=data_train,
+										calib_cuboids=calib_cuboids,
+										seed=0)
+
+report = {'model': model_fn,
+			'tflite_model': output,
+			'quantization': args.quantization,
+			'size': {'tflite': len(tflite_model)},
+			'test_sets': {}}
+
+### Compare the scores of the float and the exported model on each test set
+scorer = istl.ScorerISTL(model, CUBOIDS_LENGTH)
+scorer.score_batch_size = score_batch_size
+
+tflite_rec_model = istl.tflite.TFLiteRecModel(tflite_model,
+												num_threads=num_threads)
+
+for test_video_dir, labels_path in zip(test_video_dirs, labels_paths):
+
+	try:
+		data_test = istl.generators.CuboidsGeneratorFromImgs(
+										source=test_video_dir,
+										cub_frames=CUBOIDS_LENGTH,
+										prep_fn=resize_fn)
+		data_test = istl.generators.ConsecutiveCuboidsGen(data_test)
+
+		test_labels = istl.labels.load_cuboid_labels(labels_path,
+										CUBOIDS_LENGTH,
+										data_test.cum_cuboids_per_video,
+										rule=label_rule)
+	except Exception as e:
+		print('Cannot load {}: '.format(test_video_dir), str(e),
+															file=sys.stderr)
+		exit(-1)
+
+	print('Evaluating {}'.format(test_video_dir))
+	meas = {}
+
+	for backend in ('float', 'tflite'):
+
+		scorer.tflite_model = tflite_rec_model if backend == 'tflite' else None
+
+		start = time.time()
+		scores = scorer.score_cuboids(data_test, False)
+		elapsed = time.time() - start
+
+		eer, eer_thresh = equal_error_rate(test_labels, scores)
+
+		meas[backend] = {'AUC': float(roc_auc_score(test_labels, scores)),
+						'EER': eer,
+						'EER_threshold': eer_thresh,
+						'time_per_cuboid': elapsed / len(scores)}
+
+		if backend == 'float':
+			float_scores = scores
+		else:
+			dev = np.abs(scores - float_scores) / np.abs(float_scores)
+			meas['parity'] = {
+					'AUC_diff': meas['tflite']['AUC'] - meas['float']['AUC'],
+					'EER_diff': meas['tflite']['EER'] - meas['float']['EER'],
+					'max_rel_deviation': float(dev.max()),
+					'mean_rel_deviation': float(dev.mean()),
+					'correlation': float(np.corrcoef(scores,
+														float_scores)[0, 1])}
+
+	report['test_sets'][test_video_dir] = meas
+	print(json.dumps(meas, indent=4))
+
+# Save the report
+if report_fn:
+	with open(report_fn, 'w') as f:
+		json.dump(report, f, indent=4)
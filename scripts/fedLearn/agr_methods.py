@@ -56,6 +56,60 @@ def fedAvg(models: list, samp_per_models: list, output_model: Model):
 				)
 
 
+class FedAvgAccumulator:
+
+	"""Incremental computation of the federated averaging of the clients
+		weights as each client finishes its local training, so that only the
+		running weighted sum of the weights is held instead of the model of
+		every client
+
+		The weights of each client are added with the number of samples used
+		for its training and the averaged weights are equal to those computed
+		by fedAvg for the same clients.
+	"""
+
+	def __init__(self):
+		self.__sum = None		# Weighted sum of the weights
+		self.__samples = 0		# Number of samples of the added clients
+
+	@property
+	def samples(self):
+		return self.__samples
+
+	def add(self, weights: list, samples: int):
+
+		"""Adds the weights of a client trained with the given number of
+			samples
+		"""
+
+		# Check input parameters
+		if not isinstance(samples, int) or samples < 0:
+			raise ValueError('"samples" must be an int not lower than 0')
+
+		if not samples:
+			return
+
+		if self.__sum is None:
+			self.__sum = [np.asarray(w) * samples for w in weights]
+		else:
+			if len(weights) != len(self.__sum):
+				raise ValueError('"weights" doesn\'t match the added weights')
+
+			for s, w in zip(self.__sum, weights):
+				s += np.asarray(w) * samples
+
+		self.__samples += samples
+
+	def result(self) -> list:
+
+		"""Returns the averaged weights of the added clients
+		"""
+
+		if not self.__samples:
+			raise ValueError('No client with samples was added')
+
+		return [s / float(self.__samples) for s in self.__sum]
+
 def asyncUpd(global_model: Model, client_models: list, pre_client_models: list,
 				samp_per_models: list, output_model: Model):
 
@@ -17,7 +17,7 @@ from tensorflow.keras import Model
 from tensorflow.keras.models import clone_model, load_model
 from tensorflow.keras.utils import get_custom_objects
 import tensorflow.keras.backend as K
-from .agr_methods import fedAvg, asyncUpd, globFeatRep
+from .agr_methods import fedAvg, asyncUpd, globFeatRep, FedAvgAccumulator
 from .asynOnLocalUpdate import AsynOnLocalUpdate
 
 
@@ -51,8 +51,7 @@ class FedLearnModel:
 		self._global_model = self._build_fn(**kwargs)
 
 		# The clients model
-		self._client_model = dict(zip(range(self._n_clients),
-					(self._build_fn(**kwargs) for i in range(self._n_clients))))
+		self._client_model = self._build_client_models(**kwargs)
 
 		self._client_best_weights = dict(zip(range(self._n_clients),
 											[None]*self._n_clients))
@@ -73,6 +72,14 @@ class FedLearnModel:
 
 		self.__early_stop = dict() # Early stop schedule
 
+	def _build_client_models(self, **kwargs) -> dict:
+
+		"""Builds the model of each client
+		"""
+
+		return dict(zip(range(self._n_clients),
+					(self._build_fn(**kwargs) for i in range(self._n_clients))))
+
 	"""Auxiliar function for copying weights from source model (src_model) to
 		the destination model (dst_model)
 	"""
@@ -143,9 +150,10 @@ class FedLearnModel:
 		# Compile the global model
 		self._global_model.compile(**deepcopy(kwargs))
 
-		# Compile the clients models
-		for client in self._client_model:
-			self._client_model[client].compile(**deepcopy(kwargs))
+		# Compile the clients models (only once the models shared by several
+		# clients)
+		for model in {id(m): m for m in self._client_model.values()}.values():
+			model.compile(**deepcopy(kwargs))
 
 	def fit(self, **kwargs):
 		raise NotImplementedError
@@ -169,8 +177,14 @@ class FedLearnModel:
 		# Make a copy of the global and client models
 		new._global_model = clone_model(self._global_model)
 		new._global_model.set_weights(self._global_model.get_weights())
-		new._client_model = {c: clone_model(self._global_model)
-										for c in self._client_model}
+		clones = {}
+
+		for c, model in self._client_model.items():
+			if id(model) not in clones:
+				clones[id(model)] = clone_model(self._global_model)
+
+		new._client_model = {c: clones[id(model)]
+								for c, model in self._client_model.items()}
 		new._client_best_weights = copy(self._client_best_weights)
 
 		# Compile models if the original objects' models were compiled
@@ -198,11 +212,57 @@ class SynFedAvgLearnModel(SynFedLearnModel):
 		constructed from a single previous Keras Model and by considering various
 		clients which performs the local training and one agregattor server that
 		performs agregation through FedAvg method.
+
+		For the simulation of many clients, the clients can share a single
+		working model (shared_client_model) on which each client trains in
+		turn from the global model, averaging the clients weights as each
+		one finishes its local training, so that the memory taken by the
+		clients doesn't grow with a model for each client. In that case, the
+		clients share the state of the working model's optimizer and their
+		callbacks act on the working model, so that a single set of
+		callbacks should be given for all the clients.
+
+		The local data of each client can be given as a generator holding
+		only the references to its cuboids (see
+		models.istl.partitioning.ClientPartitioner). The cuboids loaded by
+		each client are released after its local training when the client's
+		data provides a release method, so that only the cuboids of the
+		client being trained are held on memory. The clients without data
+		(e.g. left out by the partitioner) are not trained.
+
+		The loaders feeding the data of each client to its model (e.g.
+		models.istl.generators.SharedMemoryCuboidsGen) can be created by the
+		loader_fn argument of fit from the client's data when the client is
+		trained and closed after its local training, instead of holding the
+		loaders of all the clients at once.
 	"""
 
-	def __init__(self, build_fn, n_clients: int, **kwargs):
+	def __init__(self, build_fn, n_clients: int,
+					shared_client_model: bool=False, **kwargs):
+
+		if not isinstance(shared_client_model, bool):
+			raise TypeError('"shared_client_model" must be boolean')
+
+		self._shared_client_model = shared_client_model
+
 		super(SynFedAvgLearnModel, self).__init__(build_fn, n_clients, **kwargs)
 
+	@property
+	def shared_client_model(self):
+		return self._shared_client_model
+
+	def _build_client_models(self, **kwargs) -> dict:
+
+		"""Builds the model of each client or a single working model shared
+			by all the clients
+		"""
+
+		if not self._shared_client_model:
+			return super(SynFedAvgLearnModel, self)._build_client_models(
+																	**kwargs)
+
+		return dict.fromkeys(range(self._n_clients), self._build_fn(**kwargs))
+
 	def fit(self, **kwargs):
 
 		if ('callbacks' in kwargs and (not isinstance(kwargs['callbacks'], dict) or
@@ -212,8 +272,15 @@ class SynFedAvgLearnModel(SynFedLearnModel):
 
 		n_epochs = kwargs['epochs'] # Get number of epochs specified
 
-		# Keep number of samples used by each client node
-		samp_per_client = {c: len((kwargs['x'][c] if kwargs['x'][c] is not None else [])
+		# Function creating the loader of the data of a client when trained
+		loader_fn = kwargs['loader_fn'] if 'loader_fn' in kwargs else None
+
+		if loader_fn is not None and not callable(loader_fn):
+			raise TypeError('"loader_fn" must be callable')
+
+		# Keep number of samples used by each client node, being 0 for the
+		# clients without data
+		samp_per_client = {c: len((kwargs['x'].get(c) if kwargs['x'].get(c) is not None else [])
 							if isinstance(kwargs['x'], dict) else kwargs['x']) for c in self._client_model}
 
 		# Flag for setting or stopping the training for each client
@@ -286,41 +353,80 @@ class SynFedAvgLearnModel(SynFedLearnModel):
 					self.global_model.save(self.__backup['filename'])
 
 			# Copy weights from global model to clients models
-			for c in self._client_model:
-				SynFedAvgLearnModel._copy_weights(self._global_model,
+			if self._shared_client_model:
+				# Each client starts from the global weights when trained and
+				# the clients weights are averaged as they are trained
+				global_weights = self._global_model.get_weights()
+				aggregator = FedAvgAccumulator()
+				aggregated = set()
+			else:
+				for c in self._client_model:
+					SynFedAvgLearnModel._copy_weights(self._global_model,
 														self._client_model[c])
 
 			# Perform local training
 			for c in self._client_model:
 
-				if kwargs['x'] is None or kwargs['x'][c] is None or not train[c]:
+				if kwargs['x'] is None or not train[c]:
 					continue
 
 				# Verbose mode
 				if kwargs['verbose']:
 					print('Client "{}":'.format(c), end='')
 
-				hist = self._client_model[c].fit(
-				    x=kwargs['x'][c] if isinstance(kwargs['x'], dict) else kwargs['x'],
-				    y=(kwargs['y'][c] if isinstance(kwargs['y'], dict) else kwargs['y']) if 'y' in kwargs else None,
-				    batch_size=kwargs['batch_size'] if 'batch_size' in kwargs else None,
-				    epochs=epoch + 2,
-				    verbose=kwargs['verbose'] if 'verbose' in kwargs else 1,
-				    callbacks=kwargs['callbacks'][c] if 'callbacks' in kwargs else None,
-				    validation_split=kwargs['validation_split'] if 'validation_split' in kwargs else 0.0,
-				    validation_data=(kwargs['validation_data'][c] if isinstance(kwargs['validation_data'], dict) else kwargs['validation_data']) if 'validation_data' in kwargs else None,
-				    shuffle=kwargs['shuffle'] if 'shuffle' in kwargs else True,
-				    class_weight=kwargs['class_weight'] if 'class_weight' in kwargs else None,
-				    sample_weight=kwargs['sample_weight'] if 'sample_weight' in kwargs else None,
-				    initial_epoch=epoch + 1,
-				    steps_per_epoch=kwargs['steps_per_epoch'] if 'steps_per_epoch' in kwargs else None,
-				    validation_steps=kwargs['validation_steps'] if 'validation_steps' in kwargs else None,
-				    #validation_batch_size=kwargs['validation_batch_size'] if 'validation_batch_size' in kwargs else None,
-				    validation_freq=kwargs['validation_freq'] if 'validation_freq' in kwargs else 1,
-				    max_queue_size=kwargs['max_queue_size'] if 'max_queue_size' in kwargs else 10,
-				    workers=kwargs['workers'] if 'workers' in kwargs else 1,
-				    use_multiprocessing=kwargs['use_multiprocessing'] if 'use_multiprocessing' in kwargs else False
-				)
+				if self._shared_client_model:
+					self._client_model[c].set_weights(global_weights)
+
+				x = kwargs['x'][c] if isinstance(kwargs['x'], dict) else kwargs['x']
+				validation_data = (kwargs['validation_data'][c] if isinstance(kwargs['validation_data'], dict) else kwargs['validation_data']) if 'validation_data' in kwargs else None
+
+				# Create the loaders of the client's data
+				loaders = []
+				try:
+					if loader_fn is not None:
+						x = loader_fn(x)
+						loaders.append(x)
+
+						if validation_data is not None:
+							validation_data = loader_fn(validation_data)
+							loaders.append(validation_data)
+
+					hist = self._client_model[c].fit(
+					    x=x,
+					    y=(kwargs['y'][c] if isinstance(kwargs['y'], dict) else kwargs['y']) if 'y' in kwargs else None,
+					    batch_size=kwargs['batch_size'] if 'batch_size' in kwargs else None,
+					    epochs=epoch + 2,
+					    verbose=kwargs['verbose'] if 'verbose' in kwargs else 1,
+					    callbacks=kwargs['callbacks'][c] if 'callbacks' in kwargs else None,
+					    validation_split=kwargs['validation_split'] if 'validation_split' in kwargs else 0.0,
+					    validation_data=validation_data,
+					    shuffle=kwargs['shuffle'] if 'shuffle' in kwargs else True,
+					    class_weight=kwargs['class_weight'] if 'class_weight' in kwargs else None,
+					    sample_weight=kwargs['sample_weight'] if 'sample_weight' in kwargs else None,
+					    initial_epoch=epoch + 1,
+					    steps_per_epoch=kwargs['steps_per_epoch'] if 'steps_per_epoch' in kwargs else None,
+					    validation_steps=kwargs['validation_steps'] if 'validation_steps' in kwargs else None,
+					    #validation_batch_size=kwargs['validation_batch_size'] if 'validation_batch_size' in kwargs else None,
+					    validation_freq=kwargs['validation_freq'] if 'validation_freq' in kwargs else 1,
+					    max_queue_size=kwargs['max_queue_size'] if 'max_queue_size' in kwargs else 10,
+					    workers=kwargs['workers'] if 'workers' in kwargs else 1,
+					    use_multiprocessing=kwargs['use_multiprocessing'] if 'use_multiprocessing' in kwargs else False
+					)
+				finally:
+					for loader in loaders:
+						if hasattr(loader, 'close'):
+							loader.close()
+
+				# Release the cuboids loaded by the client
+				for data in ('x', 'validation_data'):
+					if (isinstance(kwargs.get(data), dict) and
+							hasattr(kwargs[data][c], 'release')):
+						kwargs[data][c].release()
+
+				if self._shared_client_model:
+					aggregator.add(self._client_model[c].get_weights(),
+															samp_per_client[c])
+					aggregated.add(c)
 
 				# Note the metrics into the history
 
@@ -356,7 +462,18 @@ class SynFedAvgLearnModel(SynFedLearnModel):
 
 							# Restore weight of all client models if restore
 							# best weight is set
-							if self.__early_stop['rest_best_weights']:
+							if (self.__early_stop['rest_best_weights'] and
+												self._shared_client_model):
+								aggregator = FedAvgAccumulator()
+								aggregated = set(self._client_model)
+
+								for i in self._client_model:
+									aggregator.add(
+										self._client_best_weights[i]
+										if self._client_best_weights[i] is not None
+										else global_weights, samp_per_client[i])
+
+							elif self.__early_stop['rest_best_weights']:
 								for i in self._client_model:
 									self._client_model[i].set_weights(self._client_best_weights[i])
 
@@ -377,9 +494,17 @@ class SynFedAvgLearnModel(SynFedLearnModel):
 						for i in self._client_model: train[i] = False
 
 			# Perform agregation
-			fedAvg(models=list(self._client_model.values()),
-					samp_per_models=list(samp_per_client.values()),
-					output_model=self._global_model)
+			if self._shared_client_model:
+				# The clients not trained keep the global weights
+				for c in self._client_model:
+					if c not in aggregated:
+						aggregator.add(global_weights, samp_per_client[c])
+
+				self._global_model.set_weights(aggregator.result())
+			else:
+				fedAvg(models=list(self._client_model.values()),
+						samp_per_models=list(samp_per_client.values()),
+						output_model=self._global_model)
 
 		# Remove backup model as it's no longer needed
 		if self.__backup['filename'] and isfile(self.__backup['filename']):
@@ -1,3 +1,10 @@
 from .__istl import build_ISTL, ScorerISTL, PredictorISTL, EvaluatorISTL, LocalizatorISTL
+from .__istl import StreamingPredictorISTL, IncrementalScorerISTL
 from .__istl import build_abnor_evant_STA
 from . import generators
+from . import cache
+from . import preprocessing
+from . import stream
+from . import labels
+from . import partitioning
+from . import tflite
@@ -23,11 +23,17 @@
 
 # Imported modules
 import warnings
+import json
+import threading
+import queue
 from copy import copy, deepcopy
 from bisect import bisect_right
+from collections import deque
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from cv2 import resize
 from tensorflow.keras import Model, Sequential, Input
+from tensorflow.keras.utils import Sequence
 from tensorflow.keras.layers import (Conv2D, ConvLSTM2D, Conv2DTranspose,
 										TimeDistributed, LayerNormalization,
 										Lambda, Reshape)
@@ -35,8 +41,11 @@ from tensorflow import image as tf_image
 from tensorflow.keras.layers import Conv3D, Conv3DTranspose
 from tensorflow import math as tf_math
 from tensorflow import transpose as tf_transpose
+from tensorflow import function as tf_function
 from sklearn.metrics import roc_auc_score
 from utils import confusion_matrix, equal_error_rate
+from .cache import compact_dtype, to_compact, from_compact
+from .generators import ConsecutiveCuboidsGen
 #from persistence1d.filter_noise import filter_noise
 
 def build_ISTL(cub_length: int):
@@ -183,6 +192,25 @@ class ScorerISTL:
 
 		cub_frames : int
 			Number of frames conforming the cuboids
+
+		feature_cache : bool (default False)
+			Score the consecutive cuboids of a ConsecutiveCuboidsGen from the
+			frames of each video encoding each frame only once (see
+			score_frames) instead of encoding each frame on every cuboid
+			containing it. Ignored when the cuboids are scored through
+			tflite_model
+
+		score_batch_size : int (default None)
+			Number of cuboids scored at once by score_cuboids regardless of
+			the batches of the collection scored. The cuboids are gathered
+			into batches of this size by a background thread while the
+			previous batch is scored, holding at most score_prefetch + 2
+			batches on memory. If None, the collection is scored as given
+
+		tflite_model : TFLiteRecModel (default None)
+			Reconstruction error model exported to TensorFlow Lite (see
+			tflite.export_tflite) through which the cuboids are scored
+			instead of the Keras model. If None, the Keras model is used
 	"""
 
 	def __init__(self, model: Model, cub_frames: int):
@@ -208,6 +236,17 @@ class ScorerISTL:
 		self.__min_score_cub = None
 		self.__max_score_cub = None
 
+		# Scoring of the consecutive cuboids from the encoded frames
+		self.__feature_cache = False
+		self.__split_models = None	# Frames encoder and features scorer
+
+		# Re-batching of the scored cuboids
+		self.__score_batch_size = None
+		self.__score_prefetch = 2
+
+		# Scoring through the TensorFlow Lite interpreter
+		self.__tflite_model = None
+
 		"""Returns the reconstruction error of each video's cuboids
 
 			Parameters
@@ -242,8 +281,79 @@ class ScorerISTL:
 	def cub_frames(self):
 		return self.__cub_frames
 
+	@property
+	def feature_cache(self):
+		return self.__feature_cache
+
+	@property
+	def score_batch_size(self):
+		return self.__score_batch_size
+
+	@property
+	def score_prefetch(self):
+		return self.__score_prefetch
+
+	@property
+	def tflite_model(self):
+		return self.__tflite_model
+
+	@property
+	def _score_model(self):
+
+		"""Model through which the cuboids are scored
+		"""
+
+		return (self.__tflite_model if self.__tflite_model is not None
+														else self._rec_model)
+
 	## Setters ##
 
+	@tflite_model.setter
+	def tflite_model(self, value):
+
+		if value is not None and (not hasattr(value, 'predict') or
+									not hasattr(value, 'predict_on_batch')):
+			raise TypeError('"tflite_model" must be None or a TFLiteRecModel')
+
+		self.__tflite_model = value
+
+	def load_tflite(self, fname: str, num_threads: int=None):
+
+		"""Scores the cuboids through the reconstruction error model
+			exported to TensorFlow Lite on a file (see tflite.export_tflite)
+			run by the TensorFlow Lite interpreter with num_threads threads
+		"""
+
+		from .tflite import TFLiteRecModel
+
+		self.tflite_model = TFLiteRecModel(fname, num_threads=num_threads)
+
+	@score_batch_size.setter
+	def score_batch_size(self, value: int):
+
+		if value is not None and (not isinstance(value, int) or value <= 0):
+			raise ValueError('"score_batch_size" must be None or an integer'\
+															' greater than 0')
+
+		self.__score_batch_size = value
+
+	@score_prefetch.setter
+	def score_prefetch(self, value: int):
+
+		if not isinstance(value, int) or value <= 0:
+			raise ValueError('"score_prefetch" must be an integer greater'\
+																	' than 0')
+
+		self.__score_prefetch = value
+
+	@feature_cache.setter
+	def feature_cache(self, value: bool):
+
+		if not isinstance(value, bool):
+			raise TypeError('"feature_cache" must be bool')
+
+		self.__feature_cache = value
+
 	@cub_frames.setter
 	def cub_frames(self, value: int):
 
@@ -303,7 +413,7 @@ class ScorerISTL:
 		"""
 
 		#score = np.sqrt(np.sum((cuboid - self.__model.predict(cuboid))**2))
-		score = self._rec_model.predict(cuboid)
+		score = self._score_model.predict(cuboid)
 
 		#if scale_scores:
 		#	score = (score - self.__min_score_cub) / self.__max_score_cub
@@ -353,11 +463,332 @@ class ScorerISTL:
 		for i in range(len(cub_set)):
 			ret[i] = self.score_cuboid(cub_set[i])
 		"""
-		ret = self._rec_model.predict(cub_set)
+		if (self.__feature_cache and self.__tflite_model is None and
+							isinstance(cub_set, ConsecutiveCuboidsGen)):
+			ret = np.concatenate([self.score_frames(cub_set.video_frames(v))
+							for v in range(len(cub_set.cum_cuboids_per_video))])
+		elif self.__score_batch_size is not None:
+			ret = self.__score_rebatched(cub_set)
+		else:
+			ret = self._score_model.predict(cub_set)
+
 		ret = self._scale_scores(ret, scale_scores, norm_zero_one)
 
 		return ret
 
+	def __score_rebatched(self, cub_set) -> np.ndarray:
+
+		"""Scores the cuboids of a collection on batches of score_batch_size
+			cuboids. A background thread gathers the cuboids of the following
+			batches from the collection's items, which are batches of cuboids
+			for the generators (Sequence) and single cuboids otherwise, on a
+			fixed set of buffers while the current batch is scored, and the
+			scores are written on a preallocated array
+		"""
+
+		batch_size = self.__score_batch_size
+		batched = isinstance(cub_set, Sequence)
+		loader = None
+
+		n_cuboids = (cub_set.num_cuboids if hasattr(cub_set, 'num_cuboids')
+							else None if batched else len(cub_set))
+		scores = np.empty(n_cuboids if n_cuboids is not None else batch_size,
+															dtype='float32')
+		filled = 0
+
+		free = queue.Queue()	# Buffers available for gathering cuboids
+		ready = queue.Queue(maxsize=self.__score_prefetch)
+		stop = threading.Event()
+
+		def gather():
+
+			buffer = None
+			count = 0
+
+			try:
+				for idx in range(len(cub_set)):
+
+					item = cub_set[idx]
+
+					if batched:
+						# Take the cuboids of the (cuboids, labels) batches
+						if isinstance(item, tuple):
+							item = item[0]
+					else:
+						item = np.expand_dims(item, axis=0)
+
+					start = 0
+					while start < len(item):
+
+						if stop.is_set():
+							return
+
+						if buffer is None:
+							try:
+								buffer = free.get_nowait()
+							except queue.Empty:
+								buffer = np.empty((batch_size, *item.shape[1:]),
+														dtype=item.dtype)
+							count = 0
+
+						n = min(batch_size - count, len(item) - start)
+						buffer[count:count + n] = item[start:start + n]
+						count += n
+						start += n
+
+						if count == batch_size:
+							ready.put((buffer, count))
+							buffer = None
+
+				if buffer is not None:
+					ready.put((buffer, count))
+
+				ready.put(None)
+
+			except BaseException as e:
+				ready.put(e)
+
+		def gathered():
+			while True:
+				batch = ready.get()
+
+				if batch is None:
+					return
+
+				if isinstance(batch, BaseException):
+					raise batch
+
+				yield batch
+
+				# The buffer can be refilled once the batch is scored
+				free.put(batch[0])
+
+		if not batched and isinstance(cub_set, np.ndarray):
+			# The cuboids are already on memory
+			batches = ((cub_set[i:i + batch_size], min(batch_size,
+										len(cub_set) - i))
+							for i in range(0, len(cub_set), batch_size))
+		else:
+			loader = threading.Thread(target=gather, name='score_loader',
+															daemon=True)
+			loader.start()
+			batches = gathered()
+
+		try:
+			for buffer, count in batches:
+
+				# The batches are scored with the same shape to avoid
+				# tracing the model again for the last one
+				if len(buffer) < batch_size:
+					buffer = np.concatenate((buffer, np.repeat(buffer[-1:],
+										batch_size - len(buffer), axis=0)))
+
+				batch_scores = np.asarray(self._score_model.predict_on_batch(
+															buffer))[:count]
+
+				if filled + count > len(scores):
+					scores = np.concatenate((scores, np.empty(max(len(scores),
+											count), dtype=scores.dtype)))
+
+				scores[filled:filled + count] = batch_scores
+				filled += count
+
+		finally:
+			stop.set()
+
+			# Release the loader if it waits for room for a batch
+			while loader is not None and loader.is_alive():
+				try:
+					ready.get(timeout=0.1)
+				except queue.Empty:
+					pass
+
+		return scores[:filled]
+
+	def __get_split_models(self) -> tuple:
+
+		"""Splits the model at its first ConvLSTM2D layer into the encoder
+			of the frames, made by the preceding layers which are applied
+			to each frame independently, and the model scoring the cuboids
+			from their encoded frames and their original frames
+		"""
+
+		if self.__split_models is not None:
+			return self.__split_models
+
+		layers = self.__model.layers
+		rank = len(self.__model.input_shape)
+
+		first = next((i for i, l in enumerate(layers) if isinstance(l,
+														ConvLSTM2D)), None)
+
+		def per_frame(layer) -> bool:
+
+			if isinstance(layer, TimeDistributed):
+				return True
+
+			if isinstance(layer, LayerNormalization):
+				axis = (layer.axis if isinstance(layer.axis, (list, tuple))
+														else [layer.axis])
+
+				# The cuboids and frames axes are not normalized
+				return all(a % rank > 1 for a in axis)
+
+			return False
+
+		if not first or any(not per_frame(l) for l in layers[:first]):
+			raise ValueError('The model must start by layers applied to each'\
+							' frame followed by a ConvLSTM2D layer to encode'\
+							' the frames only once')
+
+		encoder = Model(inputs=layers[0].input,
+						outputs=layers[first - 1].output)
+
+		features = Input(shape=encoder.output_shape[1:])
+		frames = Input(shape=self.__model.input_shape[1:])
+
+		rec = features
+		for layer in layers[first:]:
+			rec = layer(rec)
+
+		scorer = Model(inputs=[features, frames],
+						outputs=Lambda(root_sum_squared_error)([frames, rec]))
+
+		self.__split_models = (encoder, scorer)
+
+		return self.__split_models
+
+	def score_frames(self, frames: np.ndarray, batch_size: int=32):
+
+		"""Returns the reconstruction error of every cuboid of consecutive
+			frames (i.e. all the cuboids taken with stride 1) of a sequence
+			of frames. Each frame is encoded only once by the layers of the
+			model applied to each frame and the encoded frames are kept on a
+			ring holding the frames of batch_size cuboids, from which the
+			cuboids are scored by the rest of the model
+
+			Parameters
+			----------
+
+			frames: numpy array
+				Sequence of frames shaped (# frames, width, height, channels)
+
+			batch_size: int (default 32)
+				Number of cuboids scored at once
+
+
+			Raise
+			-----
+
+			ValueError: The model doesn't start by layers applied to each
+						frame followed by a ConvLSTM2D layer
+			ValueError: There are less frames than a cuboid
+
+			Return: Numpy array vector with the reconstruction error of each
+					cuboid starting on each frame, as scored by score_cuboids
+		"""
+
+		# Check input
+		if not isinstance(frames, np.ndarray):
+			raise TypeError('"frames" must be a numpy array')
+
+		if not isinstance(batch_size, int) or batch_size <= 0:
+			raise ValueError('"batch_size" must be an integer greater than 0')
+
+		cub_frames = self.__model.input_shape[1]
+
+		if len(frames) < cub_frames:
+			raise ValueError('At least {} frames are required'.format(
+																cub_frames))
+
+		encoder, scorer = self.__get_split_models()
+
+		n_cuboids = len(frames) - cub_frames + 1
+		scores = np.empty(n_cuboids, dtype='float32')
+		ring = None
+
+		for start in range(0, n_cuboids, batch_size):
+
+			stop = min(start + batch_size, n_cuboids)
+
+			# Encode the frames not encoded yet of the following cuboids
+			new = frames[start + cub_frames - 1 if start else 0:
+														stop + cub_frames - 1]
+			n_new = len(new)
+
+			# The encoder takes the frames grouped as cuboids
+			pad = -n_new % cub_frames
+			if pad:
+				new = np.concatenate((new, np.repeat(new[-1:], pad, axis=0)))
+
+			encoded = encoder.predict(new.reshape(-1, cub_frames,
+										*new.shape[1:]), verbose=0,
+										batch_size=batch_size)
+			encoded = encoded.reshape(-1, *encoded.shape[2:])[:n_new]
+
+			ring = (encoded if ring is None else
+						np.concatenate((ring[len(ring) - cub_frames + 1:],
+																	encoded)))
+
+			scores[start:stop] = scorer.predict(
+					[np.moveaxis(sliding_window_view(ring, cub_frames, axis=0),
+																	-1, 1),
+						np.moveaxis(sliding_window_view(
+									frames[start:stop + cub_frames - 1],
+										cub_frames, axis=0), -1, 1)],
+					verbose=0, batch_size=batch_size)
+
+		return scores
+
+	def score_stream(self, stream, scale_scores=False):
+
+		"""Scores the cuboids of a video stream as soon as they are captured
+
+			Parameters
+			----------
+
+			stream: StreamCuboidSource
+				Source of the cuboids of the stream
+
+			scale_scores: bool (default False)
+				Scale the scores to the scores of the cuboids to which the
+				scorer was fitted
+
+
+			Raise
+			-----
+
+			RuntimeError: The scores are scaled and the scorer was not fitted
+
+			Return: Generator yielding the index of the first frame of each
+					retrieved cuboid on the stream and their reconstruction
+					error until the stream ends
+		"""
+
+		# Check input
+		if not hasattr(stream, 'read'):
+			raise TypeError('"stream" must be a StreamCuboidSource')
+
+		if not isinstance(scale_scores, bool):
+			raise TypeError('"scale_scores" must be bool')
+
+		if scale_scores and self.__min_score_cub is None:
+			raise RuntimeError('Fitting to the training cuboids score '\
+								'is required first to return the scaled scores')
+
+		while True:
+			starts, cuboids = stream.read()
+
+			if not len(cuboids):
+				return
+
+			scores = self._score_model.predict(cuboids, verbose=0)
+
+			if scale_scores:
+				scores = self._scale_scores(scores, scale_scores)[0]
+
+			yield starts, scores
+
 	def _scale_scores(self, scores: np.array,
 							scale_scores=True, norm_zero_one=False):
 
@@ -417,6 +848,265 @@ class ScorerISTL:
 
 		return scores
 
+	@property
+	def calibration(self):
+
+		"""Minimum and maximum reconstruction errors to which the scores are
+			scaled or None if the scorer was not fitted
+		"""
+
+		if self.__min_score_cub is None:
+			return None
+
+		return float(self.__min_score_cub), float(self.__max_score_cub)
+
+	@calibration.setter
+	def calibration(self, value: tuple or list):
+
+		if value is None:
+			self.__min_score_cub = self.__max_score_cub = None
+			return
+
+		if (not isinstance(value, (tuple, list)) or len(value) != 2 or
+					any(not isinstance(v, (int, float, np.floating))
+														for v in value)):
+			raise TypeError('"calibration" must be a pair of minimum and'\
+													' maximum scores')
+
+		if value[0] >= value[1]:
+			raise ValueError('The minimum score of the calibration must be'\
+										' lower than the maximum score')
+
+		self.__min_score_cub, self.__max_score_cub = value
+
+	def save_calibration(self, fname: str):
+
+		"""Saves the scaling of the scores fitted to the training cuboids as
+			a JSON document, so that the scores can be scaled without scoring
+			the training cuboids again (e.g. for scoring a live stream)
+		"""
+
+		if self.__min_score_cub is None:
+			raise RuntimeError('Fitting to the training cuboids score '\
+								'is required first to save the calibration')
+
+		with open(fname, 'w') as f:
+			json.dump({'min_score': float(self.__min_score_cub),
+						'max_score': float(self.__max_score_cub)}, f)
+
+	def load_calibration(self, fname: str):
+
+		"""Loads the scaling of the scores saved by save_calibration
+		"""
+
+		with open(fname) as f:
+			cal = json.load(f)
+
+		self.calibration = (cal['min_score'], cal['max_score'])
+
+
+class IncrementalScorerISTL(ScorerISTL):
+
+	"""Inference-only scorer of the cuboids of a video stream for a previous
+		trained ISTL Model which advances the state of its ConvLSTM layers
+		one frame at a time, instead of running the whole model over the
+		frames of each cuboid.
+
+		A copy of the model processing one frame per step with stateful
+		ConvLSTM layers is built from the model's weights. Each frame is
+		reconstructed once and the squared error of the last cub_frames
+		frames is kept on a fixed-length queue, from which the
+		reconstruction error of the cuboid made by these frames is given, so
+		scoring each new frame takes a single frame step.
+
+		Accuracy: The scores are exact for the first cuboid after a reset,
+		since the ConvLSTM states start from zero on the cuboid's first
+		frame as done by ScorerISTL. On the following cuboids, the states
+		also hold the frames preceding each cuboid, so the scores
+		approximate those of ScorerISTL (whose states start on each cuboid)
+		and may also differ in scale, since the model was trained on
+		cuboids. The deviation depends on the model and the stream, so it
+		should be measured on representative frames by compare_scores
+		before replacing the window-based scores (e.g. for choosing a reset
+		period or the calibration). The scores are scaled with the
+		calibration of this scorer (see ScorerISTL.fit), which should be
+		fitted to the incremental scores of training frames.
+
+		Attributes
+		----------
+
+		model : tf.keras.Model
+			Keras Model containing a pre-trained ISTL model
+
+		cub_frames : int
+			Number of frames conforming the cuboids
+
+		reset_period : int (default None)
+			Number of frames after which the ConvLSTM states are reset,
+			bounding the frames held by the states. The queue of frames
+			errors is kept, so every cuboid is still scored. If None, the
+			states are only reset by reset
+	"""
+
+	def __init__(self, model: Model, cub_frames: int, reset_period: int=None):
+
+		super(IncrementalScorerISTL, self).__init__(model, cub_frames)
+
+		# Check input
+		if reset_period is not None and (not isinstance(reset_period, int) or
+														reset_period < cub_frames):
+			raise ValueError('"reset_period" must be None or an integer not'\
+														' lower than cub_frames')
+
+		self.__reset_period = reset_period
+
+		# Copy of the model processing a frame per step
+		self.__step_model = Sequential()
+		self.__step_model.add(Input(batch_shape=(1, 1,
+											*model.input_shape[2:])))
+
+		for layer in model.layers:
+			config = layer.get_config()
+
+			if isinstance(layer, ConvLSTM2D):
+				config['stateful'] = True
+
+			step_layer = layer.__class__.from_config(config)
+			self.__step_model.add(step_layer)
+			step_layer.set_weights(layer.get_weights())
+
+		step_model = self.__step_model
+		self.__step_error = tf_function(lambda frame: tf_math.reduce_sum(
+				tf_math.square(frame - step_model(frame, training=False))))
+
+		self.__errors = deque(maxlen=cub_frames)
+		self.__frames_seen = 0
+		self.__state_frames = 0		# Frames held by the states
+
+	## Observers ##
+
+	@property
+	def reset_period(self):
+		return self.__reset_period
+
+	@property
+	def frames_seen(self):
+
+		"""Number of frames processed since the last reset
+		"""
+
+		return self.__frames_seen
+
+	def __reset_states(self):
+
+		for layer in self.__step_model.layers:
+			if isinstance(layer, ConvLSTM2D):
+				if hasattr(layer, 'reset_state'):
+					layer.reset_state()
+				else:
+					layer.reset_states()
+
+		self.__state_frames = 0
+
+	def reset(self):
+
+		"""Resets the ConvLSTM states and the queue of frames errors, so that
+			the next frame starts a new stream
+		"""
+
+		self.__reset_states()
+		self.__errors.clear()
+		self.__frames_seen = 0
+
+	def push_frame(self, frame: np.ndarray, scale_score=False):
+
+		"""Advances the stream one frame
+
+			Parameters
+			----------
+
+			frame: numpy array
+				Frame shaped (width, height, channels)
+
+			scale_score: bool (default False)
+				Scale the score to the calibration of the scorer
+
+			Return: Reconstruction error of the cuboid made by the last
+				cub_frames frames or None if fewer frames were processed
+		"""
+
+		# Check input
+		if not isinstance(frame, np.ndarray):
+			raise TypeError('"frame" must be a numpy array')
+
+		if scale_score and self.calibration is None:
+			raise RuntimeError('Fitting to the training cuboids score '\
+								'is required first to return the scaled scores')
+
+		if (self.__reset_period is not None and
+								self.__state_frames == self.__reset_period):
+			self.__reset_states()
+
+		self.__errors.append(float(self.__step_error(
+						frame[np.newaxis, np.newaxis].astype('float32'))))
+		self.__frames_seen += 1
+		self.__state_frames += 1
+
+		if len(self.__errors) < self.cub_frames:
+			return None
+
+		score = np.sqrt(sum(self.__errors))
+
+		if scale_score:
+			min_score, max_score = self.calibration
+			score = (score - min_score) / (max_score - min_score)
+
+		return score
+
+	def push_frames(self, frames: np.ndarray, scale_scores=False):
+
+		"""Advances the stream several frames
+
+			Return: Numpy array vector with the reconstruction error of each
+				cuboid completed by the frames
+		"""
+
+		scores = (self.push_frame(f, scale_scores) for f in frames)
+
+		return np.array([s for s in scores if s is not None], dtype='float64')
+
+	def compare_scores(self, frames: np.ndarray) -> dict:
+
+		"""Measures the deviation of the incremental scores of the cuboids of
+			consecutive frames of a sequence from the scores given by running
+			the model on each cuboid. The scorer is reset before and after
+			the comparison
+
+			Return: Dict with the max and mean relative deviation of the
+				scores, the Pearson correlation of both scores and the ratio
+				of their means
+		"""
+
+		# Check input
+		if not isinstance(frames, np.ndarray) or len(frames) < self.cub_frames:
+			raise ValueError('"frames" must be a numpy array with at least'\
+								' {} frames'.format(self.cub_frames))
+
+		window = self._rec_model.predict(np.moveaxis(sliding_window_view(
+										frames, self.cub_frames, axis=0),
+										-1, 1), verbose=0).astype('float64')
+
+		self.reset()
+		incremental = self.push_frames(frames)
+		self.reset()
+
+		deviation = np.abs(incremental - window) / np.abs(window)
+
+		return {'max_rel_deviation': float(deviation.max()),
+				'mean_rel_deviation': float(deviation.mean()),
+				'correlation': (float(np.corrcoef(incremental, window)[0, 1])
+								if len(window) > 1 else 1.0),
+				'mean_ratio': float(incremental.mean() / window.mean())}
 
 class PredictorISTL(ScorerISTL):
 
@@ -638,6 +1328,288 @@ class PredictorISTL(ScorerISTL):
 		return False
 	"""
 
+class StreamingPredictorISTL(PredictorISTL):
+
+	"""Handler class for the online prediction of the cuboids of a video
+		stream (e.g. a surveillance camera) by a previous ISTL Model trained,
+		which receives the cuboids or frames incrementally instead of a
+		complete collection of cuboids.
+
+		The scores are scaled to the calibration fitted to the training
+		cuboids (see ScorerISTL.fit and ScorerISTL.load_calibration) and
+		the cuboids are predicted as done by predict_cuboids for the whole
+		stream: a cuboid is anomalous when it belongs to a run of at least
+		temp_thresh consecutive cuboids whose scaled score reaches the anomaly
+		threshold. Only the length of the current run of anomalous cuboids is
+		kept, so the prediction of a cuboid is delayed until its run is
+		known to reach temp_thresh cuboids or to end, at most temp_thresh - 1
+		cuboids. Once the run reaches temp_thresh cuboids, an anomalous event
+		is raised from its first cuboid and the following cuboids of the run
+		are predicted as soon as they are scored.
+
+		Attributes
+		----------
+
+		model : tf.keras.Model
+			Keras Model containing a pre-trained ISTL model
+
+		cub_frames : int
+			Number of frames conforming the cuboids
+
+		anom_thresh : float
+			Anomaly Threshold for wich, a input cuboid is considered anomalous
+			if its scaled reconstruction error reaches it
+
+		temp_thresh : int
+			Number of consecutive cuboids classified as a anomalous required
+			to consider a segment as anomalous
+
+		calibration : tuple or str (default None)
+			Minimum and maximum reconstruction errors to which the scores are
+			scaled or path of the calibration saved by save_calibration. If
+			None, the predictor must be fitted before predicting
+
+		on_event : function (default None)
+			Function called with the index of the first cuboid of each
+			anomalous event as soon as it is raised
+	"""
+
+	def __init__(self, model: Model, cub_frames: int, anom_thresh: float,
+					temp_thresh: int, calibration: tuple or str=None,
+					on_event=None):
+
+		super(StreamingPredictorISTL, self).__init__(model, cub_frames,
+													anom_thresh, temp_thresh)
+
+		# Check input
+		if on_event is not None and not callable(on_event):
+			raise TypeError('"on_event" must be callable')
+
+		if isinstance(calibration, str):
+			self.load_calibration(calibration)
+		elif calibration is not None:
+			self.calibration = calibration
+
+		self.__on_event = on_event
+
+		# State of the stream
+		self.reset()
+
+	## Observers ##
+	@property
+	def on_event(self):
+		return self.__on_event
+
+	@property
+	def cuboids_scored(self):
+
+		"""Number of cuboids of the stream scored
+		"""
+
+		return self.__next_index
+
+	@property
+	def pending(self):
+
+		"""Number of cuboids scored whose prediction is pending
+		"""
+
+		return len(self.__pending)
+
+	@property
+	def in_event(self):
+
+		"""Whether the last cuboid scored belongs to an anomalous event
+		"""
+
+		return self.__run >= max(self.temp_thresh, 1)
+
+	def reset(self):
+
+		"""Starts a new stream discarding the pending cuboids and frames
+		"""
+
+		self.__next_index = 0	# Index of the next cuboid scored
+		self.__run = 0			# Length of the current anomalous run
+		self.__pending = []		# Scores of the cuboids of a run too short
+		self.__frames = []		# Frames of the next cuboid
+
+	def push_scores(self, scores: np.ndarray) -> tuple:
+
+		"""Predicts the following cuboids of the stream from their
+			reconstruction errors
+
+			Return: Index on the stream, prediction and scaled score of the
+				cuboids whose prediction is known
+		"""
+
+		if self.calibration is None:
+			raise RuntimeError('Fitting to the training cuboids score '\
+								'is required first to scale the scores')
+
+		min_score, max_score = self.calibration
+		scores = (np.asarray(scores, dtype='float64').reshape(-1) -
+										min_score) / (max_score - min_score)
+		temp_thresh = max(self.temp_thresh, 1)
+
+		indexes = []
+		preds = []
+		done_scores = []
+
+		for score in scores:
+
+			index = self.__next_index
+			self.__next_index += 1
+
+			if score >= self.anom_thresh:
+
+				self.__run += 1
+
+				if self.__run < temp_thresh:
+					self.__pending.append(score)
+					continue
+
+				if self.__run == temp_thresh:
+
+					# Raise the event from the first cuboid of the run
+					first = index - len(self.__pending)
+
+					indexes.extend(range(first, index))
+					preds.extend([1]*len(self.__pending))
+					done_scores.extend(self.__pending)
+					self.__pending = []
+
+					if self.__on_event is not None:
+						self.__on_event(first)
+
+				indexes.append(index)
+				preds.append(1)
+				done_scores.append(score)
+
+			else:
+
+				# The pending run is too short to be anomalous
+				indexes.extend(range(index - len(self.__pending), index + 1))
+				preds.extend([0]*(len(self.__pending) + 1))
+				done_scores.extend(self.__pending + [score])
+
+				self.__pending = []
+				self.__run = 0
+
+		return (np.array(indexes, dtype='int64'), np.array(preds, dtype='int8'),
+											np.array(done_scores, dtype='float64'))
+
+	def push_cuboids(self, cuboids: np.ndarray) -> tuple:
+
+		"""Scores and predicts the following cuboids of the stream
+
+			Return: Index on the stream, prediction and scaled score of the
+				cuboids whose prediction is known
+		"""
+
+		# Check input
+		if not isinstance(cuboids, np.ndarray):
+			raise TypeError('"cuboids" must be a numpy array')
+
+		if not len(cuboids):
+			return self.push_scores(np.empty(0))
+
+		return self.push_scores(self._score_model.predict(cuboids, verbose=0))
+
+	def push_frames(self, frames: np.ndarray) -> tuple:
+
+		"""Groups the following frames of the stream into non-overlapped
+			cuboids and scores and predicts the completed cuboids. The
+			frames of an incomplete cuboid are kept until the following
+			frames are pushed
+
+			Return: Index on the stream, prediction and scaled score of the
+				cuboids whose prediction is known
+		"""
+
+		# Check input
+		if not isinstance(frames, np.ndarray):
+			raise TypeError('"frames" must be a numpy array')
+
+		self.__frames.extend(frames)
+		n_cuboids = len(self.__frames) // self.cub_frames
+
+		if not n_cuboids:
+			return self.push_scores(np.empty(0))
+
+		cuboids = np.array(self.__frames[:n_cuboids*self.cub_frames])
+		del self.__frames[:n_cuboids*self.cub_frames]
+
+		return self.push_cuboids(cuboids.reshape(n_cuboids, self.cub_frames,
+														*cuboids.shape[1:]))
+
+	def flush(self) -> tuple:
+
+		"""Ends the stream predicting the pending cuboids. The frames of an
+			incomplete cuboid are completed repeating its last frame, as done
+			by the cuboids generators
+
+			Return: Index on the stream, prediction and scaled score of the
+				cuboids whose prediction was pending
+		"""
+
+		indexes, preds, scores = [], [], []
+
+		if self.__frames:
+			frames = (self.__frames + [self.__frames[-1]]*(self.cub_frames -
+														len(self.__frames)))
+			self.__frames = []
+
+			indexes, preds, scores = self.push_cuboids(
+										np.expand_dims(np.array(frames), axis=0))
+
+		# The last run is too short to be anomalous
+		first = self.__next_index - len(self.__pending)
+		ret = (np.concatenate((indexes, np.arange(first, self.__next_index))
+															).astype('int64'),
+				np.concatenate((preds, np.zeros(len(self.__pending)))
+															).astype('int8'),
+				np.concatenate((scores, self.__pending)).astype('float64'))
+
+		self.reset()
+
+		return ret
+
+	def predict_stream(self, stream):
+
+		"""Predicts the cuboids of a video stream as soon as they are
+			captured until the stream ends
+
+			Parameters
+			----------
+
+			stream: StreamCuboidSource
+				Source of the cuboids of the stream
+
+			Return: Generator yielding the index on the stream, prediction
+				and scaled score of the cuboids whose prediction is known
+		"""
+
+		# Check input
+		if not hasattr(stream, 'read'):
+			raise TypeError('"stream" must be a StreamCuboidSource')
+
+		while True:
+			_, cuboids = stream.read()
+
+			if not len(cuboids):
+				break
+
+			ret = self.push_cuboids(cuboids)
+
+			if len(ret[0]):
+				yield ret
+
+		ret = self.flush()
+
+		if len(ret[0]):
+			yield ret
+
 class LocalizatorISTL(PredictorISTL):
 
 	"""Handler class for both temporal and spacial anomaly localization by a
@@ -1004,11 +1976,17 @@ class EvaluatorISTL(PredictorISTL):
 		max_cuboids : int (Defalut: None)
 			Max number of false positive cuboids to be stored. None for no
 			limits.
+
+		fp_dtype : str (Default: None)
+			Store the false positive cuboids compactly as "uint8" or "float16"
+			and retrieve them as float32. Cuboids stored as "uint8" must be
+			normalized in [0, 1]. None for storing them with its own dtype.
 	"""
 
 	## Constructor ##
 	def __init__(self, model: Model, cub_frames: int, anom_thresh: float,
-										temp_thresh: int, max_cuboids: int=None):
+										temp_thresh: int, max_cuboids: int=None,
+										fp_dtype=None):
 		super(EvaluatorISTL, self).__init__(model, cub_frames, anom_thresh,
 																	temp_thresh)
 
@@ -1017,14 +1995,16 @@ class EvaluatorISTL(PredictorISTL):
 		self.__fp_rec_errors = [] # Reconstruction error of stored cuboid
 
 		self.__max_cuboids = max_cuboids
+		self.__fp_dtype = compact_dtype(fp_dtype)
 
 	## Getters ##
 	@property
 	def fp_cuboids(self):
 		if len(self.__fp_cuboids) > 1:
-			return np.array(self.__fp_cuboids)
+			return from_compact(np.array(self.__fp_cuboids), self.__fp_dtype)
 		elif len(self.__fp_cuboids) == 1:
-			return np.expand_dims(self.__fp_cuboids, axis=0)
+			return from_compact(np.expand_dims(self.__fp_cuboids, axis=0),
+															self.__fp_dtype)
 		else:
 			return None
 		#return (np.array(self.__fp_cuboids) if len(self.__fp_cuboids) > 1 else
@@ -1100,6 +2080,9 @@ class EvaluatorISTL(PredictorISTL):
 
 				aux = cuboids[i] if cuboids[i].shape[0] != 1 else cuboids[i][0]
 
+				# Store a copy so that the source array is not kept on memory
+				aux = np.array(to_compact(np.asarray(aux), self.__fp_dtype))
+
 				self.__fp_rec_errors.insert(idx, scores[i])
 				self.__fp_cuboids.insert(idx, aux)
 
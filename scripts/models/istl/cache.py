@@ -0,0 +1,676 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Author: Nicolás Cubero Torres
+# Description: Caching utilities for the video frames flowed by the cuboids
+#				generators of the Incremental Spatio Temporal Learner
+#				architecture, so that frames already decoded and
+#				preprocessed are not processed again, the datasets
+#				directories are not scanned again and frames are compactly
+#				stored on memory.
+###############################################################################
+
+# Imported modules
+import os
+import json
+import warnings
+import hashlib
+import tempfile
+import threading
+import functools
+from collections import OrderedDict
+import numpy as np
+
+# Default file name of the manifests stored on the datasets directories
+MANIFEST_FNAME = '.istl_manifest.json'
+
+def compact_dtype(dtype) -> np.dtype:
+
+	"""Checks a dtype is supported for storing frames compactly and returns
+		it as a numpy dtype (or None if no compact storage is desired)
+
+		Parameters
+		----------
+
+		dtype : None, str or numpy dtype
+			"uint8", "float16" or None
+	"""
+
+	if dtype is None:
+		return None
+
+	try:
+		dtype = np.dtype(dtype)
+	except TypeError:
+		raise ValueError('"{}" not a valid storage dtype'.format(dtype))
+
+	if dtype not in (np.uint8, np.float16):
+		raise ValueError('The storage dtype must be None, "uint8" or'\
+																' "float16"')
+
+	return dtype
+
+def to_compact(x: np.ndarray, dtype: np.dtype) -> np.ndarray:
+
+	"""Converts frames into their compact storage representation. Frames are
+		stored as uint8 by scaling the values in [0, 1] to [0, 255], so frames
+		to be stored as uint8 must be normalized in [0, 1]. Frames already
+		stored on the desired dtype are returned as they are
+
+		Parameters
+		----------
+
+		x : numpy array
+			Frames to be stored
+
+		dtype : numpy dtype or None
+			Storage dtype as returned by compact_dtype
+	"""
+
+	if dtype is None or x.dtype == dtype:
+		return x
+
+	if dtype == np.uint8:
+		return np.rint(np.clip(x, 0, 1) * 255).astype(np.uint8)
+
+	return x.astype(dtype)
+
+def from_compact(x: np.ndarray, dtype: np.dtype) -> np.ndarray:
+
+	"""Converts frames stored on its compact representation into float32
+		frames normalized as they were before being stored
+
+		Parameters
+		----------
+
+		x : numpy array
+			Stored frames
+
+		dtype : numpy dtype or None
+			Storage dtype as returned by compact_dtype
+	"""
+
+	if dtype is None:
+		return x
+
+	if dtype == np.uint8:
+		return x.astype(np.float32) / np.float32(255)
+
+	return x.astype(np.float32)
+
+def fingerprint(fn) -> str:
+
+	"""Computes a digest identifying the operations performed by a function
+		so that the data produced by two functions can be compared without
+		calling them.
+
+		The digest is computed from the function's bytecode, constants,
+		default values and the values of the simple global and nonlocal
+		variables referenced by the function (numbers, strings, ...), so that
+		changing for example the target size of a resize function produces
+		a different fingerprint.
+
+		Parameters
+		----------
+
+		fn : callable or None
+			Function to be fingerprinted
+
+		Return
+		------
+		str with the hexadecimal digest
+	"""
+
+	digest = hashlib.sha1()
+	_update_fingerprint(digest, fn, set())
+
+	return digest.hexdigest()
+
+def _update_fingerprint(digest, obj, visited: set):
+
+	# Simple values are hashed by their representation
+	if obj is None or isinstance(obj, (bool, int, float, complex, str, bytes)):
+		digest.update(repr(obj).encode())
+		return
+
+	if isinstance(obj, (tuple, list, frozenset)):
+		digest.update(type(obj).__name__.encode())
+		for x in obj:
+			_update_fingerprint(digest, x, visited)
+		return
+
+	if isinstance(obj, np.ndarray):
+		digest.update(repr((obj.dtype.str, obj.shape)).encode())
+		digest.update(np.ascontiguousarray(obj).tobytes())
+		return
+
+	# Avoid infinite recursion on recursive functions
+	if id(obj) in visited:
+		digest.update(b'<recursion>')
+		return
+
+	visited.add(id(obj))
+
+	if isinstance(obj, functools.partial):
+		_update_fingerprint(digest, obj.func, visited)
+		_update_fingerprint(digest, obj.args, visited)
+		_update_fingerprint(digest, tuple(sorted(obj.keywords.items())),
+																	visited)
+
+	elif hasattr(obj, '__code__'):
+		# Python function: hash its code and the referenced values
+		code = obj.__code__
+		_update_code_fingerprint(digest, code)
+		_update_fingerprint(digest, obj.__defaults__, visited)
+
+		fn_globals = getattr(obj, '__globals__', {})
+		for name in _code_names(code):
+			if name in fn_globals:
+				digest.update(name.encode())
+				_update_fingerprint(digest, fn_globals[name], visited)
+
+		for cell in (obj.__closure__ or ()):
+			try:
+				_update_fingerprint(digest, cell.cell_contents, visited)
+			except ValueError:
+				# Empty cell
+				digest.update(b'<empty>')
+
+	elif callable(obj) and not hasattr(obj, '__name__'):
+		# Callable object: hash its class and its simple attributes
+		_update_fingerprint(digest, type(obj), visited)
+
+		if hasattr(obj, '__dict__'):
+			_update_fingerprint(digest, tuple(sorted(
+						(k, v) for k, v in vars(obj).items()
+						if isinstance(v, (bool, int, float, str, tuple)))),
+								visited)
+
+	else:
+		# Modules, builtins, classes, ... are identified by their name
+		digest.update('{}.{}'.format(getattr(obj, '__module__', ''),
+								getattr(obj, '__qualname__',
+									getattr(obj, '__name__',
+										type(obj).__name__))).encode())
+
+def _update_code_fingerprint(digest, code):
+
+	digest.update(code.co_code)
+
+	for const in code.co_consts:
+		if hasattr(const, 'co_code'):
+			_update_code_fingerprint(digest, const)
+		else:
+			digest.update(repr(const).encode())
+
+	digest.update(repr(code.co_names).encode())
+
+def _code_names(code) -> list:
+
+	"""Returns all the global names referenced by a code object and its
+		nested code objects
+	"""
+
+	names = list(code.co_names)
+
+	for const in code.co_consts:
+		if hasattr(const, 'co_code'):
+			names.extend(_code_names(const))
+
+	return names
+
+class FramesDiskCache:
+
+	"""Persistent on-disk store of the preprocessed frames of videos.
+
+		The frames of each video are stored as a numpy array file which is
+		memory-mapped on later accesses, so that the decoding and
+		preprocessing of the video frames is only performed once.
+
+		Each stored video is identified by a key computed from the video
+		path, the name, modification time and size of each frame file and
+		any other parameter affecting the preprocessed data (e.g. the
+		fingerprint of the preprocessing function), so the stored frames are
+		discarded whenever any of them change.
+
+		Parameters
+		----------
+
+		cache_dir: str
+			Directory where the preprocessed frames are stored
+	"""
+
+	def __init__(self, cache_dir: str):
+
+		# Check input
+		if not isinstance(cache_dir, str) or not cache_dir:
+			raise ValueError('"cache_dir" must be a valid directory path')
+
+		os.makedirs(cache_dir, exist_ok=True)
+
+		# Private attributes
+		self.__cache_dir = cache_dir
+		self.__opened = {}	# Arrays already mapped for each key
+		self.__lock = threading.Lock()
+		self.__key_locks = {} # Locks avoiding to store a key concurrently
+
+	### Observers
+
+	@property
+	def cache_dir(self):
+		return self.__cache_dir
+
+	def video_key(self, video: str, frames: list or tuple, *params) -> str:
+
+		"""Computes the key identifying the preprocessed frames of a video
+
+			Parameters
+			----------
+
+			video : str
+				Path of the video directory containing the frames files
+
+			frames : list or tuple of str
+				Names of the video frame files in the order they are stored
+
+			params : Any number of simple values (str, int, float, ...)
+				Extra parameters identifying the preprocessing performed
+		"""
+
+		digest = hashlib.sha1()
+		digest.update(os.path.abspath(video).encode())
+
+		for f in frames:
+			st = os.stat(os.path.join(video, f))
+			digest.update(repr((f, st.st_mtime_ns, st.st_size)).encode())
+
+		digest.update(repr(params).encode())
+
+		return digest.hexdigest()
+
+	def get(self, key: str, load_fn) -> np.ndarray:
+
+		"""Returns the read-only memory-mapped frames stored under a key.
+			If no frames are stored, they are retrieved by calling load_fn
+			and stored for later accesses
+
+			Parameters
+			----------
+
+			key : str
+				Key identifying the frames
+
+			load_fn : function
+				Function with no arguments returning a numpy array with the
+				frames to be stored when the key is not found
+		"""
+
+		with self.__lock:
+			if key in self.__opened:
+				return self.__opened[key]
+
+			key_lock = self.__key_locks.setdefault(key, threading.Lock())
+
+		# Only one thread stores the frames while the others wait for them
+		with key_lock:
+			return self.__get(key, load_fn)
+
+	def __get(self, key: str, load_fn) -> np.ndarray:
+
+		with self.__lock:
+			if key in self.__opened:
+				return self.__opened[key]
+
+		filename = os.path.join(self.__cache_dir, key + '.npy')
+
+		if not os.path.isfile(filename):
+
+			frames = load_fn()
+
+			# Write into a temporary file and move it so that no other
+			# process can map a partially written file
+			fd, tmp_filename = tempfile.mkstemp(suffix='.npy',
+												dir=self.__cache_dir)
+			try:
+				with os.fdopen(fd, 'wb') as f:
+					np.save(f, frames)
+
+				os.replace(tmp_filename, filename)
+			except:
+				if os.path.isfile(tmp_filename):
+					os.remove(tmp_filename)
+				raise
+
+		frames = np.load(filename, mmap_mode='r')
+
+		with self.__lock:
+			self.__opened[key] = frames
+
+		return frames
+
+	def clear(self):
+
+		"""Removes all the frames stored on the cache directory
+		"""
+
+		with self.__lock:
+			self.__opened = {}
+
+			for f in os.listdir(self.__cache_dir):
+				if f.endswith('.npy'):
+					os.remove(os.path.join(self.__cache_dir, f))
+
+	### Copy and serialization
+
+	def __deepcopy__(self, memo):
+		# The cache is shared among all the copies of the generators using it
+		return self
+
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state['_FramesDiskCache__opened'] = {}
+		state['_FramesDiskCache__key_locks'] = {}
+		del state['_FramesDiskCache__lock']
+
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self.__lock = threading.Lock()
+
+class FramesLRUCache:
+
+	"""In-memory store of single preprocessed frames bounded by the memory
+		taken by them, where the least recently used frames are discarded
+		first when the bound is exceeded.
+
+		Each frame is stored under a key made up of the path of its file,
+		its index on the file and a fingerprint of the preprocessing
+		performed, so that the frames shared by overlapping cuboids, several
+		generators or several partitions of a generator are only decoded
+		once. Frames files are not expected to change while stored.
+
+		Parameters
+		----------
+
+		max_bytes : int (default 0)
+			Max memory taken by the stored frames. If 0, no frame is stored
+	"""
+
+	def __init__(self, max_bytes: int=0):
+
+		# Check input
+		if not isinstance(max_bytes, int) or max_bytes < 0:
+			raise ValueError('"max_bytes" must be a non-negative integer')
+
+		# Private attributes
+		self.__max_bytes = max_bytes
+		self.__frames = OrderedDict()
+		self.__nbytes = 0
+		self.__hits = 0
+		self.__misses = 0
+		self.__lock = threading.Lock()
+
+	### Observers
+
+	@property
+	def max_bytes(self):
+		return self.__max_bytes
+
+	@property
+	def nbytes(self):
+		return self.__nbytes
+
+	@property
+	def hits(self):
+		return self.__hits
+
+	@property
+	def misses(self):
+		return self.__misses
+
+	@property
+	def stats(self):
+
+		"""Returns the number of frames stored, the memory they take and the
+			number of hits and misses
+		"""
+
+		with self.__lock:
+			return {'frames': len(self.__frames), 'nbytes': self.__nbytes,
+					'hits': self.__hits, 'misses': self.__misses}
+
+	def __len__(self):
+		return len(self.__frames)
+
+	def get(self, key: tuple) -> np.ndarray:
+
+		"""Returns the read-only frame stored under a key or None if it is
+			not stored
+		"""
+
+		with self.__lock:
+			frame = self.__frames.get(key)
+
+			if frame is None:
+				self.__misses += 1
+			else:
+				self.__hits += 1
+				self.__frames.move_to_end(key)
+
+		return frame
+
+	def put(self, key: tuple, frame: np.ndarray):
+
+		"""Stores a copy of a frame under a key, discarding the least recently
+			used frames if the max memory is exceeded
+		"""
+
+		if frame.nbytes > self.__max_bytes:
+			return
+
+		frame = frame.copy()
+		frame.flags.writeable = False
+
+		with self.__lock:
+			old = self.__frames.pop(key, None)
+
+			if old is not None:
+				self.__nbytes -= old.nbytes
+
+			self.__frames[key] = frame
+			self.__nbytes += frame.nbytes
+			self.__evict()
+
+	def __evict(self):
+
+		while self.__nbytes > self.__max_bytes:
+			self.__nbytes -= self.__frames.popitem(last=False)[1].nbytes
+
+	def clear(self):
+
+		"""Discards all the stored frames and resets the hits and misses
+		"""
+
+		with self.__lock:
+			self.__frames.clear()
+			self.__nbytes = 0
+			self.__hits = 0
+			self.__misses = 0
+
+	### Modifiers
+
+	@max_bytes.setter
+	def max_bytes(self, v):
+
+		if not isinstance(v, int) or v < 0:
+			raise ValueError('"max_bytes" must be a non-negative integer')
+
+		with self.__lock:
+			self.__max_bytes = v
+			self.__evict()
+
+	### Copy and serialization
+
+	def __deepcopy__(self, memo):
+		# The cache is shared among all the copies of the generators using it
+		return self
+
+	def __getstate__(self):
+		return {'max_bytes': self.__max_bytes}
+
+	def __setstate__(self, state):
+		self.__init__(state['max_bytes'])
+
+# Frames cache consulted by all the cuboids generators of the process, which
+# is disabled until its max memory is set
+_shared_frames_cache = FramesLRUCache()
+
+def shared_frames_cache() -> FramesLRUCache:
+
+	"""Returns the frames cache shared by all the cuboids generators of the
+		process. No frame is stored until its max_bytes is set
+	"""
+
+	return _shared_frames_cache
+
+class SourceManifest:
+
+	"""Index of the contents of a dataset directory (frames files of each
+		video folder, frames count of each video file, ...) stored as a JSON
+		file, so that the contents of each dataset entry are only scanned
+		when the entry changes.
+
+		Each entry is noted with a stamp (e.g. its modification time and size)
+		and its scanned contents, which are scanned again when the stamp of
+		the entry changes.
+
+		Parameters
+		----------
+
+		filename: str
+			Path of the JSON file where the manifest is stored
+
+		source: str
+			Dataset directory indexed by the manifest
+
+		kind: str
+			Kind of contents indexed by the manifest. The manifest is discarded
+			if it was stored for a different directory or kind of contents
+	"""
+
+	VERSION = 1
+
+	def __init__(self, filename: str, source: str, kind: str):
+
+		# Check input
+		if not isinstance(filename, str) or not filename:
+			raise ValueError('"filename" must be a valid file path')
+
+		if not isinstance(source, str) or not source:
+			raise ValueError('"source" must be a valid directory path')
+
+		if not isinstance(kind, str) or not kind:
+			raise ValueError('"kind" must be a non empty string')
+
+		# Private attributes
+		self.__filename = filename
+		self.__header = {'version': SourceManifest.VERSION,
+							'source': os.path.abspath(source), 'kind': kind}
+		self.__entries = {}
+		self.__accessed = set()
+		self.__modified = False
+
+		# Load the stored manifest
+		if os.path.isfile(filename):
+			try:
+				with open(filename) as f:
+					stored = json.load(f)
+
+				if stored['header'] == self.__header:
+					self.__entries = stored['entries']
+				else:
+					self.__modified = True
+
+			except (OSError, ValueError, KeyError, TypeError):
+				warnings.warn('Manifest "{}" could not be read and will be'\
+													' rebuilt'.format(filename))
+				self.__modified = True
+		else:
+			self.__modified = True
+
+	### Observers
+
+	@property
+	def filename(self):
+		return self.__filename
+
+	def get(self, name: str, stamp: list or tuple, scan_fn):
+
+		"""Returns the contents noted for an entry if its stamp has not
+			changed or scans them again with scan_fn and notes them otherwise
+
+			Parameters
+			----------
+
+			name : str
+				Name of the entry
+
+			stamp : list or tuple of simple values (int, str, ...)
+				Values identifying the current state of the entry
+
+			scan_fn : function
+				Function with no arguments returning the JSON serializable
+				contents of the entry
+		"""
+
+		stamp = list(stamp)
+		entry = self.__entries.get(name)
+
+		self.__accessed.add(name)
+
+		if entry is None or entry['stamp'] != stamp:
+			entry = {'stamp': stamp, 'contents': scan_fn()}
+			self.__entries[name] = entry
+			self.__modified = True
+
+		return entry['contents']
+
+	### Modifiers
+
+	def save(self):
+
+		"""Stores the manifest if any entry was scanned, removing the entries
+			which were not accessed. A warning is emitted if the manifest
+			cannot be written (e.g. read-only datasets directories)
+		"""
+
+		if set(self.__entries) - self.__accessed:
+			self.__entries = {k: v for k, v in self.__entries.items()
+														if k in self.__accessed}
+			self.__modified = True
+
+		if not self.__modified:
+			return
+
+		# Write into a temporary file and move it so that no other
+		# process can read a partially written manifest
+		try:
+			fd, tmp_filename = tempfile.mkstemp(suffix='.json',
+							dir=os.path.dirname(os.path.abspath(self.__filename)))
+		except OSError as e:
+			warnings.warn('Manifest "{}" could not be stored: {}'.format(
+															self.__filename, e))
+			return
+
+		try:
+			with os.fdopen(fd, 'w') as f:
+				json.dump({'header': self.__header, 'entries': self.__entries},
+																			f)
+
+			os.replace(tmp_filename, self.__filename)
+		except:
+			if os.path.isfile(tmp_filename):
+				os.remove(tmp_filename)
+			raise
+
+		self.__modified = False
@@ -16,15 +16,410 @@
 # Imported modules
 from sys import float_info
 import os
+import json
+import tempfile
 import warnings
 import random
-from copy import copy, deepcopy
+from copy import copy
+from collections import OrderedDict, namedtuple
 import imghdr
+import threading
+import time
+import weakref
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from cv2 import VideoCapture
+from numpy.lib.stride_tricks import sliding_window_view
+from numpy.lib.format import open_memmap
+from cv2 import VideoCapture, imread, setNumThreads as cv2_set_num_threads
 from tensorflow.keras.utils import Sequence
+from tensorflow import data as tf_data
+from tensorflow import numpy_function as tf_numpy_function
+from tensorflow import shape as tf_shape
 from tensorflow.keras.preprocessing.image import load_img, img_to_array
 from utils import make_partitions
+from .cache import (FramesDiskCache, SourceManifest, MANIFEST_FNAME,
+					fingerprint, compact_dtype, to_compact, from_compact,
+					shared_frames_cache)
+
+# File name of the index of the packed datasets
+PACKED_INDEX_FNAME = 'index.json'
+PACKED_FORMAT_VERSION = 1
+
+# Thread pools shared by all the generators for the concurrent loading of
+# frames and cuboids (one pool for each number of workers)
+_thread_pools = {}
+_thread_pools_lock = threading.Lock()
+
+def _get_thread_pool(workers: int) -> ThreadPoolExecutor:
+
+	"""Returns the thread pool shared by all the generators configured
+		with the given number of workers
+	"""
+
+	with _thread_pools_lock:
+		if workers not in _thread_pools:
+			_thread_pools[workers] = ThreadPoolExecutor(max_workers=workers,
+										thread_name_prefix='cuboids_loader')
+
+		return _thread_pools[workers]
+
+def _reset_thread_pools():
+
+	"""Discards the thread pools inherited by a forked process, whose threads
+		do not exist on the child process
+	"""
+
+	global _thread_pools_lock
+
+	_thread_pools.clear()
+	_thread_pools_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+	os.register_at_fork(after_in_child=_reset_thread_pools)
+
+class _WindowPrefetcher:
+
+	"""Loader of the next window of cuboids of a generator on a background
+		thread, so that the window is already loaded when it's accessed.
+
+		Only one window is loaded at the same time and no window is loaded
+		by the consumer while the background loading is in progress, so
+		the cuboids loading doesn't need to be thread-safe.
+	"""
+
+	def __init__(self):
+
+		self.__executor = None
+		self.__pending = None	# Cuboids and future of the window in progress
+
+		# Statistics
+		self.__windows = 0		# Number of windows accessed
+		self.__prefetched = 0	# Number of windows accessed already prefetched
+		self.__wait_time = 0.	# Time waited by the consumer for the windows
+
+	@property
+	def stats(self):
+		return {'windows': self.__windows, 'prefetched': self.__prefetched,
+				'wait_time': self.__wait_time}
+
+	def load(self, load_fn, cuboids: list) -> np.ndarray:
+
+		"""Returns the window containing the given cuboids, taking it from
+			the window loaded on background if it contains the same cuboids
+			or loading it with load_fn otherwise
+		"""
+
+		t_start = time.perf_counter()
+
+		window = None
+
+		if self.__pending is not None:
+
+			pend_cuboids, future = self.__pending
+			self.__pending = None
+
+			if pend_cuboids == cuboids:
+				window = future.result()
+				self.__prefetched += 1
+			else:
+				_wait_discarded(future)
+
+		if window is None:
+			window = load_fn(cuboids)
+
+		self.__windows += 1
+		self.__wait_time += time.perf_counter() - t_start
+
+		return window
+
+	def schedule(self, load_fn, cuboids: list):
+
+		"""Starts the loading of the window containing the given cuboids on
+			background with load_fn
+		"""
+
+		self.discard()
+
+		if self.__executor is None:
+			self.__executor = ThreadPoolExecutor(max_workers=1,
+										thread_name_prefix='cuboids_prefetch')
+
+		self.__pending = (cuboids, self.__executor.submit(load_fn, cuboids))
+
+	def discard(self):
+
+		"""Discards the window being loaded on background
+		"""
+
+		if self.__pending is not None:
+			_wait_discarded(self.__pending[1])
+			self.__pending = None
+
+	def shutdown(self):
+
+		"""Discards the window being loaded and stops the background thread
+		"""
+
+		self.discard()
+
+		if self.__executor is not None:
+			self.__executor.shutdown()
+			self.__executor = None
+
+	### Copy and serialization
+
+	def __deepcopy__(self, memo):
+		# Each copy of a generator prefetchs its own windows
+		return _WindowPrefetcher()
+
+	def __getstate__(self):
+		return {}
+
+	def __setstate__(self, state):
+		self.__init__()
+
+def _wait_discarded(future):
+
+	"""Cancels the loading of a discarded window or waits for it to finish
+		if already started. Errors raised by discarded windows are ignored
+	"""
+
+	if not future.cancel():
+		try:
+			future.result()
+		except Exception:
+			pass
+
+class _CapturePool:
+
+	"""Pool of opened video captures which are reused for reading the frames
+		of the videos sequentially, avoiding seeking the videos frames when
+		possible. The least recently used captures are released when more
+		than max_captures videos are opened.
+	"""
+
+	# Max number of frames skipped by reading them instead of seeking
+	MAX_SKIPPED_FRAMES = 64
+
+	def __init__(self, max_captures: int):
+
+		self.__max_captures = max_captures
+		self.__captures = OrderedDict() # Opened capture and next frame index
+
+	def read(self, fname: str, frames: list, process_fn=None,
+											store_fn=None) -> dict:
+
+		"""Reads the given sorted frames indexes of a video file and returns
+			a dict with each frame (processed by process_fn if given). If
+			store_fn is given, each frame is passed to store_fn with its
+			index as read instead of being returned
+		"""
+
+		if fname in self.__captures:
+			self.__captures.move_to_end(fname)
+		else:
+			vid = VideoCapture(fname)
+
+			if not vid.isOpened():
+				raise ValueError('Cannot load frames {} from video '\
+										'file {}'.format(frames, fname))
+
+			self.__captures[fname] = [vid, 0]
+
+			if len(self.__captures) > self.__max_captures:
+				self.__captures.popitem(last=False)[1][0].release()
+
+		capture = self.__captures[fname]
+		ret = {}
+
+		try:
+			for f in frames:
+
+				# Skip the frames between the following desired frame by
+				# reading them or seeking the frame if far away
+				if f < capture[1] or f - capture[1] > self.MAX_SKIPPED_FRAMES:
+					capture[0].set(1, f)
+					capture[1] = f
+
+				while capture[1] < f:
+					capture[0].grab()
+					capture[1] += 1
+
+				ok, fr = capture[0].read()
+
+				if not ok:
+					raise ValueError('Failed to load frame {} from video '\
+													'file {}'.format(f, fname))
+
+				capture[1] += 1
+				fr = process_fn(fr) if process_fn else fr
+
+				if store_fn is not None:
+					store_fn(f, fr)
+				else:
+					ret[f] = fr
+		except:
+			# The capture position is uncertain
+			del self.__captures[fname]
+			capture[0].release()
+			raise
+
+		return ret
+
+	def release(self):
+
+		"""Releases all the opened captures
+		"""
+
+		for capture in self.__captures.values():
+			capture[0].release()
+
+		self.__captures.clear()
+
+	### Copy and serialization
+
+	def __deepcopy__(self, memo):
+		# Opened captures cannot be shared
+		return _CapturePool(self.__max_captures)
+
+	def __getstate__(self):
+		return {'max_captures': self.__max_captures}
+
+	def __setstate__(self, state):
+		self.__init__(state['max_captures'])
+
+# Cuboid of consecutive frames of a video separated by a stride, whose frames
+# are computed when accessed (see CuboidsGenerator.augment_data)
+_StridedCuboid = namedtuple('_StridedCuboid', ('video', 'start', 'end',
+																'stride'))
+
+class _FramesStore:
+
+	"""Store of the decoded frames of the videos, as they are stored on
+		memory by a generator, from which any cuboid of the videos can be
+		assembled without decoding its frames again. The frames of each
+		video are loaded the first time they are required and the store is
+		shared among the copies of the generators.
+
+		The store is bounded by the memory taken by the frames, discarding
+		the least recently used videos first when the bound is exceeded. The
+		videos taking more than the bound are returned without being stored
+
+		Parameters
+		----------
+
+		max_bytes : int (default None)
+			Max memory taken by the stored frames. If None, the frames of
+			all the videos required are stored
+	"""
+
+	def __init__(self, max_bytes: int=None):
+
+		self.__max_bytes = max_bytes
+		self.__frames = OrderedDict()
+		self.__nbytes = 0
+		self.__lock = threading.Lock()
+		self.__video_locks = {} # Locks of the videos being loaded
+
+	@property
+	def nbytes(self):
+		return self.__nbytes
+
+	@property
+	def max_bytes(self):
+		return self.__max_bytes
+
+	@max_bytes.setter
+	def max_bytes(self, value: int):
+
+		with self.__lock:
+			self.__max_bytes = value
+			self.__evict()
+
+	def __len__(self):
+		return len(self.__frames)
+
+	def get(self, video: str, load_fn) -> np.ndarray:
+
+		"""Returns the frames of a video, loading them with load_fn if they
+			are not stored yet. Each video is only loaded once when several
+			threads require it concurrently
+		"""
+
+		with self.__lock:
+			frames = self.__frames.get(video)
+
+			if frames is not None:
+				self.__frames.move_to_end(video)
+				return frames
+
+			lock = self.__video_locks.setdefault(video, threading.Lock())
+
+		with lock:
+			with self.__lock:
+				frames = self.__frames.get(video)
+
+			if frames is None:
+				frames = load_fn(video)
+
+				if not self.__put(video, frames):
+					warnings.warn('The decoded frames of "{}" take {} bytes,'\
+								' over the {} bytes held for the frames of the'\
+								' virtual augmented cuboids, so that they are'\
+								' decoded again each time they are required'\
+								' and the memory budget is exceeded while they'\
+								' are used'.format(video, frames.nbytes,
+															self.__max_bytes))
+
+		return frames
+
+	def __put(self, video: str, frames: np.ndarray) -> bool:
+
+		"""Stores the frames of a video unless they take more than the max
+			memory
+
+			Return: Whether the frames were stored
+		"""
+
+		with self.__lock:
+
+			if self.__max_bytes is not None and frames.nbytes > self.__max_bytes:
+				return False
+
+			self.__frames[video] = frames
+			self.__nbytes += frames.nbytes
+			self.__evict()
+
+		return True
+
+	def __evict(self):
+
+		# The least recently used videos are discarded first
+		while self.__max_bytes is not None and self.__nbytes > self.__max_bytes:
+			self.__nbytes -= self.__frames.popitem(last=False)[1].nbytes
+
+	def clear(self):
+
+		"""Releases all the stored frames
+		"""
+
+		with self.__lock:
+			self.__frames.clear()
+			self.__nbytes = 0
+
+	### Copy and serialization
+
+	def __deepcopy__(self, memo):
+		# The stored frames are only read so they can be shared
+		return self
+
+	def __getstate__(self):
+		return {'max_bytes': self.__max_bytes}
+
+	def __setstate__(self, state):
+		self.__init__(state['max_bytes'])
 
 class CuboidsGenerator(Sequence):
 
@@ -50,11 +445,49 @@ class CuboidsGenerator(Sequence):
 		max_cuboids: int (default 100)
 			Max number of consecutive cuboids to be retrieved from disk when
 			the generator flows cuboids from the videos
+
+		workers: int (default 1)
+			Number of threads used for decoding and preprocessing the frames
+			and cuboids concurrently when the cuboids are retrieved from disk
+
+		prefetch: bool (default False)
+			Load the next max_cuboids cuboids on a background thread while
+			the current ones are consumed. Note that up to twice max_cuboids
+			cuboids are held on RAM when enabled
+
+		manifest: bool or str (default False)
+			Store the scanned contents of the source directory on a manifest
+			file so that only the videos changed since the last scan are
+			scanned again. If True, the manifest is stored on the source
+			directory, otherwise the path of the manifest file can be passed
+
+		storage_dtype: str (optional)
+			Store the loaded frames compactly as "uint8" or "float16" and
+			convert them into float32 when the cuboids are retrieved. Frames
+			stored as "uint8" must be normalized in [0, 1] by prep_fn and
+			are retrieved with a precision of 1/255
+
+		batch_prep_fn: function (optional)
+			Function containing preprocessing operations applied at once to
+			a whole stack of video frames shaped (frames, height, width,
+			channels) after prep_fn is applied to each frame. It must return
+			a stack with the same number of frames
+
+		max_bytes: int (optional)
+			Max number of bytes taken by the cuboids held on memory. The
+			number of cuboids loaded at once (at most max_cuboids) is sized
+			from the memory taken by each cuboid, measured on the first load,
+			and the held cuboids are replaced as a whole. When prefetch is
+			enabled, the budget is shared by the current and the next loads.
+			The decoded frames held for the virtual augmented cuboids (see
+			augment_data) take at most half of the budget
 	"""
 
 	def __init__(self, source: str, cub_frames: int, prep_fn=None,
 					batch_size=1, max_cuboids: int=300, shuffle=False,
-					seed=None, return_cub_as_label=False):
+					seed=None, return_cub_as_label=False, workers: int=1,
+					prefetch: bool=False, manifest=False, storage_dtype=None,
+					batch_prep_fn=None, max_bytes: int=None):
 
 		# Check input
 		if not isinstance(source, str) or not source:
@@ -66,6 +499,9 @@ class CuboidsGenerator(Sequence):
 		if prep_fn and not callable(prep_fn):
 			raise ValueError('"prep_fn" is not callable')
 
+		if batch_prep_fn and not callable(batch_prep_fn):
+			raise ValueError('"batch_prep_fn" is not callable')
+
 		if not isinstance(batch_size, int):
 			raise TypeError('"batch_size" must be integer')
 
@@ -84,6 +520,22 @@ class CuboidsGenerator(Sequence):
 		if not isinstance(return_cub_as_label, bool):
 			raise ValueError('"return_cub_as_label" must be boolean')
 
+		if not isinstance(workers, int) or workers <= 0:
+			raise ValueError('"workers" must be an integer greater than 0')
+
+		if not isinstance(prefetch, bool):
+			raise ValueError('"prefetch" must be boolean')
+
+		if not isinstance(manifest, (bool, str)) or manifest == '':
+			raise ValueError('"manifest" must be boolean or a valid file path')
+
+		storage_dtype = compact_dtype(storage_dtype)
+
+		if max_bytes is not None and (not isinstance(max_bytes, int) or
+																max_bytes <= 0):
+			raise ValueError('"max_bytes" must be None or an integer greater'\
+																' than 0')
+
 		if batch_size and max_cuboids < batch_size:
 			raise ValueError('The batch size cannot be greater than the '\
 																'max cuboids')
@@ -92,10 +544,25 @@ class CuboidsGenerator(Sequence):
 		self.__source = source
 		self.__cub_frames = cub_frames
 		self.__prep_fn = prep_fn
+		self.__batch_prep_fn = batch_prep_fn
 		self.__batch_size = batch_size
 		self.__max_cuboids = max_cuboids
 		self.__return_cub_as_label = return_cub_as_label
 		self.__shuffle = False
+		self.__workers = workers
+		self.__prefetch = prefetch
+		self.__prefetcher = _WindowPrefetcher()
+		self.__frames_store = None # Decoded frames for virtual augmentation
+
+		if manifest is True:
+			self.__manifest = os.path.join(source, MANIFEST_FNAME)
+		else:
+			self.__manifest = manifest or None
+
+		self.__storage_dtype = storage_dtype
+		self.__max_bytes = max_bytes
+		self.__cuboid_bytes = None	# Memory taken by each loaded cuboid
+		self.__frames_fps = {}		# Fingerprint of the stored frames
 
 		# Maximum number of batches to load from disk
 		self.__max_batch = self.__max_cuboids // self.__batch_size
@@ -129,6 +596,17 @@ class CuboidsGenerator(Sequence):
 		"""
 		raise NotImplementedError()
 
+	def _open_manifest(self, kind: str):
+
+		"""Returns the manifest of the source directory contents or None
+			if no manifest is used
+		"""
+
+		if self.__manifest is None:
+			return None
+
+		return SourceManifest(self.__manifest, self.__source, kind)
+
 	def _load_cuboid(self, cuboid: tuple, prep_fn=None):
 
 		"""Loads a cuboid from its video frames files
@@ -137,128 +615,555 @@ class CuboidsGenerator(Sequence):
 		"""
 		raise NotImplementedError()
 
-	def _update_video_info(self):
-
-		raise NotImplementedError()
+	def _load_cuboids(self, cuboids: list or tuple) -> np.ndarray:
 
-	### Observers
+		"""Loads several cuboids from its video frames files keeping its order.
+			The cuboids are loaded concurrently by the worker threads if
+			more than one worker is configured.
 
-	@property
-	def return_cub_as_label(self):
-		return self.__return_cub_as_label
+			@note Derived classes whose _load_cuboid method is not thread-safe
+				or makes use of the worker threads must reimplement this method
+		"""
 
-	@property
-	def batch_size(self):
-		return self.__batch_size
+		if self.__workers > 1 and len(cuboids) > 1:
+			pool = _get_thread_pool(self.__workers)
+			return np.array(list(pool.map(
+						lambda cub: to_compact(self._load_cuboid(cub,
+															self.__prep_fn),
+												self.__storage_dtype),
+						cuboids)))
 
-	@property
-	def source(self):
-		return self.__source
+		return np.array([to_compact(self._load_cuboid(cub, self.__prep_fn),
+									self.__storage_dtype) for cub in cuboids])
 
-	@property
-	def cub_frames(self):
-		return self.__cub_frames
+	def _read_cuboids(self, cuboids: list or tuple) -> np.ndarray:
 
-	@property
-	def prep_fn(self):
-		return self.__prep_fn
+		"""Loads several cuboids as they are stored on memory without
+			modifying the state of the generator, so that it can be called
+			concurrently from several threads.
 
-	@property
-	def max_cuboids(self):
-		return self.__max_cuboids
+			@note Derived classes whose _load_cuboids method is not thread-safe
+				must reimplement this method
+		"""
 
-	@property
-	def video_info(self):
-		return tuple(self._video_info)
+		return self._load_cuboids(cuboids)
 
-	def is_shuffled(self):
-		return self.__shuffle
+	def _cuboid_frames(self, cuboid: tuple) -> tuple:
 
-	def __len__(self) -> int:
+		"""Returns the video of a cuboid and the indexes of its frames on
+			the frames returned by _load_video
 
-		"""Returns the number of cuboids to be retrievable or batches of cuboids
-			if batch_size where specified
+			@note This method should be reimplemented on the derived class
 		"""
+		raise NotImplementedError()
 
-		return np.ceil(len(self._access_cuboids) / self.__batch_size).astype(int)
+	def _load_video(self, video: str) -> np.ndarray:
 
-	def n__getitem__(self, idx) -> np.ndarray:
+		"""Loads all the frames of a video as they are stored on memory
 
-		""" Retrieves the cuboid located at index or the cuboids batch wheter
-			batch_size has been provided
+			@note This method should be reimplemented on the derived class
 		"""
+		raise NotImplementedError()
 
+	def _strided_frames(self, start: int, end: int, stride: int) -> list:
+
+		"""Returns the indexes of the frames of a cuboid taken from the
+			frames in [start, end] separated by the stride, repeating the
+			last frame if a complete cuboid cannot be taken
 		"""
-		if idx < 0 or idx >= len(self):
-			raise IndexError('index out of range')
 
-		cub_idx = self.__batch_size * idx
+		frames = list(range(start, end + 1, stride))[:self.__cub_frames]
+		frames.extend([frames[-1]]*(self.__cub_frames - len(frames)))
 
-		# Check if desired cuboid is not loaded on RAM and retrieves
-		# it from directory
-		if (self._cuboids is None or not
-									(cub_idx >= self.__loaded_cub_range[0] and
-									cub_idx < self.__loaded_cub_range[1])):
+		return frames
 
+	def __load_window(self, cuboids: list or tuple,
+										load_fn=None) -> np.ndarray:
 
-			self.__loaded_cub_range[0] = cub_idx
-			self.__loaded_cub_range[1] = min(cub_idx + self.__max_batch *
-														self.__batch_size,
-											len(self._access_cuboids))
+		"""Loads several cuboids as they are stored on memory, assembling
+			the virtual augmented cuboids from the decoded frames of their
+			videos and loading the rest of cuboids by load_fn (by default
+			_load_cuboids)
+		"""
 
+		if load_fn is None:
+			load_fn = self._load_cuboids
 
-			self._cuboids = np.array([
-				type(self)._load_cuboid(
-					self._access_cuboids[i],
-					self.__prep_fn) for i in range(
-						self.__loaded_cub_range[0], self.__loaded_cub_range[1])
-				])
+		strided = [i for i, cub in enumerate(cuboids)
+										if isinstance(cub, _StridedCuboid)]
 
-			# Normalize cuboids
-			#self._cuboids = (self._cuboids - self._cuboids.mean()) / self._cuboids.std()
+		if not strided:
+			return load_fn(cuboids)
 
-		# The desired cuboid/vatch is actually stored on RAM and can be returned
-		start = cub_idx - self.__loaded_cub_range[0]
-		end = min(start + self.__batch_size, len(self._access_cuboids))
+		if self.__frames_store is None:
+			self.__frames_store = self.__new_frames_store()
 
-		#	If only one cuboid is returned, the cuboid number dimension
-		#	cannot be supresed
-		ret = self._cuboids[start:end]
+		# The cuboids of the videos' frames are loaded as usual
+		loaded = [i for i, cub in enumerate(cuboids)
+									if not isinstance(cub, _StridedCuboid)]
+		ret = None
 
-		if self.__return_cub_as_label:
-			ret = (ret, ret)
+		if loaded:
+			loaded_cubs = load_fn([cuboids[i] for i in loaded])
+			ret = np.empty((len(cuboids), *loaded_cubs.shape[1:]),
+													dtype=loaded_cubs.dtype)
+			ret[loaded] = loaded_cubs
+			del loaded_cubs
+
+		for i in strided:
+
+			cub = cuboids[i]
+			video_frames = self.__frames_store.get(cub.video, self._load_video)
+
+			if ret is None:
+				ret = np.empty((len(cuboids), self.__cub_frames,
+										*video_frames.shape[1:]),
+								dtype=video_frames.dtype)
+
+			ret[i] = video_frames[self._strided_frames(cub.start, cub.end,
+																cub.stride)]
 
 		return ret
+
+	def __new_frames_store(self) -> _FramesStore:
+
+		"""Returns the store of the decoded frames of the virtual augmented
+			cuboids, which takes at most half of the max memory of the
+			generator
 		"""
-		return self.__getslice__(idx, idx+1)
 
-	def __getitem__(self, idx: int):
+		return _FramesStore(None if self.__max_bytes is None else
+													self.__max_bytes // 2)
 
-		"""Retrieves the cuboids or cuboids' batch wheter batch_size is privided
-			from index i to index j
+	def __window_cuboids(self) -> int:
+
+		"""Returns the number of cuboids loaded at once, which are as many
+			batches as fit on the memory budget, if given, and max_cuboids
 		"""
-		if isinstance(idx, int):
-			start, stop, step = idx, idx + 1, 1
-		elif isinstance(idx, slice):
-			start, stop, step = idx.start, idx.stop, idx.step
-		else:
-			raise TypeError('The passed index must be integer or an slice')
 
-		if start >= len(self) or stop > len(self):
-			raise IndexError('Index out of range')
+		if self.__max_bytes is None:
+			return self.__max_batch * self.__batch_size
 
-		if start < 0:
-			start %= len(self)
+		# The first load only takes a batch to measure the cuboids memory
+		if self.__cuboid_bytes is None:
+			return self.__batch_size
 
-		if stop < 0:
-			stop %= len(self)
+		# The decoded frames held for the virtual augmented cuboids and the
+		# cuboids prefetched also take the budget. The share of the frames
+		# is reserved as a whole so that the budget is not exceeded when the
+		# frames are decoded after the cuboids were loaded
+		budget = self.__max_bytes - (self.__frames_store.max_bytes if
+										self.__frames_store is not None else 0)
 
-		if (stop - start) > self.__max_batch:
-			raise RuntimeError('Slice retrived overpass the max number'\
-								' of cuboids retrievable specified')
+		if self.__prefetch:
+			budget //= 2
 
-		start = self.__batch_size * start
-		stop = self.__batch_size * stop
+		batches = budget // (self.__cuboid_bytes * self.__batch_size)
+
+		if batches < 1:
+			warnings.warn('A batch of cuboids takes {} bytes, over the {} bytes'\
+						' of the memory budget left for the loaded cuboids,'\
+						' so that the budget is exceeded by loading a'\
+						' batch'.format(self.__cuboid_bytes * self.__batch_size,
+																max(budget, 0)))
+
+		return max(1, min(self.__max_batch, batches)) * self.__batch_size
+
+	def _read_window(self, cuboids: list or tuple) -> np.ndarray:
+
+		"""Loads several cuboids as they are stored on memory, as done for
+			the loaded windows, without modifying the state of the generator
+			so that it can be called concurrently
+		"""
+
+		return self.__load_window(cuboids, self._read_cuboids)
+
+	def _augment_virtual(self, n_aug_cuboids: int, max_stride: int):
+
+		"""Augments the cuboids with virtual cuboids made up of the frames
+			of each run of consecutive frames covered by the cuboids of each
+			video, separated by strides from 2 to max_stride and starting on
+			each frame offset lower than the stride. The virtual cuboids only
+			note the video, the first and last frame and the stride, and are
+			assembled when accessed from the decoded frames of the videos,
+			which are decoded once for all the cuboids
+
+			Parameters
+			----------
+
+			n_aug_cuboids : int
+				Max number of cuboids to generate or -1 to generate all the
+				possible cuboids
+
+			max_stride : int
+				Max stride applied between the original frames
+		"""
+
+		# Note the runs of consecutive frames covered by the cuboids of each
+		# video, so that the virtual cuboids only take the frames of the
+		# cuboids held by the generator (e.g. not the frames of the cuboids
+		# taken by take_subpartition for another partition)
+		spans = []
+		order = {}		# Videos in order of appearance
+
+		for cub in self._cuboids_info:
+
+			if isinstance(cub, _StridedCuboid):
+				continue
+
+			video, frames = self._cuboid_frames(cub)
+
+			# Only the cuboids of consecutive frames cover their whole span
+			if (np.diff(frames) > 1).any():
+				continue
+
+			order.setdefault(video, len(order))
+			spans.append((order[video], int(frames[0]), int(frames[-1]),
+																		video))
+
+		runs = []
+
+		for _, first, last, video in sorted(spans, key=lambda s: s[:3]):
+
+			if runs and runs[-1][0] == video and first <= runs[-1][2] + 1:
+				runs[-1][2] = max(runs[-1][2], last)
+			else:
+				runs.append([video, first, last])
+
+		# Take the strided cuboids of each run for each stride and offset
+		new_cuboids = []
+
+		for stride in range(2, max_stride + 1):
+			for offset in range(stride):
+				for video, first, last in runs:
+
+					starts = np.arange(first + offset, last + 1,
+												stride*self.__cub_frames)
+					ends = np.minimum(starts + stride*self.__cub_frames,
+												last + 1) - 1
+
+					# Discard the cuboids with less than a frame
+					valid = (ends - starts + 1) >= stride
+
+					new_cuboids.extend(_StridedCuboid(video, s, e, stride)
+										for s, e in zip(starts[valid].tolist(),
+														ends[valid].tolist()))
+
+		if n_aug_cuboids != -1:
+
+			if len(new_cuboids) < n_aug_cuboids:
+				warnings.warn('Only {} new cuboids could be '\
+							'generated with the configuration'\
+							' provided'.format(len(new_cuboids)))
+
+			new_cuboids = new_cuboids[:n_aug_cuboids]
+
+		# Agregate the new cuboids generated to the info and update object
+		self._cuboids_info.extend(new_cuboids)
+		self._access_cuboids = copy(self._cuboids_info)
+		self._cuboids = None
+		self.__prefetcher.discard()
+		self._update_video_info()
+
+		if self.__frames_store is None:
+			self.__frames_store = self.__new_frames_store()
+
+	def _frame_process_fn(self, prep_fn=None):
+
+		"""Returns the function to be applied to each decoded frame, which
+			applies prep_fn and converts the frame into the storage type
+			unless the frames are later preprocessed at once by the batch
+			preprocessing function
+		"""
+
+		if self.__batch_prep_fn is not None:
+			return prep_fn
+
+		return lambda fr: to_compact(prep_fn(fr) if prep_fn else fr,
+														self.__storage_dtype)
+
+	def _stack_frames(self, frames: list or tuple) -> np.ndarray:
+
+		"""Stacks the frames processed by the function returned by
+			_frame_process_fn on a preallocated array and applies the batch
+			preprocessing function, so that the frames are returned as they
+			are stored on memory
+		"""
+
+		stack = np.empty((len(frames), *np.shape(frames[0])),
+												dtype=np.asarray(frames[0]).dtype)
+
+		for i, fr in enumerate(frames):
+
+			if np.shape(fr) != stack.shape[1:]:
+				raise ValueError('Differents sizes for the frames detected')
+
+			stack[i] = fr
+
+		if self.__batch_prep_fn is None:
+			return stack
+
+		prep_stack = self.__batch_prep_fn(stack)
+
+		if len(prep_stack) != len(stack):
+			raise ValueError('"batch_prep_fn" must keep the number of frames')
+
+		return to_compact(prep_stack, self.__storage_dtype)
+
+	def _frames_fingerprint(self, prep_fn=None) -> tuple:
+
+		"""Returns the fingerprint of the frames as they are stored on memory
+			when preprocessed by prep_fn, which identifies them on the
+			shared frames cache
+
+			@note Derived classes decoding frames differently must extend
+				the fingerprint
+		"""
+
+		key = id(prep_fn)
+
+		if key not in self.__frames_fps:
+			self.__frames_fps[key] = (prep_fn, fingerprint(prep_fn),
+						fingerprint(self.__batch_prep_fn) if
+								self.__batch_prep_fn is not None else None,
+						str(self.__storage_dtype))
+
+		return self.__frames_fps[key][1:]
+
+	def _cached_frames(self, frames: list, decode_fn,
+											prep_fn=None) -> np.ndarray:
+
+		"""Returns stacked the given frames, noted as (file path, frame index)
+			pairs, as they are stored on memory. The frames stored on the
+			frames cache shared by the process are taken from it and the
+			remaining ones are decoded by decode_fn, which receives them and
+			returns them stacked, and stored on the cache
+		"""
+
+		frames_cache = shared_frames_cache()
+
+		if not frames_cache.max_bytes:
+			return decode_fn(frames)
+
+		fp = self._frames_fingerprint(prep_fn)
+		stored = [frames_cache.get((path, idx, fp)) for path, idx in frames]
+		missing = [i for i, fr in enumerate(stored) if fr is None]
+
+		if not missing:
+			return np.stack(stored)
+
+		decoded = decode_fn([frames[i] for i in missing])
+
+		for i, fr in zip(missing, decoded):
+			frames_cache.put((*frames[i], fp), fr)
+
+		if len(missing) == len(frames):
+			return decoded
+
+		ret = np.empty((len(frames), *decoded.shape[1:]), dtype=decoded.dtype)
+		ret[missing] = decoded
+
+		for i, fr in enumerate(stored):
+			if fr is not None:
+				ret[i] = fr
+
+		return ret
+
+	def _update_video_info(self):
+
+		raise NotImplementedError()
+
+	### Observers
+
+	@property
+	def return_cub_as_label(self):
+		return self.__return_cub_as_label
+
+	@property
+	def batch_size(self):
+		return self.__batch_size
+
+	@property
+	def source(self):
+		return self.__source
+
+	@property
+	def cub_frames(self):
+		return self.__cub_frames
+
+	@property
+	def prep_fn(self):
+		return self.__prep_fn
+
+	@property
+	def max_cuboids(self):
+		return self.__max_cuboids
+
+	@property
+	def workers(self):
+		return self.__workers
+
+	@property
+	def prefetch(self):
+		return self.__prefetch
+
+	@property
+	def manifest(self):
+		return self.__manifest
+
+	@property
+	def storage_dtype(self):
+		return self.__storage_dtype
+
+	@property
+	def batch_prep_fn(self):
+		return self.__batch_prep_fn
+
+	@property
+	def max_bytes(self):
+		return self.__max_bytes
+
+	@property
+	def resident_bytes(self):
+
+		"""Returns the number of bytes taken by the cuboids held on memory
+			and the decoded frames held for the virtual augmented cuboids
+		"""
+
+		return ((self._cuboids.nbytes if self._cuboids is not None else 0) +
+				self.frames_store_bytes)
+
+	@property
+	def frames_store_bytes(self):
+
+		"""Returns the number of bytes of the decoded frames held for the
+			virtual augmented cuboids
+		"""
+
+		return (self.__frames_store.nbytes if self.__frames_store is not None
+																		else 0)
+
+	@property
+	def prefetch_stats(self):
+
+		"""Returns a dict with the number of windows of cuboids loaded
+			("windows"), how many of them were already loaded on background
+			("prefetched") and the total time in seconds the consumer waited
+			for them to be loaded ("wait_time")
+		"""
+
+		return self.__prefetcher.stats
+
+	@property
+	def video_info(self):
+		return tuple(self._video_info)
+
+	def is_shuffled(self):
+		return self.__shuffle
+
+	@property
+	def num_cuboids(self):
+		"""Returns the number of cuboids retrievable"""
+		return len(self._access_cuboids)
+
+	def __len__(self) -> int:
+
+		"""Returns the number of cuboids to be retrievable or batches of cuboids
+			if batch_size where specified
+		"""
+
+		return np.ceil(len(self._access_cuboids) / self.__batch_size).astype(int)
+
+	def n__getitem__(self, idx) -> np.ndarray:
+
+		""" Retrieves the cuboid located at index or the cuboids batch wheter
+			batch_size has been provided
+		"""
+
+		"""
+		if idx < 0 or idx >= len(self):
+			raise IndexError('index out of range')
+
+		cub_idx = self.__batch_size * idx
+
+		# Check if desired cuboid is not loaded on RAM and retrieves
+		# it from directory
+		if (self._cuboids is None or not
+									(cub_idx >= self.__loaded_cub_range[0] and
+									cub_idx < self.__loaded_cub_range[1])):
+
+
+			self.__loaded_cub_range[0] = cub_idx
+			self.__loaded_cub_range[1] = min(cub_idx + self.__max_batch *
+														self.__batch_size,
+											len(self._access_cuboids))
+
+
+			self._cuboids = np.array([
+				type(self)._load_cuboid(
+					self._access_cuboids[i],
+					self.__prep_fn) for i in range(
+						self.__loaded_cub_range[0], self.__loaded_cub_range[1])
+				])
+
+			# Normalize cuboids
+			#self._cuboids = (self._cuboids - self._cuboids.mean()) / self._cuboids.std()
+
+		# The desired cuboid/vatch is actually stored on RAM and can be returned
+		start = cub_idx - self.__loaded_cub_range[0]
+		end = min(start + self.__batch_size, len(self._access_cuboids))
+
+		#	If only one cuboid is returned, the cuboid number dimension
+		#	cannot be supresed
+		ret = self._cuboids[start:end]
+
+		if self.__return_cub_as_label:
+			ret = (ret, ret)
+
+		return ret
+		"""
+		return self.__getslice__(idx, idx+1)
+
+	def __getitem__(self, idx: int):
+
+		"""Retrieves the cuboids or cuboids' batch wheter batch_size is privided
+			from index i to index j
+		"""
+
+		ret = from_compact(self._get_stored(idx), self.__storage_dtype)
+
+		if self.__return_cub_as_label:
+			ret = (ret, ret)
+
+		return ret
+
+	def _get_stored(self, idx: int):
+
+		"""Retrieves the cuboids or cuboids' batch as they are stored on
+			memory (see storage_dtype)
+		"""
+		if isinstance(idx, int):
+			start, stop, step = idx, idx + 1, 1
+		elif isinstance(idx, slice):
+			start, stop, step = idx.start, idx.stop, idx.step
+		else:
+			raise TypeError('The passed index must be integer or an slice')
+
+		if start >= len(self) or stop > len(self):
+			raise IndexError('Index out of range')
+
+		if start < 0:
+			start %= len(self)
+
+		if stop < 0:
+			stop %= len(self)
+
+		if (stop - start) > self.__max_batch:
+			raise RuntimeError('Slice retrived overpass the max number'\
+								' of cuboids retrievable specified')
+
+		start = self.__batch_size * start
+		stop = min(self.__batch_size * stop, len(self._access_cuboids))
 
 		# Check if desired cuboids are not loaded on RAM and retrieves
 		# it from directory
@@ -270,875 +1175,2347 @@ class CuboidsGenerator(Sequence):
 									stop <= self.__loaded_cub_range[1])):
 
 
-			self.__loaded_cub_range[0] = start
-			self.__loaded_cub_range[1] = min(start + self.__max_batch *
-														self.__batch_size,
-											len(self._access_cuboids))
+			self.__loaded_cub_range[0] = start
+			self.__loaded_cub_range[1] = min(start + max(stop - start,
+												self.__window_cuboids()),
+											len(self._access_cuboids))
+
+			# Release the held cuboids before loading the following ones
+			self._cuboids = None
+			self._cuboids = self.__prefetcher.load(self.__load_window,
+						self._access_cuboids[self.__loaded_cub_range[0]:
+											self.__loaded_cub_range[1]])
+
+			if self.__cuboid_bytes is None and len(self._cuboids):
+				self.__cuboid_bytes = self._cuboids.nbytes // len(self._cuboids)
+
+			# Start the loading of the following window
+			if (self.__prefetch and
+						self.__loaded_cub_range[1] < len(self._access_cuboids)):
+				self.__prefetcher.schedule(self.__load_window,
+						self._access_cuboids[self.__loaded_cub_range[1]:
+										self.__loaded_cub_range[1] +
+										self.__window_cuboids()])
+
+			# Normalize cuboids
+			#self._cuboids = (self._cuboids - self._cuboids.mean()) / self._cuboids.std()
+
+		# The desired cuboid/vatch is actually stored on RAM and can be returned
+		start = start - self.__loaded_cub_range[0]
+		stop = stop - self.__loaded_cub_range[0]
+
+		#	If only one cuboid is returned, the cuboid number dimension
+		#	cannot be supresed
+		return self._cuboids[start:stop:step]
+
+
+	def to_tf_dataset(self, shuffle: bool=False, seed: int=None,
+						num_parallel_calls: int=None, prefetch: int=None,
+						deterministic: bool=True):
+
+		"""Returns a tf.data.Dataset flowing the cuboids of the generator on
+			batches of batch_size cuboids (as (cuboids, cuboids) if
+			return_cub_as_label is set) in the same order they are accessed.
+
+			The dataset is built over the cuboids indexes and the cuboids are
+			loaded and preprocessed by a parallel map, so several cuboids
+			are loaded concurrently and the batches are prefetched while the
+			previous ones are consumed. The dataset doesn't reflect the
+			changes made to the generator after its creation.
+
+			Parameters
+			----------
+
+			shuffle : bool
+				Shuffle the cuboids on each iteration over the dataset
+
+			seed : int or None
+				Seed used for shuffling the cuboids. The same sequence of
+				shuffled orders is produced for the same seed
+
+			num_parallel_calls : int or None
+				Number of cuboids loaded concurrently. None for tuning it
+				dynamically
+
+			prefetch : int or None
+				Number of batches prefetched. None for tuning it dynamically
+				and 0 for disabling the prefetching
+
+			deterministic : bool
+				Flow the loaded cuboids in order. If False, cuboids loaded
+				first are flowed first
+
+			Return
+			------
+			tf.data.Dataset
+		"""
+
+		# Check input
+		if not isinstance(shuffle, bool):
+			raise ValueError('"shuffle" must be boolean')
+
+		if seed is not None and not isinstance(seed, int):
+			raise ValueError('"seed" must be None or integer')
+
+		if num_parallel_calls is not None and (not isinstance(
+								num_parallel_calls, int) or num_parallel_calls <= 0):
+			raise ValueError('"num_parallel_calls" must be None or an integer'\
+															' greater than 0')
+
+		if prefetch is not None and (not isinstance(prefetch, int) or
+																prefetch < 0):
+			raise ValueError('"prefetch" must be None or a non negative integer')
+
+		if not isinstance(deterministic, bool):
+			raise ValueError('"deterministic" must be boolean')
+
+		if not self._access_cuboids:
+			raise ValueError('The generator has no cuboids')
+
+		# Procedure
+		cuboids = copy(self._access_cuboids)
+		storage_dtype = self.__storage_dtype
+
+		def load_cuboid(idx):
+			return from_compact(self._read_window([cuboids[idx]])[0],
+																storage_dtype)
+
+		# Take the cuboids format from the first cuboid
+		sample = load_cuboid(0)
+
+		def load_tf_cuboid(idx):
+			cub = tf_numpy_function(load_cuboid, [idx], sample.dtype)
+			cub.set_shape(sample.shape)
+
+			return cub
+
+		dataset = tf_data.Dataset.range(len(cuboids))
+
+		if shuffle:
+			dataset = dataset.shuffle(len(cuboids), seed=seed,
+										reshuffle_each_iteration=True)
+
+		dataset = dataset.map(load_tf_cuboid,
+						num_parallel_calls=(num_parallel_calls or
+														tf_data.AUTOTUNE),
+						deterministic=deterministic)
+		dataset = dataset.batch(self.__batch_size)
+
+		if self.__return_cub_as_label:
+			dataset = dataset.map(lambda cub: (cub, cub))
+
+		if prefetch != 0:
+			dataset = dataset.prefetch(prefetch or tf_data.AUTOTUNE)
+
+		return dataset
+
+	### Modifiers
+	@return_cub_as_label.setter
+	def return_cub_as_label(self, v):
+		if not isinstance(v, bool):
+			raise ValueError('"return_cub_as_label" must be bool')
+
+		self.__return_cub_as_label = v
+
+	@batch_size.setter
+	def batch_size(self, v):
+
+		if not isinstance(v, int) or v <= 0:
+			raise ValueError('batch_size must be greater than 0')
+
+		if v and self.__max_cuboids < v:
+			raise ValueError('The batch size cannot be greater than the '\
+																'max cuboids')
+
+		self.__batch_size = v
+		self._cuboids = None
+		self.__prefetcher.discard()
+
+		# Recompute the max batch retrievable
+		self.__max_batch = self.__max_cuboids // self.__batch_size
+
+	@workers.setter
+	def workers(self, v):
+
+		if not isinstance(v, int) or v <= 0:
+			raise ValueError('"workers" must be an integer greater than 0')
+
+		self.__workers = v
+
+	@prefetch.setter
+	def prefetch(self, v):
+
+		if not isinstance(v, bool):
+			raise ValueError('"prefetch" must be boolean')
+
+		self.__prefetch = v
+
+		if not v:
+			self.__prefetcher.shutdown()
+
+	@max_bytes.setter
+	def max_bytes(self, v):
+
+		if v is not None and (not isinstance(v, int) or v <= 0):
+			raise ValueError('"max_bytes" must be None or an integer greater'\
+																' than 0')
+
+		self.__max_bytes = v
+
+		if self.__frames_store is not None:
+			self.__frames_store.max_bytes = (None if v is None else v // 2)
+
+	def shuffle(self, shuf=False, seed=None):
+
+		"""Shuffle randomly the cuboids or undo the shufflering making the
+			cuboids to recover its original order
+
+			Parameters
+			----------
+
+			shuf : bool
+				True for shuffle the cuboids or False to make the cuboids
+				recover the original order
+
+			seed : int or None
+				seed to be used for the random shufflering
+		"""
+
+		if not isinstance(shuf, bool):
+			raise ValueError('"shuf" must be boolean')
+
+		if seed is not None and not isinstance(seed, int):
+			raise ValueError('"seed" must be None or integer')
+
+		self.__shuffle = shuf
+		self.__prefetcher.discard()
+
+		if shuf:
+
+			# Change the seed is specified
+			if seed is not None:
+				or_rand_state = random.getstate()
+				random.seed(seed)
+
+			random.shuffle(self._access_cuboids)
+
+			# Recover the original random state
+			if seed is not None:
+				random.setstate(or_rand_state)
+
+		else:
+			self._access_cuboids = copy(self._cuboids_info)
+
+	def release(self):
+
+		"""Releases the cuboids held on memory, the window being loaded
+			on background and the decoded frames of the virtual augmented
+			cuboids, which are loaded again when the cuboids are accessed
+		"""
+
+		self.__prefetcher.discard()
+
+		if self.__frames_store is not None:
+			self.__frames_store.clear()
+
+		self._cuboids = None
+		self.__loaded_cub_range = [None, None]
+
+	def make_partitions(self, partitions: tuple, shuffle=False, seed=None):
+
+		"""Returns several partitions of cuboids set as a tuple of Cuboids
+			Generator holding the desired partitions
+
+			Parameters
+			----------
+
+			partitions : tuple of float
+				Ratios of video to be contained on each partition.
+				The sum of ratios must be 1
+
+			shuffle : boolean
+				Shuffle the video before partitioning or not
+
+			seed : int
+				The seed to be used for shuffling
+
+			Return
+			------
+			Tuple containing as many cuboids generator as desired partitions
+		"""
+
+		# Check input
+		if not hasattr(partitions, '__getitem__'):
+			raise TypeError('"partitions" must be a indexable collection of'\
+							' float or ints')
+
+		if not partitions:
+			raise ValueError('Some portion value must be passed')
+
+		if any(not isinstance(x, (float, int)) for x in partitions):
+			raise ValueError('Portion values are not number')
+
+		if np.abs(sum(partitions) - 1) > float_info.epsilon:
+			raise ValueError('portion values doesn\'t sum 1')
+
+		if not isinstance(shuffle, bool):
+			raise ValueError('"shuffle" must be boolean')
+
+		if seed is not None and not isinstance(seed, int):
+			raise ValueError('"seed" must be None or integer')
+
+		# Procedure
+
+		# Partitionate cuboids and create cuboid generator for each partition
+		cuboids_part = make_partitions(self._access_cuboids, *partitions)
+
+		return tuple(self._partition(p) for p in cuboids_part)
+
+	def _partition(self, cuboids: list):
+
+		"""Returns a new generator of the same type holding the given cuboids
+			of this generator. The new generator shares with this one the
+			cuboids descriptions, the decoded frames and the rest of state
+			not modified by the generators instead of copying them, so that
+			it only holds the references to its cuboids
+
+			@note Derived classes holding state which cannot be shared must
+				reimplement this method
+		"""
+
+		new = copy(self)
+
+		new._cuboids = None
+		new.__loaded_cub_range = [None, None]
+		new.__prefetcher = _WindowPrefetcher()
+		new._cuboids_info = cuboids
+		new._access_cuboids = copy(cuboids)
+		new._update_video_info()
+
+		return new
+
+	def take_subpartition(self, port: float, seed=None):
+
+		"""Split the current generator into two generators, containing the first
+			one, a random subpartition of the current generator and the second
+			one the remained cuboids
+
+			Parameters:
+			-----------
+			port : float
+				Portion of the original cuboids to select for the subpartition
+
+			seed : int
+				The seed to be used for the subpartition's random selection
+		"""
+
+		# Check input
+		if not isinstance(port, float):
+			raise TypeError('The portion for the subpartition must be float')
+
+		if port <= 0 or port >= 1:
+			raise ValueError('The portion for the subpartition must be in (0, 1)')
+
+		if seed is not None and not isinstance(seed, int):
+			raise TypeError('The seed must be None or integer')
+
+		if seed is not None and seed <= 0:
+			raise ValueError('The seed must be greater than 0')
+
+		# Procedure
+		part_size = int(port * len(self._access_cuboids))
+
+		# Change the seed is specified
+		if seed is not None:
+			or_rand_state = random.getstate()
+			random.seed(seed)
+
+		# Select a random subpartition
+		sel_index = random.sample(range(len(self._cuboids_info)), part_size)
+
+		# Recover the original random state
+		if seed is not None:
+			random.setstate(or_rand_state)
+
+		return self.__split(sel_index)
+
+	def __split(self, sel_index: list) -> tuple:
+
+		"""Splits the cuboids into two generators, containing the first one
+			the cuboids of the given indexes in its order and the second one
+			the remained cuboids
+		"""
+
+		selected = np.zeros(len(self._cuboids_info), dtype=bool)
+		selected[sel_index] = True
+
+		return (self._partition([self._cuboids_info[i] for i in sel_index]),
+				self._partition([self._cuboids_info[i] for i in
+												np.flatnonzero(~selected)]))
+
+	def take_cons_subpartition(self, port: float):
+
+		"""Split the current generator into two generators, containing the first
+			one, a subpartition containing the given porcentage of last video
+			cuboids and the second one the remained ones.
+
+			Parameters:
+			-----------
+			port : float
+				Portion of the original cuboids to select for the subpartition
+		"""
+
+		# Check input
+		if not isinstance(port, float):
+			raise TypeError('The portion for the subpartition must be float')
+
+		if port <= 0 or port >= 1:
+			raise ValueError('The portion for the subpartition must be in (0, 1)')
+
+		# Procedure
+		sel_index = []
+
+		# Select a random subpartition
+		for vid_inf in self._video_info:
+
+			# Determine the number of cuboids to extract from current video
+			# and the current index to get
+			part_size = np.round(port * vid_inf['num_cuboids']).astype(int)
+
+			if not part_size: break
+
+			idx = vid_inf['first_cuboid_index']
+
+			# Add the selected cuboids to the subpartition
+			sel_index.extend(range(idx, idx + part_size))
+
+		return self.__split(sel_index)
+
+	def merge(*args):
+
+		"""Merge several Cuboids Generators into one single Cuboids Generator
+
+			Parameters:
+			-----------
+
+			args : Several Cuboids Generators of the same type
+		"""
+		# Check input
+
+		if not args:
+			raise ValueError('Any Cuboid Generator must be provided')
+
+		for i in range(len(args)):
+			if not isinstance(args[i], CuboidsGenerator):
+				raise TypeError('A passed generator not a valid cuboid generator')
+
+			if i > 0 and type(args[i]) is not type(args[i-1]):
+				raise TypeError('All the generators must below to the same type'\
+								' of Cuboid Generator')
+
+		# Procedure
+		return args[0]._partition(args[0]._cuboids_info +
+							[cub for cg in args[1:] for cub in cg._access_cuboids])
+
+	def augment_data(self, rate=None, **kwargs):
+
+		"""Augment the retrievable by transformations applied to the original
+			cuboids wheter the rate is larger than 0. if rate is 0, disable the
+			data augmentation
+
+			Parameters
+			----------
+
+			rate: float (optional)
+				Max ratio of augmented cuboids to generate. The number of augmented
+				cuboids will be (rate * # original cuboids) which will be
+				added among the original cuboids. It will be greater than 0
+
+			Note: Function not implemented
+		"""
+		raise NotImplementedError()
+
+	@property
+	def cum_cuboids_per_video(self):
+		cub_per_vid = list(np.ceil(v['frames'] / self.__cub_frames) 
+							for v in self._video_info)
+
+		for i in range(1, len(cub_per_vid)):
+			cub_per_vid[i] += cub_per_vid[i-1]
+
+		return tuple(cub_per_vid)
+
+	### Copy and serialization
+
+	def __getstate__(self):
+
+		"""Only the cuboids descriptors and the configuration are serialized.
+			The loaded window, the decoded frames and the opened files are
+			loaded again when the cuboids are accessed
+		"""
+
+		state = self.__dict__.copy()
+		state['_cuboids'] = None
+		state['_CuboidsGenerator__loaded_cub_range'] = [None, None]
+
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+
+class CuboidsGeneratorFromImgs(CuboidsGenerator):
+
+	"""Implementation of the Cuboids Generator utility for the retrieval of
+		cuboids from a video directory conforming one folder for each video
+		containing the video frames as individual images.
+
+		Parameters
+		----------
+
+		source: str
+			Directory containing the videos to be flowed as cuboids
+
+		cub_frames: int
+			Number of frames contained on a cuboid
+
+		prep_fn: function (optional)
+			Function containing the preprocessing operations workflow to be
+				applied to each video frame
+
+		max_cuboids: int (default 100)
+			Max number of consecutive cuboids to be retrieved from disk when
+			the generator flows cuboids from the videos
+
+		cache_dir: str (optional)
+			Directory where the preprocessed frames of each video are
+			persistently stored the first time they are loaded, so that later
+			loads (and later runs) map the stored frames instead of decoding
+			and preprocessing the images again. The stored frames are
+			invalidated when the frame files or the preprocessing function
+			change
+
+		workers: int (default 1)
+			Number of threads used for decoding and preprocessing the frames
+			concurrently when the cuboids are retrieved from disk
+
+		prefetch: bool (default False)
+			Load the next max_cuboids cuboids on a background thread while
+			the current ones are consumed
+
+		manifest: bool or str (default False)
+			Store the valid frames of each video directory on a manifest file
+			so that only the directories changed since the last scan are
+			listed again. If True, the manifest is stored on the source
+			directory, otherwise the path of the manifest file can be passed
+
+		storage_dtype: str (optional)
+			Store the loaded frames compactly as "uint8" or "float16" and
+			convert them into float32 when the cuboids are retrieved. Frames
+			stored as "uint8" must be normalized in [0, 1] by prep_fn
+
+		batch_prep_fn: function (optional)
+			Function containing preprocessing operations applied at once to
+			the stack of frames of the cuboids loaded together, shaped
+			(frames, height, width, channels), after prep_fn is applied to
+			each frame (see BatchResize)
+
+		imread_flags: int (optional)
+			Decode the frames files by OpenCV's imread with the given flags,
+			for example IMREAD_GRAYSCALE or IMREAD_REDUCED_GRAYSCALE_2 to
+			decode grayscale frames at full or reduced size. The frames are
+			decoded as uint8 arrays, with BGR channels order for color
+			frames, instead of the RGB float32 arrays decoded by default
+
+		max_bytes: int (optional)
+			Max number of bytes taken by the cuboids held on memory. The
+			number of cuboids loaded at once (at most max_cuboids) is sized
+			from the memory taken by each cuboid, measured on the first load,
+			and the held cuboids are replaced as a whole. When prefetch is
+			enabled, the budget is shared by the current and the next loads.
+			The decoded frames held for the virtual augmented cuboids (see
+			augment_data) take at most half of the budget
+	"""
+
+	def __init__(self, source: str, cub_frames: int, prep_fn=None,
+					batch_size=1, max_cuboids: int=300, shuffle=False,
+					seed=None, return_cub_as_label=False, cache_dir=None,
+					workers: int=1, prefetch: bool=False, manifest=False,
+					storage_dtype=None, batch_prep_fn=None, imread_flags=None,
+					max_bytes: int=None):
+
+		# Check input
+		if cache_dir is not None and (not isinstance(cache_dir, str) or
+																not cache_dir):
+			raise ValueError('"cache_dir" must be None or a valid directory path')
+
+		if imread_flags is not None and not isinstance(imread_flags, int):
+			raise TypeError('"imread_flags" must be None or int')
+
+		self.__imread_flags = imread_flags
+
+		super(CuboidsGeneratorFromImgs, self).__init__(source, cub_frames,
+													prep_fn, batch_size,
+													max_cuboids, shuffle,
+													seed,
+													return_cub_as_label,
+													workers, prefetch,
+													manifest, storage_dtype,
+													batch_prep_fn, max_bytes)
+
+		# Persistent store of preprocessed frames
+		self.__disk_cache = (FramesDiskCache(cache_dir) if cache_dir is not None
+																		else None)
+		self.__prep_fp = (prep_fn, fingerprint(prep_fn))
+		self.__batch_prep_fp = (fingerprint(batch_prep_fn) if batch_prep_fn
+																	else None)
+		self.__frames_index = {} # Position of each frame file on its video
+		self.__video_keys = {}	 # Key of each video's stored frames
+
+	@property
+	def cache_dir(self):
+		return (self.__disk_cache.cache_dir if self.__disk_cache is not None
+																		else None)
+
+	@property
+	def imread_flags(self):
+		return self.__imread_flags
+
+	def _scan_source_dir(self):
+
+		"""Scans the desired video directory looking for all video frames files
+			and note them into cuboids for posterior loading
+		"""
+
+		self._cuboids_info = []
+		self._video_frames = {}
+
+		manifest = self._open_manifest('frames')
+
+		for d in sorted(os.listdir(self.source)):
+
+			if d == MANIFEST_FNAME:
+				continue
+
+			dirname = (self.source +
+						('/' if not self.source.endswith('/') else '') + d)
+
+			# Check the listed directory is valid
+			if not os.path.isdir(dirname):
+				warnings.warn('"{}" not a directory with frames and will'\
+												' be omitted'.format(dirname))
+				continue
+
+			# List the valid frames of the directory or take them from the
+			# manifest if the directory has not changed
+			if manifest is not None:
+				st = os.stat(dirname)
+				frames = manifest.get(d, (st.st_mtime_ns, st.st_size),
+							lambda: CuboidsGeneratorFromImgs.__list_frames(
+																	dirname))
+			else:
+				frames = CuboidsGeneratorFromImgs.__list_frames(dirname)
+
+			self._video_frames[dirname] = list(frames)
+
+			# Group the frames into cuboids
+			for i in range(0, len(frames), self.cub_frames):
+				cub_info = (dirname, frames[i: i + self.cub_frames])
+
+				# Fill the remaind cuboid by repetitions of last frame
+				# until make the cuboid with the derired number of frames
+				rest = self.cub_frames - len(cub_info[1])
+				cub_info[1].extend([cub_info[1][-1]]*rest)
+
+				self._cuboids_info.append(cub_info)
+
+		if manifest is not None:
+			manifest.save()
+
+		# Note the video's information
+		self._update_video_info()
+
+	@staticmethod
+	def __list_frames(dirname: str) -> list:
+
+		"""Returns the sorted file names of the valid frames of a video
+			directory
+		"""
+
+		return [f for f in sorted(os.listdir(dirname))
+											if imghdr.what(dirname+'/'+f)]
+
+	def _load_cuboid(self, cuboid: tuple, prep_fn=None):
+
+		"""Loads a cuboid from its video frames files
+		"""
+
+		if self.__disk_cache is not None:
+			# Take the frames from the stored video's preprocessed frames
+			frames = self.__load_cached_video(cuboid[0], prep_fn)
+			index = self.__frames_index[cuboid[0]]
+
+			return np.asarray(frames[[index[f] for f in cuboid[1]]])
+
+		return self._load_frames(cuboid[0], cuboid[1], prep_fn)
+
+	def _cuboid_frames(self, cuboid: tuple) -> tuple:
+
+		"""Returns the video of a cuboid and the indexes of its frames on
+			the video's frames
+		"""
+
+		index = self.__video_frames_index(cuboid[0])
+
+		return cuboid[0], [index[f] for f in cuboid[1]]
+
+	def _load_video(self, video: str) -> np.ndarray:
+
+		"""Loads all the frames of a video as they are stored on memory
+		"""
+
+		if self.__disk_cache is not None:
+			return self.__load_cached_video(video, self.prep_fn)
+
+		return self._load_frames(video, self._video_frames[video],
+															self.prep_fn)
+
+	def __video_frames_index(self, video: str) -> dict:
+
+		"""Returns the position of each frame file on its video
+		"""
+
+		if video not in self.__frames_index:
+			self.__frames_index[video] = {f: i for i, f in
+										enumerate(self._video_frames[video])}
+
+		return self.__frames_index[video]
+
+	def __load_cached_video(self, video: str, prep_fn=None):
+
+		"""Returns all the preprocessed frames of a video from the persistent
+			store, decoding and storing them if they are not stored yet
+		"""
+
+		frames = self._video_frames[video]
+		self.__video_frames_index(video)
+
+		# The key is computed only once per video since it requires to check
+		# the modification time of every frame file
+		if (video, prep_fn) not in self.__video_keys:
+			prep_fp = (self.__prep_fp[1] if prep_fn is self.__prep_fp[0] else
+														fingerprint(prep_fn))
+			params = ((prep_fp,) if self.storage_dtype is None else
+											(prep_fp, self.storage_dtype.str))
+
+			# Frames differently decoded or batch preprocessed are stored
+			# apart
+			if self.__batch_prep_fp is not None:
+				params += ('batch_prep_fn', self.__batch_prep_fp)
+
+			if self.__imread_flags is not None:
+				params += ('imread_flags', self.__imread_flags)
+			self.__video_keys[(video, prep_fn)] = self.__disk_cache.video_key(
+														video, frames, *params)
+
+		key = self.__video_keys[(video, prep_fn)]
+
+		return self.__disk_cache.get(key,
+							lambda: self._load_frames(video, frames, prep_fn))
+
+	def _load_cuboids(self, cuboids: list or tuple) -> np.ndarray:
+
+		"""Loads several cuboids from its video frames files keeping its order.
+			Each different frame is only decoded once and the frames of all the
+			cuboids are decoded concurrently by the worker threads and
+			preprocessed together
+		"""
+
+		if self.__disk_cache is not None:
+			# The stored frames are only mapped so there's nothing to
+			# parallelize but the decoding of videos not stored yet, which
+			# is performed concurrently by _load_frames
+			ret = None
+
+			for i, cub in enumerate(cuboids):
+				cub = self._load_cuboid(cub, self.prep_fn)
+
+				if ret is None:
+					ret = np.empty((len(cuboids), *cub.shape), dtype=cub.dtype)
+
+				ret[i] = cub
+
+			return ret
+
+		# Note each different frame file of the cuboids
+		filenames = []
+		frames_pos = {}
+		cuboids_pos = []
+
+		for cub in cuboids:
+			for f in cub[1]:
+				fn = cub[0]+'/'+f
+
+				if fn not in frames_pos:
+					frames_pos[fn] = len(filenames)
+					filenames.append(fn)
+
+				cuboids_pos.append(frames_pos[fn])
+
+		frames = self.__decode_frames(filenames, self.prep_fn)
+
+		# Assemble the cuboids from the decoded frames
+		return frames[cuboids_pos].reshape(len(cuboids), self.cub_frames,
+															*frames.shape[1:])
+
+	def _load_frames(self, video: str, fnames: list or tuple, prep_fn=None):
+
+		"""Loads and preprocess the given frames files of a video
+		"""
+
+		return self.__decode_frames([video+'/'+ fp for fp in fnames], prep_fn)
+
+	def __decode_frames(self, filenames: list, prep_fn=None) -> np.ndarray:
+
+		"""Returns the given frames files keeping its order stacked as they
+			are stored on memory (see storage_dtype), taking them from the
+			shared frames cache or decoding and preprocessing them otherwise
+
+			@note This method must not be called from the worker threads
+		"""
+
+		return self._cached_frames([(fn, 0) for fn in filenames],
+						lambda frames: self.__decode_stack(
+										[fn for fn, _ in frames], prep_fn),
+						prep_fn)
+
+	def __decode_stack(self, filenames: list, prep_fn=None) -> np.ndarray:
+
+		"""Decodes and preprocess the given frames files keeping its order
+			and returns them stacked as they are stored on memory (see
+			storage_dtype). Frames are decoded concurrently by the worker
+			threads if more than one worker is configured
+		"""
+
+		process_fn = self._frame_process_fn(prep_fn)
+		decode_fn = lambda fn: CuboidsGeneratorFromImgs.__decode_frame(fn,
+													process_fn,
+													self.__imread_flags)
+
+		if self.workers > 1 and len(filenames) > 1:
+			pool = _get_thread_pool(self.workers)
+			frames = list(pool.map(decode_fn, filenames))
+		else:
+			frames = [decode_fn(fn) for fn in filenames]
+
+		# Check loaded images have the same format
+		for i in range(1, len(frames)):
+			if (frames[i-1].shape != frames[i].shape or
+											frames[i-1].dtype != frames[i].dtype):
+				raise ValueError('Differents sizes or types for images loaded'\
+								' detected for image "{}"'.format(filenames[i]))
+
+		return self._stack_frames(frames)
+
+	def _frames_fingerprint(self, prep_fn=None) -> tuple:
+
+		# Frames differently decoded are stored apart
+		return (super()._frames_fingerprint(prep_fn) +
+												(self.__imread_flags,))
+
+	@staticmethod
+	def __decode_frame(fn: str, prep_fn=None, imread_flags=None) -> np.ndarray:
+
+		"""Loads and preprocess a single frame file
+		"""
+
+		# Loads the frame
+		try:
+			if imread_flags is None:
+				img = img_to_array(load_img(fn))
+			else:
+				img = imread(fn, imread_flags)
+
+				if img is None:
+					raise ValueError('Cannot decode "{}"'.format(fn))
+
+				# Grayscale frames keep the channel axis
+				if img.ndim == 2:
+					img = img[..., np.newaxis]
+		except:
+			print(fn)
+			raise
+
+		# Apply preprocessing function if specified
+		if prep_fn:
+			img = prep_fn(img)
+
+		return img
+
+	def _update_video_info(self):
+
+		video_info_list = []
+
+		video_info = None
+		for i, cub_info in enumerate(self._cuboids_info):
+
+			# Virtual cuboids are not noted as frames of the videos
+			if isinstance(cub_info, _StridedCuboid):
+				continue
+
+			if not video_info or video_info['video fname'] != cub_info[0]:
+				video_info = {'video fname': cub_info[0], 'frames': 0,
+								'first_cuboid_index': i, 'num_cuboids': 0}
+				video_info_list.append(video_info)
+			
+			video_info['frames'] += len(set(cub_info[1]))
+			video_info['num_cuboids'] += 1
+
+		self._video_info = video_info_list
+
+	def augment_data(self, rate=None, **kwargs):
+
+		"""Augment the retrievable by transformations applied to the original
+			cuboids wheter the rate is larger than 0. if rate is 0, disable the
+			data augmentation
+
+			Parameters
+			----------
+
+			rate: float (optional)
+				Max ratio of augmented cuboids to generate. The number of augmented
+				cuboids will be (rate * # original cuboids) which will be
+				added among the original cuboids. It will be greater than 0
+
+			max_stride: int
+				Max stride applied between the original frames to construct the
+				generated cuboids. It will be in (0,# video frames/cuboids length]
+
+			virtual: bool (default False)
+				Generate virtual cuboids made up of the frames of each video
+				separated by the strides, which are assembled when accessed
+				from the frames of the videos decoded once and held on memory
+				instead of being loaded independently
+		"""
+
+		# check input
+		if rate is not None and not isinstance(rate, (float, int)):
+			raise TypeError('"rate" must be float or int')
+
+		if rate is not None and rate <= 0.0:
+			raise ValueError('"rate" must be greater or equal than 0')
+
+		if 'max_stride' not in kwargs:
+			raise AttributeError('"max_stride" must be provided')
+
+		max_stride = kwargs['max_stride']
+
+		if not isinstance(max_stride, int):
+			raise TypeError('"max_stride" must be int')
+
+		if max_stride < 2:
+			raise ValueError('"max_stride" must be greater than 1')
+
+		virtual = kwargs.get('virtual', False)
+
+		if not isinstance(virtual, bool):
+			raise TypeError('"virtual" must be boolean')
+
+		# Procedure
+		n_aug_cuboids = int(rate * len(self._access_cuboids)) if rate else -1
+
+		if n_aug_cuboids == 0 and rate > 0.0:
+			warning.warn('Rate specified is too low and no cuboid '\
+						'will be augmented')
+
+		if virtual:
+			self._augment_virtual(n_aug_cuboids, max_stride)
+			return
+
+		ori_cub_idx = 0 # Current video index used for generate a cuboid
+		stride = 2
+		start_frame_idx = 0 # First video frame to be added to the generated cuboid
+		new_cuboids = [] # New cuboids generated
+		augment = True
+
+		frame_idx = start_frame_idx
+
+		i = 0
+		while i != n_aug_cuboids:
+
+			new_cuboid = (self._cuboids_info[ori_cub_idx][0], [])
+
+			# Forming a new cuboid from a strided-frames windows
+			for j in range(self.cub_frames):
+				new_cuboid[1].append(self._cuboids_info[ori_cub_idx][1][frame_idx])
+				frame_idx += stride
+
+				if frame_idx >= len(self._cuboids_info[ori_cub_idx][1]):
+					# Next frames must be taken from the following cuboid
+					ori_cub_idx += 1
+
+				if ori_cub_idx == len(self._cuboids_info):
+					# No more cuboids can be generated from the original
+					# cuboids so let's start again from the start with a higher
+					# stride
+					start_frame_idx += 1
+					frame_idx = start_frame_idx
+					ori_cub_idx = 0
+				else:
+					frame_idx %= len(self._cuboids_info[ori_cub_idx][1])
+
+				if start_frame_idx == stride:
+					# A next video is reached so is not posible to generate
+					# the cuboid
+					start_frame_idx = 0
+					frame_idx = start_frame_idx
+					stride += 1
+
+				if stride > max_stride:
+					# No more stride can be used so let's start for the first
+					# stride value using a new start frame index
+					augment = False
+					break
+
+				if self._cuboids_info[ori_cub_idx][0] != new_cuboid[0]:
+					# A next video is reached so is not posible to generate
+					# the cuboid
+
+
+					break
+
+			if len(new_cuboid[1]) == self.cub_frames:
+				# Check if the cuboid is formed among all the required frames
+				new_cuboids.append(new_cuboid)
+
+			i += 1
+
+			if not augment:
+				if n_aug_cuboids != -1:
+					warnings.warn('Only {} new cuboids could be '\
+								'generated with the configuration'\
+								' provided'.format(i-1))
+				break
+
+		# Agregate the new cuboids generated to the info and update object
+		self._cuboids_info.extend(new_cuboids)
+		self._access_cuboids = copy(self._cuboids_info)
+		self._update_video_info()
+
+class CuboidsGeneratorFromVid(CuboidsGenerator):
+
+	"""Implementation of the Cuboids Generator utility for the retrieval of
+		cuboids from a video directory containing a video file for each video.
+
+		Parameters
+		----------
+
+		source: str
+			Directory containing the videos to be flowed as cuboids
+
+		cub_frames: int
+			Number of frames contained on a cuboid
+
+		prep_fn: function (optional)
+			Function containing the preprocessing operations workflow to be
+				applied to each video frame
+
+		max_cuboids: int (default 100)
+			Max number of consecutive cuboids to be retrieved from disk when
+			the generator flows cuboids from the videos
+
+		prefetch: bool (default False)
+			Load the next max_cuboids cuboids on a background thread while
+			the current ones are consumed
+
+		manifest: bool or str (default False)
+			Store the frames count of each video file on a manifest file so
+			that only the video files changed since the last scan are opened
+			again. If True, the manifest is stored on the source
+			directory, otherwise the path of the manifest file can be passed
+
+		storage_dtype: str (optional)
+			Store the loaded frames compactly as "uint8" or "float16" and
+			convert them into float32 when the cuboids are retrieved. Frames
+			stored as "uint8" must be normalized in [0, 1] by prep_fn
+
+		max_captures: int (default 4)
+			Max number of video files kept opened for reading the frames of
+			the following cuboids
+
+		batch_prep_fn: function (optional)
+			Function containing preprocessing operations applied at once to
+			the stack of frames read from each video file for the cuboids
+			loaded together, shaped (frames, height, width, channels), after
+			prep_fn is applied to each frame (see BatchResize)
+
+		max_bytes: int (optional)
+			Max number of bytes taken by the cuboids held on memory. The
+			number of cuboids loaded at once (at most max_cuboids) is sized
+			from the memory taken by each cuboid, measured on the first load,
+			and the held cuboids are replaced as a whole. When prefetch is
+			enabled, the budget is shared by the current and the next loads
+
+		Note: The frames required by the cuboids loaded together are read
+			sequentially once from each video file whatever the cuboids
+			order is, so shuffled cuboids don't require seeking each cuboid
+	"""
+
+	def __init__(self, source: str, cub_frames: int, prep_fn=None,
+					batch_size=1, max_cuboids: int=300, shuffle=False,
+					seed=None, return_cub_as_label=False,
+					prefetch: bool=False, manifest=False,
+					storage_dtype=None, max_captures: int=4,
+					batch_prep_fn=None, max_bytes: int=None):
+
+		# Check input
+		if not isinstance(max_captures, int) or max_captures <= 0:
+			raise ValueError('"max_captures" must be an integer greater than 0')
+
+		super(CuboidsGeneratorFromVid, self).__init__(source, cub_frames,
+													prep_fn, batch_size,
+													max_cuboids, shuffle,
+													seed,
+													return_cub_as_label,
+													prefetch=prefetch,
+													manifest=manifest,
+													storage_dtype=storage_dtype,
+													batch_prep_fn=batch_prep_fn,
+													max_bytes=max_bytes)
+
+		self.__max_captures = max_captures
+		self.__captures = _CapturePool(max_captures) # Opened video files
+
+	def _scan_source_dir(self):
+
+		"""Scans the desired video directory looking for all video files
+			and note them into cuboids for posterior loading
+		"""
+
+		self._cuboids_info = []
+
+		manifest = self._open_manifest('videos')
+
+		for d in sorted(os.listdir(self.source)):
+
+			if d == MANIFEST_FNAME:
+				continue
+
+			fname = (self.source +
+						('/' if not self.source.endswith('/') else '') + d)
+
+			# Get the video's number of frames or take it from the manifest
+			# if the video file has not changed
+			if manifest is not None:
+				st = os.stat(fname)
+				n_frames = manifest.get(d, (st.st_mtime_ns, st.st_size),
+							lambda: CuboidsGeneratorFromVid.__count_frames(fname))
+			else:
+				n_frames = CuboidsGeneratorFromVid.__count_frames(fname)
+
+			# Get video file and split its frames in cuboids
+			if n_frames is None:
+				warnings.warn('"{}" not a valid video file and will'\
+												' be omitted'.format(fname))
+				continue
+
+			# Note the information's video
+			#self._video_info.append({'video fname': fname,
+										#'frames': n_frames})
+
+			# List frames and group them into cuboids
+			for i in range(0, n_frames, self.cub_frames):
+				self._cuboids_info.append((fname, i,
+										min(i + self.cub_frames, n_frames) - 1,
+											1))
+
+		if manifest is not None:
+			manifest.save()
+
+		# Note the information's video
+		self._update_video_info()
+
+	@staticmethod
+	def __count_frames(fname: str) -> int:
+
+		"""Returns the number of frames of a video file or None if it's not a
+			valid video file
+		"""
+
+		fv = VideoCapture(fname)
+
+		if not fv.isOpened():
+			return None
+
+		n_frames = int(fv.get(7))
+		fv.release()
+
+		return n_frames
+
+	def _update_video_info(self):
+
+		video_info_list = []
+
+		video_info = None
+		for i, cub_info in enumerate(self._cuboids_info):
+
+			# Virtual cuboids are not noted as frames of the videos
+			if isinstance(cub_info, _StridedCuboid):
+				continue
+
+			if not video_info or video_info['video fname'] != cub_info[0]:
+				video_info = {'video fname': cub_info[0], 'frames': 0,
+								'first_cuboid_index': i, 'num_cuboids': 0}
+				video_info_list.append(video_info)
+			
+			video_info['num_cuboids'] += 1			
+			video_info['frames'] += np.floor((cub_info[2] - cub_info[1] + 1) / cub_info[3]).astype(int) # len(set(cub_info[1]))
+
+		self._video_info = video_info_list
+
+	@property
+	def max_captures(self):
+		return self.__max_captures
+
+	def _partition(self, cuboids: list):
+
+		"""Returns a new generator holding the given cuboids which opens its
+			own video files
+		"""
+
+		new = super(CuboidsGeneratorFromVid, self)._partition(cuboids)
+		new.__captures = _CapturePool(self.__max_captures)
+
+		return new
+
+	def _cuboid_frames(self, cuboid: tuple) -> tuple:
+
+		"""Returns the video file of a cuboid and the indexes of its frames
+		"""
+
+		return cuboid[0], self._strided_frames(*cuboid[1:])
+
+	def _load_video(self, video: str) -> np.ndarray:
+
+		"""Reads sequentially all the frames of a video file as they are
+			stored on memory
+		"""
+
+		frames = range(CuboidsGeneratorFromVid.__count_frames(video) or 0)
+		captures = _CapturePool(1)
+
+		try:
+			return self.__read_frames(video, frames, captures,
+										self._frame_process_fn(self.prep_fn),
+										self.prep_fn)
+		finally:
+			captures.release()
+
+	def __read_frames(self, fname: str, frames: list or range,
+								captures: _CapturePool, process_fn,
+								prep_fn=None) -> np.ndarray:
+
+		"""Returns stacked the given sorted frames of a video file as they
+			are stored on memory, taking them from the shared frames cache or
+			reading them otherwise
+		"""
+
+		def read_fn(missing: list) -> np.ndarray:
+			read_frames = captures.read(fname, [f for _, f in missing],
+																process_fn)
+
+			return self._stack_frames([read_frames[f] for _, f in missing])
+
+		return self._cached_frames([(fname, f) for f in frames], read_fn,
+																	prep_fn)
+
+	def _load_cuboids(self, cuboids: list or tuple) -> np.ndarray:
+
+		"""Loads several cuboids from its video files keeping its order
+		"""
 
+		return self.__read_cuboids(cuboids, self.__captures, self.prep_fn)
 
-			self._cuboids = np.array([
-				self._load_cuboid(
-					self._access_cuboids[i],
-					self.__prep_fn) for i in range(
-						self.__loaded_cub_range[0], self.__loaded_cub_range[1])
-				])
+	def _load_cuboid(self, cuboid: tuple, prep_fn=None):
 
-			# Normalize cuboids
-			#self._cuboids = (self._cuboids - self._cuboids.mean()) / self._cuboids.std()
+		"""Loads a cuboid from its video frames files
+		"""
 
-		# The desired cuboid/vatch is actually stored on RAM and can be returned
-		start = start - self.__loaded_cub_range[0]
-		stop = stop - self.__loaded_cub_range[0]
+		return self.__read_cuboids([cuboid], self.__captures, prep_fn)[0]
 
-		#	If only one cuboid is returned, the cuboid number dimension
-		#	cannot be supresed
-		ret = self._cuboids[start:stop:step]
+	def _read_cuboids(self, cuboids: list or tuple) -> np.ndarray:
 
-		if self.__return_cub_as_label:
-			ret = (ret, ret)
+		"""Loads several cuboids as they are stored on memory by opening its
+			own video captures, so that it can be called concurrently
+		"""
 
-		return ret
+		captures = _CapturePool(self.__max_captures)
 
+		try:
+			return self.__read_cuboids(cuboids, captures, self.prep_fn)
+		finally:
+			captures.release()
 
-	### Modifiers
-	@return_cub_as_label.setter
-	def return_cub_as_label(self, v):
-		if not isinstance(v, bool):
-			raise ValueError('"return_cub_as_label" must be bool')
+	def __read_cuboids(self, cuboids: list or tuple, captures: _CapturePool,
+										prep_fn=None) -> np.ndarray:
 
-		self.__return_cub_as_label = v
+		"""Reads several cuboids by reading sequentially once the frames
+			required from each video file and placing them on the cuboids
+			order
+		"""
 
-	@batch_size.setter
-	def batch_size(self, v):
+		# Note the slots of the cuboids, as (cuboid, frame) positions, taken
+		# by each frame of each video file
+		video_slots = {}
 
-		if not isinstance(v, int) or v <= 0:
-			raise ValueError('batch_size must be greater than 0')
+		for i, (fname, start, end, stride) in enumerate(cuboids):
 
-		if v and self.__max_cuboids < v:
-			raise ValueError('The batch size cannot be greater than the '\
-																'max cuboids')
+			# Take consecutive frames separated by the stride and repeat the
+			# last frame if a complete cuboid cannot be taken from the
+			# remained video frames
+			frames = list(range(start, end + 1, stride))[:self.cub_frames]
+			frames.extend([frames[-1]]*(self.cub_frames - len(frames)))
 
-		self.__batch_size = v
-		self._cuboids = None
+			slots = video_slots.setdefault(fname, {})
 
-		# Recompute the max batch retrievable
-		self.__max_batch = self.__max_cuboids // self.__batch_size
+			for j, f in enumerate(frames):
+				slots.setdefault(f, []).append((i, j))
 
-	def shuffle(self, shuf=False, seed=None):
+		cub_set = None
 
-		"""Shuffle randomly the cuboids or undo the shufflering making the
-			cuboids to recover its original order
+		def place(slots: list, fr: np.ndarray):
+
+			nonlocal cub_set
+
+			# The cuboids are allocated from the format of the first frame
+			if cub_set is None:
+				cub_set = np.empty((len(cuboids), self.cub_frames,
+								*np.shape(fr)), dtype=np.asarray(fr).dtype)
+			elif np.shape(fr) != cub_set.shape[2:]:
+				raise ValueError('Differents sizes for the frames detected')
+
+			for i, j in slots:
+				cub_set[i, j] = fr
+
+		# Read and preprocess together the frames of each video file, which
+		# are placed on the cuboids as decoded, or once stacked when they are
+		# preprocessed at once or cached, so that only the cuboids and at
+		# most the frames of a video are held on memory
+		process_fn = self._frame_process_fn(prep_fn)
+		direct = (self.batch_prep_fn is None and
+									not shared_frames_cache().max_bytes)
+
+		for fname in sorted(video_slots):
+			slots = video_slots[fname]
+			frames = sorted(slots)
+
+			if direct:
+				captures.read(fname, frames, process_fn,
+										lambda f, fr: place(slots[f], fr))
+			else:
+				stack = self.__read_frames(fname, frames, captures,
+															process_fn, prep_fn)
+
+				for f, fr in zip(frames, stack):
+					place(slots[f], fr)
+
+				del stack
+
+		return cub_set
+
+	def augment_data(self, rate=None, **kwargs):
+
+		"""Augment the retrievable by transformations applied to the original
+			cuboids wheter the rate is larger than 0. if rate is 0, disable the
+			data augmentation
 
 			Parameters
 			----------
 
-			shuf : bool
-				True for shuffle the cuboids or False to make the cuboids
-				recover the original order
+			rate: float (optional)
+				Max ratio of augmented cuboids to generate. The number of augmented
+				cuboids will be (rate * # original cuboids) which will be
+				added among the original cuboids. It will be greater than 0
 
-			seed : int or None
-				seed to be used for the random shufflering
+			max_stride: int
+				Max stride applied between the original frames to construct the
+				generated cuboids. It will be in (0,# video frames/cuboids length]
+
+			virtual: bool (default False)
+				Generate virtual cuboids made up of the frames of each video
+				separated by the strides, which are assembled when accessed
+				from the frames of the videos decoded once and held on memory
+				instead of being loaded independently
 		"""
 
-		if not isinstance(shuf, bool):
-			raise ValueError('"shuf" must be boolean')
+		# check input
+		if rate is not None and not isinstance(rate, (float, int)):
+			raise TypeError('"rate" must be float or int')
 
-		if seed is not None and not isinstance(seed, int):
-			raise ValueError('"seed" must be None or integer')
+		if rate is not None and rate <= 0.0:
+			raise ValueError('"rate" must be greater or equal than 0')
 
-		self.__shuffle = shuf
+		if 'max_stride' not in kwargs:
+			raise AttributeError('"max_stride" must be provided')
 
-		if shuf:
+		max_stride = kwargs['max_stride']
 
-			# Change the seed is specified
-			if seed is not None:
-				or_rand_state = random.getstate()
-				random.seed(seed)
+		if not isinstance(max_stride, int):
+			raise TypeError('"max_stride" must be int')
 
-			random.shuffle(self._access_cuboids)
+		if max_stride < 2:
+			raise ValueError('"max_stride" must be greater than 1')
 
-			# Recover the original random state
-			if seed is not None:
-				random.setstate(or_rand_state)
+		virtual = kwargs.get('virtual', False)
 
-		else:
-			self._access_cuboids = copy(self._cuboids_info)
+		if not isinstance(virtual, bool):
+			raise TypeError('"virtual" must be boolean')
 
-	def make_partitions(self, partitions: tuple, shuffle=False, seed=None):
+		# Procedure
+		n_aug_cuboids = int(rate * len(self._access_cuboids)) if rate else -1
 
-		"""Returns several partitions of cuboids set as a tuple of Cuboids
-			Generator holding the desired partitions
+		if n_aug_cuboids == 0 and rate > 0.0:
+			warning.warn('Rate specified is too low and no cuboid '\
+						'will be augmented')
 
-			Parameters
-			----------
+		if virtual:
+			self._augment_virtual(n_aug_cuboids, max_stride)
+			return
 
-			partitions : tuple of float
-				Ratios of video to be contained on each partition.
-				The sum of ratios must be 1
+		ori_vid_idx = 0 # Current video index used for generate a cuboid
+		ori_cub_idx = 0 # First cuboid of the current video
+		stride = 2
+		start_frame_idx = 0 # First video frame to be added to the generated cuboid
+		new_cuboids = [] # New cuboids generated
+		new_cuboid = None
+		augment = True
 
-			shuffle : boolean
-				Shuffle the video before partitioning or not
+		frame_idx = start_frame_idx + self._cuboids_info[ori_cub_idx][1]
 
-			seed : int
-				The seed to be used for shuffling
+		i = 0
+		while i != n_aug_cuboids:
 
-			Return
-			------
-			Tuple containing as many cuboids generator as desired partitions
+			# Construct a new cuboid
+			new_cuboid = (self._video_info[ori_vid_idx]['video fname'],
+							frame_idx,
+							min(frame_idx + self.cub_frames*stride,
+								 self._video_info[ori_vid_idx]['frames'] +
+									 self._cuboids_info[ori_cub_idx][1]) -1,
+									stride)
+
+			# Prepare the following cuboid
+			frame_idx = new_cuboid[2] + 1 
+
+			# Discard non-valid cuboids
+			if (new_cuboid[2] - new_cuboid[1] +1) >= new_cuboid[3]:
+				new_cuboids.append(new_cuboid)
+
+			if frame_idx - self._cuboids_info[ori_cub_idx][1] == self._video_info[ori_vid_idx]['frames']:
+				# Next frames must be taken from the following cuboid
+				ori_cub_idx += np.ceil(self._video_info[ori_vid_idx]['frames'] / self.cub_frames).astype(int)
+				ori_vid_idx += 1
+				frame_idx = start_frame_idx
+
+			if ori_vid_idx == len(self._video_info):
+				# No more cuboids can be generated from the original
+				# cuboids so let's start again from the start with a higher
+				# stride
+				start_frame_idx += 1
+				ori_vid_idx = 0
+				ori_cub_idx = 0
+				frame_idx = start_frame_idx + self._cuboids_info[ori_cub_idx][1]
+
+			if start_frame_idx == stride:
+				# A next video is reached so is not posible to generate
+				# the cuboid
+				start_frame_idx = 0
+				frame_idx = start_frame_idx + self._cuboids_info[ori_cub_idx][1]
+				stride += 1
+
+			if stride > max_stride:
+				# No more stride can be used so let's start for the first
+				# stride value using a new start frame index
+				break
+
+			i += 1
+
+		if n_aug_cuboids != -1 and i < n_aug_cuboids:
+			warnings.warn('Only {} new cuboids could be '\
+						'generated with the configuration'\
+						' provided'.format(i-1))
+
+		# Agregate the new cuboids generated to the info and update object
+		self._cuboids_info.extend(new_cuboids)
+		self._access_cuboids = copy(self._cuboids_info)
+		self._update_video_info()
+
+	def release(self):
+
+		"""Releases the cuboids held on memory and the opened video files
 		"""
 
-		# Check input
-		if not hasattr(partitions, '__getitem__'):
-			raise TypeError('"partitions" must be a indexable collection of'\
-							' float or ints')
+		super(CuboidsGeneratorFromVid, self).release()
+		self.__captures.release()
 
-		if not partitions:
-			raise ValueError('Some portion value must be passed')
+	def __del__(self):
+		if hasattr(self, '_CuboidsGeneratorFromVid__captures'):
+			self.__captures.release()
+		#super(CuboidsGeneratorFromVid, self).__del__()
 
-		if any(not isinstance(x, (float, int)) for x in partitions):
-			raise ValueError('Portion values are not number')
+class _PackedShards:
 
-		if np.abs(sum(partitions) - 1) > float_info.epsilon:
-			raise ValueError('portion values doesn\'t sum 1')
+	"""Read-only memory-mapped shards of a packed dataset, which are mapped
+		when accessed for the first time and shared among all the copies of
+		the generators
+	"""
 
-		if not isinstance(shuffle, bool):
-			raise ValueError('"shuffle" must be boolean')
+	def __init__(self, directory: str, fnames: list):
 
-		if seed is not None and not isinstance(seed, int):
-			raise ValueError('"seed" must be None or integer')
+		self.__directory = directory
+		self.__fnames = fnames
+		self.__shards = {}
 
-		# Procedure
+	def __getitem__(self, idx: int) -> np.ndarray:
 
-		# Partitionate cuboids and create cuboid generator for each partition
-		cuboids_part = make_partitions(self._access_cuboids, *partitions)
-		cubgens = []
+		if idx not in self.__shards:
+			self.__shards[idx] = np.load(os.path.join(self.__directory,
+														self.__fnames[idx]),
+											mmap_mode='r')
 
-		for p in cuboids_part:
+		return self.__shards[idx]
 
-			# Create new cuboid generator
-			cubgens.append(deepcopy(self))
+	### Copy and serialization
 
-			cubgens[-1]._cuboids = None
-			cubgens[-1].__loaded_cub_range = [None, None]
-			cubgens[-1]._cuboids_info = p
-			cubgens[-1]._access_cuboids = copy(p)
-			cubgens[-1]._update_video_info()
+	def __deepcopy__(self, memo):
+		# Mapped shards are read-only so they can be shared
+		return self
 
-		return tuple(cubgens)
+	def __getstate__(self):
+		return {'directory': self.__directory, 'fnames': self.__fnames}
 
-	def take_subpartition(self, port: float, seed=None):
+	def __setstate__(self, state):
+		self.__init__(state['directory'], state['fnames'])
 
-		"""Split the current generator into two generators, containing the first
-			one, a random subpartition of the current generator and the second
-			one the remained cuboids
+class CuboidsGeneratorFromShards(CuboidsGenerator):
 
-			Parameters:
-			-----------
-			port : float
-				Portion of the original cuboids to select for the subpartition
+	"""Implementation of the Cuboids Generator utility for the retrieval of
+		cuboids from a dataset packed by pack_cuboids_dataset, whose
+		preprocessed frames are stored on a few large shard files.
 
-			seed : int
-				The seed to be used for the subpartition's random selection
-		"""
+		The shards are memory-mapped and the frames of each cuboid are read
+		as a contiguous block of the shard.
 
-		# Check input
-		if not isinstance(port, float):
-			raise TypeError('The portion for the subpartition must be float')
+		Parameters
+		----------
 
-		if port <= 0 or port >= 1:
-			raise ValueError('The portion for the subpartition must be in (0, 1)')
+		source: str
+			Directory containing the packed dataset
 
-		if seed is not None and not isinstance(seed, int):
-			raise TypeError('The seed must be None or integer')
+		cub_frames: int
+			Number of frames contained on a cuboid
 
-		if seed is not None and seed <= 0:
-			raise ValueError('The seed must be greater than 0')
+		prep_fn: function (optional)
+			Function containing further preprocessing operations to be
+				applied to each packed video frame
 
-		# Procedure
-		cubgens = tuple(deepcopy(self) for i in range(2))
-		cubgens[0]._cuboids_info = []
+		max_cuboids: int (default 100)
+			Max number of consecutive cuboids to be retrieved from disk when
+			the generator flows cuboids from the videos
 
+		prefetch: bool (default False)
+			Load the next max_cuboids cuboids on a background thread while
+			the current ones are consumed
+
+		storage_dtype: str (optional)
+			Store the loaded frames compactly as "uint8" or "float16" and
+			convert them into float32 when the cuboids are retrieved. By
+			default, the frames are stored as they were packed
+
+		batch_prep_fn: function (optional)
+			Function containing further preprocessing operations applied at
+			once to the stack of packed frames of each cuboid, shaped
+			(frames, height, width, channels), after prep_fn is applied to
+			each frame
+
+		max_bytes: int (optional)
+			Max number of bytes taken by the cuboids held on memory. The
+			number of cuboids loaded at once (at most max_cuboids) is sized
+			from the memory taken by each cuboid, measured on the first load,
+			and the held cuboids are replaced as a whole. When prefetch is
+			enabled, the budget is shared by the current and the next loads.
+			The decoded frames held for the virtual augmented cuboids (see
+			augment_data) take at most half of the budget
+	"""
 
-		part_size = int(port * len(self._access_cuboids))
-		sel_index = set()
+	def __init__(self, source: str, cub_frames: int, prep_fn=None,
+					batch_size=1, max_cuboids: int=300, shuffle=False,
+					seed=None, return_cub_as_label=False,
+					prefetch: bool=False, storage_dtype=None,
+					batch_prep_fn=None, max_bytes: int=None):
 
-		# Change the seed is specified
-		if seed is not None:
-			or_rand_state = random.getstate()
-			random.seed(seed)
+		# Check input
+		if not isinstance(source, str) or not source:
+			raise ValueError('The source must be a valid directory path')
 
-		# Select a random subpartition
-		for i in range(part_size):
+		index_fname = os.path.join(source, PACKED_INDEX_FNAME)
+
+		if not os.path.isfile(index_fname):
+			raise ValueError('"{}" not a packed dataset directory'.format(
+																		source))
+
+		with open(index_fname) as f:
+			self.__index = json.load(f)
+
+		if self.__index['version'] != PACKED_FORMAT_VERSION:
+			raise ValueError('Packed dataset version {} not supported'.format(
+													self.__index['version']))
+
+		self.__packed_dtype = compact_dtype(self.__index['storage_dtype'])
+
+		super(CuboidsGeneratorFromShards, self).__init__(source, cub_frames,
+													prep_fn, batch_size,
+													max_cuboids, shuffle,
+													seed,
+													return_cub_as_label,
+													prefetch=prefetch,
+													storage_dtype=(
+														storage_dtype or
+														self.__packed_dtype),
+													batch_prep_fn=batch_prep_fn,
+													max_bytes=max_bytes)
 
-			idx = None
+	def _scan_source_dir(self):
 
-			while idx is None or idx in sel_index:
-				idx = random.randint(0, len(cubgens[1]._cuboids_info) - 1)
+		"""Notes the cuboids of the packed videos
+		"""
 
-			cubgens[0]._cuboids_info.append(self._cuboids_info[idx])
-			del cubgens[1]._cuboids_info[idx]
+		self.__shards = _PackedShards(self.source, self.__index['shards'])
+		self.__videos = {}		# Shard, offset and frames of each video
+		self._cuboids_info = []
 
-			sel_index.add(idx)
+		for video in self.__index['videos']:
 
-		# Recover the original random state
-		if seed is not None:
-			random.setstate(or_rand_state)
+			self.__videos[video['name']] = (video['shard'], video['offset'],
+															video['frames'])
 
-		# Update the partition's video information
-		for cub in cubgens:
-			cub._cuboids = None
-			cub.__loaded_cub_range = [None, None]
-			cub._access_cuboids = cub._cuboids_info
-			cub._update_video_info()
+			# Group the frames into cuboids
+			for i in range(0, video['frames'], self.cub_frames):
+				self._cuboids_info.append((video['name'], i,
+								min(i + self.cub_frames, video['frames']) - 1,
+											1))
 
-		return cubgens
+		# Note the information's video
+		self._update_video_info()
 
-	def take_cons_subpartition(self, port: float):
+	# Packed cuboids are described as the video files cuboids
+	_update_video_info = CuboidsGeneratorFromVid._update_video_info
+	augment_data = CuboidsGeneratorFromVid.augment_data
+	_cuboid_frames = CuboidsGeneratorFromVid._cuboid_frames
 
-		"""Split the current generator into two generators, containing the first
-			one, a subpartition containing the given porcentage of last video
-			cuboids and the second one the remained ones.
+	def _load_video(self, video: str) -> np.ndarray:
 
-			Parameters:
-			-----------
-			port : float
-				Portion of the original cuboids to select for the subpartition
+		"""Loads all the frames of a packed video as they are stored on
+			memory
 		"""
 
-		# Check input
-		if not isinstance(port, float):
-			raise TypeError('The portion for the subpartition must be float')
+		shard, offset, n_frames = self.__videos[video]
 
-		if port <= 0 or port >= 1:
-			raise ValueError('The portion for the subpartition must be in (0, 1)')
+		return self.__convert(self.__shards[shard][offset: offset + n_frames],
+																self.prep_fn)
 
-		# Procedure
-		cubgens = tuple(deepcopy(self) for i in range(2))
-		cubgens[0]._cuboids_info = []
+	def _load_cuboid(self, cuboid: tuple, prep_fn=None):
 
-		# Select a random subpartition
-		for vid_inf in self._video_info:
+		"""Loads a cuboid from the packed shards
+		"""
 
-			# Determine the number of cuboids to extract from current video
-			# and the current index to get
-			part_size = np.round(port * vid_inf['num_cuboids']).astype(int)
+		shard, offset = self.__videos[cuboid[0]][:2]
+
+		# Take the frames separated by the stride as a block of the shard
+		frames = self.__shards[shard][offset + cuboid[1]:
+										offset + cuboid[2] + 1:
+										cuboid[3]][:self.cub_frames]
+
+		# Repeat the last frame if a complete cuboid cannot be taken
+		# from the remained video frames
+		if frames.shape[0] < self.cub_frames:
+			frames = np.concatenate((frames,
+									np.repeat(frames[np.newaxis, -1],
+												self.cub_frames -
+													frames.shape[0],
+												axis=0)),
+									axis=0)
 
-			if not part_size: break
+		return self.__convert(frames, prep_fn)
 
-			idx = vid_inf['first_cuboid_index']
+	def __convert(self, frames: np.ndarray, prep_fn=None) -> np.ndarray:
 
-			# Add the selected cuboids if choosen to the subpartition and remove
-			# from the second one
-			cubgens[0]._cuboids_info.extend(self._cuboids_info[idx: idx + part_size])
-			del cubgens[1]._cuboids_info[idx: idx + part_size]
+		"""Converts packed frames into the frames stored on memory
+		"""
 
-		# Update the partition's video information
-		for cub in cubgens:
-			cub._cuboids = None
-			cub.__loaded_cub_range = [None, None]
-			cub._access_cuboids = cub._cuboids_info
-			cub._update_video_info()
+		if prep_fn or self.batch_prep_fn:
+			process_fn = self._frame_process_fn(prep_fn)
+			frames = from_compact(frames, self.__packed_dtype)
 
-		return cubgens
+			return self._stack_frames([process_fn(fr) for fr in frames]
+										if process_fn else frames)
 
-	def merge(*args):
+		if self.__packed_dtype != self.storage_dtype:
+			frames = from_compact(frames, self.__packed_dtype)
 
-		"""Merge several Cuboids Generators into one single Cuboids Generator
+		return to_compact(np.array(frames), self.storage_dtype)
 
-			Parameters:
-			-----------
+	def _load_cuboids(self, cuboids: list or tuple) -> np.ndarray:
 
-			args : Several Cuboids Generators of the same type
+		"""Loads several cuboids from the packed shards keeping its order.
+			The cuboids are read on the order they are placed on the shards
 		"""
-		# Check input
-
-		if not args:
-			raise ValueError('Any Cuboid Generator must be provided')
-
-		for i in range(len(args)):
-			if not isinstance(args[i], CuboidsGenerator):
-				raise TypeError('A passed generator not a valid cuboid generator')
 
-			if i > 0 and type(args[i]) is not type(args[i-1]):
-				raise TypeError('All the generators must below to the same type'\
-								' of Cuboid Generator')
-
-		# Procedure
-		new = deepcopy(args[0])
+		order = sorted(range(len(cuboids)), key=lambda i: (
+									self.__videos[cuboids[i][0]],
+									cuboids[i][1]))
+		cub_set = None
 
-		new._cuboids = None
-		new.__loaded_cub_range = [None, None]
-		new._cuboids_info.extend([cub for cg in args[1:] for cub in cg._access_cuboids])
-		new._access_cuboids = copy(new._cuboids_info)
-		new._update_video_info()
+		for i in order:
 
-		return new
+			cub = self._load_cuboid(cuboids[i], self.prep_fn)
 
-	def augment_data(self, rate=None, **kwargs):
+			if cub_set is None:
+				cub_set = np.empty((len(cuboids), *cub.shape), dtype=cub.dtype)
 
-		"""Augment the retrievable by transformations applied to the original
-			cuboids wheter the rate is larger than 0. if rate is 0, disable the
-			data augmentation
+			cub_set[i] = cub
 
-			Parameters
-			----------
+		return cub_set
 
-			rate: float (optional)
-				Max ratio of augmented cuboids to generate. The number of augmented
-				cuboids will be (rate * # original cuboids) which will be
-				added among the original cuboids. It will be greater than 0
+def pack_cuboids_dataset(cub_gen: CuboidsGenerator, dest: str,
+													shard_size: int=2**30):
 
-			Note: Function not implemented
-		"""
-		raise NotImplementedError()
+	"""Packs the preprocessed frames of all the videos of a cuboids generator
+		into a few large shard files which can be read by
+		CuboidsGeneratorFromShards.
 
-	@property
-	def cum_cuboids_per_video(self):
-		cub_per_vid = list(np.ceil(v['frames'] / self.__cub_frames) 
-							for v in self._video_info)
+		The frames are packed as they are stored by the generator (see
+		storage_dtype) and the frames of each video are placed consecutively
+		on a single shard. An index file notes the shard and the offset of
+		each video's frames.
 
-		for i in range(1, len(cub_per_vid)):
-			cub_per_vid[i] += cub_per_vid[i-1]
+		Parameters
+		----------
 
-		return tuple(cub_per_vid)
+		cub_gen : CuboidsGenerator
+			Generator of the cuboids whose videos are packed. The generator
+			cannot be augmented
 
-class CuboidsGeneratorFromImgs(CuboidsGenerator):
+		dest : str
+			Directory where the packed dataset is stored
 
-	"""Implementation of the Cuboids Generator utility for the retrieval of
-		cuboids from a video directory conforming one folder for each video
-		containing the video frames as individual images.
+		shard_size : int (default 1 GiB)
+			Max number of bytes of each shard file. A video larger than it
+			is stored on its own shard
+	"""
 
-		Parameters
-		----------
+	# Check input
+	if not isinstance(cub_gen, CuboidsGenerator):
+		raise TypeError('A valid cuboid\'s generator must be provided')
 
-		source: str
-			Directory containing the videos to be flowed as cuboids
+	if not isinstance(dest, str) or not dest:
+		raise ValueError('"dest" must be a valid directory path')
 
-		cub_frames: int
-			Number of frames contained on a cuboid
+	if not isinstance(shard_size, int) or shard_size <= 0:
+		raise ValueError('"shard_size" must be an integer greater than 0')
 
-		prep_fn: function (optional)
-			Function containing the preprocessing operations workflow to be
-				applied to each video frame
+	videos = cub_gen.video_info
+	cuboids = cub_gen._cuboids_info
 
-		max_cuboids: int (default 100)
-			Max number of consecutive cuboids to be retrieved from disk when
-			the generator flows cuboids from the videos
-	"""
+	# The augmented cuboids are noted as further videos
+	if (len(set(v['video fname'] for v in videos)) != len(videos) or
+			sum(np.ceil(v['frames'] / cub_gen.cub_frames).astype(int)
+											for v in videos) != len(cuboids)):
+		raise ValueError('Augmented generators cannot be packed')
 
-	def __init__(self, source: str, cub_frames: int, prep_fn=None,
-					batch_size=1, max_cuboids: int=300, shuffle=False,
-					seed=None, return_cub_as_label=False):
+	if not cuboids:
+		raise ValueError('The generator has no cuboids')
 
-		super(CuboidsGeneratorFromImgs, self).__init__(source, cub_frames,
-													prep_fn, batch_size,
-													max_cuboids, shuffle,
-													seed,
-													return_cub_as_label)
+	# Procedure
+	os.makedirs(dest, exist_ok=True)
 
-	def _scan_source_dir(self):
+	sample = cub_gen._read_cuboids(cuboids[:1])[0]
+	frame_bytes = sample[0].nbytes
 
-		"""Scans the desired video directory looking for all video frames files
-			and note them into cuboids for posterior loading
-		"""
+	# Distribute the videos among the shards
+	shards = [[]]
+	shard_bytes = 0
 
-		self._cuboids_info = []
+	for i, v in enumerate(videos):
 
-		for d in sorted(os.listdir(self.source)):
+		v_bytes = int(v['frames'])*frame_bytes
 
-			dirname = (self.source +
-						('/' if not self.source.endswith('/') else '') + d)
+		if shards[-1] and shard_bytes + v_bytes > shard_size:
+			shards.append([])
+			shard_bytes = 0
 
-			# Check the listed directory is valid
-			if not os.path.isdir(dirname):
-				warnings.warn('"{}" not a directory with frames and will'\
-												' be omitted'.format(dirname))
-				continue
+		shards[-1].append(i)
+		shard_bytes += v_bytes
 
+	# Write the frames of each video on its shard
+	index = {'version': PACKED_FORMAT_VERSION,
+				'frame_shape': list(sample.shape[1:]),
+				'dtype': sample.dtype.str,
+				'storage_dtype': (cub_gen.storage_dtype.str if
+									cub_gen.storage_dtype is not None else None),
+				'shards': [],
+				'videos': []}
 
-			# List frames and group them into cuboids
-			cub_info = (dirname, [])
-			for f in sorted(os.listdir(dirname)):
+	for s, shard_videos in enumerate(shards):
 
-				frame_fname = dirname+'/'+f
+		fname = 'shard_{:05d}.npy'.format(s)
+		shard = open_memmap(os.path.join(dest, fname), mode='w+',
+							dtype=sample.dtype,
+							shape=(sum(int(videos[v]['frames'])
+												for v in shard_videos),
+									*sample.shape[1:]))
+		offset = 0
 
-				# Note the frame to cuboid if is a valid image file
-				if imghdr.what(frame_fname):
-					cub_info[1].append(f)
+		for v in shard_videos:
+			v_info = videos[v]
 
-					if len(cub_info[1]) == self.cub_frames:
-						self._cuboids_info.append(cub_info)
-						cub_info = (dirname, [])
+			cub_set = cub_gen._read_cuboids(cuboids[v_info['first_cuboid_index']:
+												v_info['first_cuboid_index'] +
+												v_info['num_cuboids']])
 
-			# Add the remaind cuboid and fill it by repetitions of last frame
-			# until make the cuboid with the derired number of frames
-			if len(cub_info[1]) > 0:
-				rest = self.cub_frames - len(cub_info[1])
-				cub_info[1].extend([cub_info[1][-1]]*rest)
+			shard[offset: offset + v_info['frames']] = cub_set.reshape(
+										-1, *cub_set.shape[2:])[:v_info['frames']]
 
-				self._cuboids_info.append(cub_info)
+			index['videos'].append({
+						'name': os.path.basename(v_info['video fname']),
+						'frames': int(v_info['frames']),
+						'shard': s, 'offset': offset})
+			offset += int(v_info['frames'])
 
-		# Note the video's information
-		self._update_video_info()
+		shard.flush()
+		del shard
 
-	def _load_cuboid(self, cuboid: tuple, prep_fn=None):
+		index['shards'].append(fname)
 
-		"""Loads a cuboid from its video frames files
-		"""
+	# The index is written at last so that only complete packed datasets
+	# can be read
+	fd, tmp_fname = tempfile.mkstemp(suffix='.json', dir=dest)
 
-		filenames = (cuboid[0]+'/'+ fp for fp in cuboid[1])
+	with os.fdopen(fd, 'w') as f:
+		json.dump(index, f)
 
-		frames = []
+	os.replace(tmp_fname, os.path.join(dest, PACKED_INDEX_FNAME))
 
-		for fn in filenames:
+class ValidationCache(Sequence):
 
-			# Loads the frame and store it
-			try:
-				img = img_to_array(load_img(fn))
-			except:
-				print(fn)
-				raise
+	"""Compact in-memory copy of a set of cuboids, such as a validation set,
+		loaded once and flowed in batches given both as the input and the
+		label of the model, without duplicating them
 
-			# Apply preprocessing function if specified
-			if prep_fn:
-				img = prep_fn(img)
+		Attributes
+		----------
 
-			# Check loaded images have the same format
-			if frames and (frames[-1].shape != img.shape or
-												frames[-1].dtype != img.dtype):
-				raise ValueError('Differents sizes or types for images loaded'\
-								' detected for image "{}"'.format(fn))
+		cub_set : CuboidsGenerator instance or numpy array
+			Cuboids to be stored
 
-			frames.append(img)
+		batch_size : int (default None)
+			Number of cuboids of each batch. If None, the batch size of the
+			generator or 1 for an array
 
-		frames = np.array(frames)
+		storage_dtype : str (default "float16")
+			Type in which the cuboids are stored: "uint8" (for cuboids
+			normalized in [0, 1]), "float16" or None to store the cuboids as
+			they are
 
-		return frames
+		port : float or int (default None)
+			Ratio in (0, 1] or number of cuboids randomly sampled from the
+			set, which are stored in their original order. If None, all
+			the cuboids are stored
 
-	def _update_video_info(self):
+		seed : int (default None)
+			Seed used for sampling the cuboids
 
-		video_info_list = []
+		Note: The batches are returned as float32 arrays unless the cuboids
+			are stored as they are
+	"""
 
-		video_info = None
-		for i, cub_info in enumerate(self._cuboids_info):
+	# Number of batches of the generator loaded at once when it has no
+	# memory budget
+	LOAD_BATCHES = 8
 
-			if not video_info or video_info['video fname'] != cub_info[0]:
-				video_info = {'video fname': cub_info[0], 'frames': 0,
-								'first_cuboid_index': i, 'num_cuboids': 0}
-				video_info_list.append(video_info)
-			
-			video_info['frames'] += len(set(cub_info[1]))
-			video_info['num_cuboids'] += 1
+	def __init__(self, cub_set: CuboidsGenerator or np.ndarray,
+					batch_size: int=None, storage_dtype: str='float16',
+					port: float or int=None, seed: int=None):
 
-		self._video_info = video_info_list
+		# Check input
+		if not isinstance(cub_set, (CuboidsGenerator, np.ndarray)):
+			raise TypeError('"cub_set" must be a CuboidsGenerator or a numpy'\
+																	' array')
 
-	def augment_data(self, rate=None, **kwargs):
+		if batch_size is None:
+			batch_size = (cub_set.batch_size if isinstance(cub_set,
+												CuboidsGenerator) else 1)
 
-		"""Augment the retrievable by transformations applied to the original
-			cuboids wheter the rate is larger than 0. if rate is 0, disable the
-			data augmentation
+		if not isinstance(batch_size, int) or batch_size <= 0:
+			raise ValueError('"batch_size" must be an integer greater than 0')
 
-			Parameters
-			----------
+		storage_dtype = compact_dtype(storage_dtype)
 
-			rate: float (optional)
-				Max ratio of augmented cuboids to generate. The number of augmented
-				cuboids will be (rate * # original cuboids) which will be
-				added among the original cuboids. It will be greater than 0
+		n_cuboids = (len(cub_set._access_cuboids) if isinstance(cub_set,
+											CuboidsGenerator) else len(cub_set))
 
-			max_stride: int
-				Max stride applied between the original frames to construct the
-				generated cuboids. It will be in (0,# video frames/cuboids length]
-		"""
+		if port is None:
+			sel = np.arange(n_cuboids)
+		else:
+			if isinstance(port, float) and 0 < port <= 1:
+				port = max(1, round(port * n_cuboids))
+			elif not isinstance(port, int) or port <= 0:
+				raise ValueError('"port" must be a float in (0, 1] or an'\
+												' integer greater than 0')
 
-		# check input
-		if rate is not None and not isinstance(rate, (float, int)):
-			raise TypeError('"rate" must be float or int')
+			rng = np.random.default_rng(seed)
+			sel = np.sort(rng.choice(n_cuboids, min(port, n_cuboids),
+																replace=False))
 
-		if rate is not None and rate <= 0.0:
-			raise ValueError('"rate" must be greater or equal than 0')
+		# Attributes
+		self.__batch_size = batch_size
+		self.__storage_dtype = storage_dtype
 
-		if 'max_stride' not in kwargs:
-			raise AttributeError('"max_stride" must be provided')
+		if isinstance(cub_set, np.ndarray):
+			self.__cuboids = to_compact(cub_set[sel] if port is not None else
+													cub_set, storage_dtype)
+		else:
+			self.__cuboids = self.__load(cub_set, sel)
 
-		max_stride = kwargs['max_stride']
+	def __load(self, cub_gen: CuboidsGenerator, sel: np.ndarray) -> np.ndarray:
 
-		if not isinstance(max_stride, int):
-			raise TypeError('"max_stride" must be int')
+		"""Loads the selected cuboids of a generator on a preallocated array
+			by chunks taking at most the memory budget of the generator, if
+			given, or LOAD_BATCHES batches otherwise, and at most max_cuboids
+			cuboids, so that the whole set is never held uncompacted
+		"""
 
-		if max_stride < 2:
-			raise ValueError('"max_stride" must be greater than 1')
+		cuboids = None
 
-		# Procedure
-		n_aug_cuboids = int(rate * len(self._access_cuboids)) if rate else -1
+		# The first chunk only takes a batch to measure the cuboids memory
+		chunk = min(cub_gen.batch_size, cub_gen.max_cuboids)
+		start = 0
 
-		if n_aug_cuboids == 0 and rate > 0.0:
-			warning.warn('Rate specified is too low and no cuboid '\
-						'will be augmented')
+		while start < len(sel):
 
-		ori_cub_idx = 0 # Current video index used for generate a cuboid
-		stride = 2
-		start_frame_idx = 0 # First video frame to be added to the generated cuboid
-		new_cuboids = [] # New cuboids generated
-		augment = True
+			window = cub_gen._read_window([cub_gen._access_cuboids[i] for i in
+													sel[start:start + chunk]])
 
-		frame_idx = start_frame_idx
+			if cub_gen.storage_dtype != self.__storage_dtype:
+				window = to_compact(from_compact(window, cub_gen.storage_dtype),
+														self.__storage_dtype)
 
-		i = 0
-		while i != n_aug_cuboids:
+			if cuboids is None:
+				cuboids = np.empty((len(sel), *window.shape[1:]),
+														dtype=window.dtype)
 
-			new_cuboid = (self._cuboids_info[ori_cub_idx][0], [])
+				# The cuboids are read and converted through float32
+				cuboid_bytes = (np.prod(window.shape[1:]) *
+									np.dtype('float32').itemsize)
+				n_chunk = (cub_gen.max_bytes // cuboid_bytes if
+								cub_gen.max_bytes is not None else
+								ValidationCache.LOAD_BATCHES * cub_gen.batch_size)
 
-			# Forming a new cuboid from a strided-frames windows
-			for j in range(self.cub_frames):
-				new_cuboid[1].append(self._cuboids_info[ori_cub_idx][1][frame_idx])
-				frame_idx += stride
+			cuboids[start:start + len(window)] = window
+			start += len(window)
+			chunk = int(max(1, min(n_chunk, cub_gen.max_cuboids)))
 
-				if frame_idx >= len(self._cuboids_info[ori_cub_idx][1]):
-					# Next frames must be taken from the following cuboid
-					ori_cub_idx += 1
+		return cuboids
 
-				if ori_cub_idx == len(self._cuboids_info):
-					# No more cuboids can be generated from the original
-					# cuboids so let's start again from the start with a higher
-					# stride
-					start_frame_idx += 1
-					frame_idx = start_frame_idx
-					ori_cub_idx = 0
-				else:
-					frame_idx %= len(self._cuboids_info[ori_cub_idx][1])
+	### Observers
+	@property
+	def batch_size(self):
+		return self.__batch_size
 
-				if start_frame_idx == stride:
-					# A next video is reached so is not posible to generate
-					# the cuboid
-					start_frame_idx = 0
-					frame_idx = start_frame_idx
-					stride += 1
+	@property
+	def storage_dtype(self):
+		return self.__storage_dtype
 
-				if stride > max_stride:
-					# No more stride can be used so let's start for the first
-					# stride value using a new start frame index
-					augment = False
-					break
+	@property
+	def nbytes(self):
+		return self.__cuboids.nbytes if self.__cuboids is not None else 0
 
-				if self._cuboids_info[ori_cub_idx][0] != new_cuboid[0]:
-					# A next video is reached so is not posible to generate
-					# the cuboid
+	def __len__(self):
+		return int(np.ceil(self.num_cuboids / self.__batch_size))
 
+	@property
+	def num_cuboids(self):
+		return len(self.__cuboids) if self.__cuboids is not None else 0
 
-					break
+	def __getitem__(self, idx: int):
 
-			if len(new_cuboid[1]) == self.cub_frames:
-				# Check if the cuboid is formed among all the required frames
-				new_cuboids.append(new_cuboid)
+		if idx < 0:
+			idx += len(self)
 
-			i += 1
+		if idx < 0 or idx >= len(self):
+			raise IndexError('Index out of range')
 
-			if not augment:
-				if n_aug_cuboids != -1:
-					warnings.warn('Only {} new cuboids could be '\
-								'generated with the configuration'\
-								' provided'.format(i-1))
-				break
+		batch = from_compact(self.__cuboids[idx*self.__batch_size:
+											(idx + 1)*self.__batch_size],
+								self.__storage_dtype)
 
-		# Agregate the new cuboids generated to the info and update object
-		self._cuboids_info.extend(new_cuboids)
-		self._access_cuboids = copy(self._cuboids_info)
-		self._update_video_info()
+		return batch, batch
 
-class CuboidsGeneratorFromVid(CuboidsGenerator):
+	def subsample(self, port: float or int, seed: int=None):
 
-	"""Implementation of the Cuboids Generator utility for the retrieval of
-		cuboids from a video directory containing a video file for each video.
+		"""Returns a new cache with a random sample of the stored cuboids
 
-		Parameters
-		----------
+			Parameters
+			----------
 
-		source: str
-			Directory containing the videos to be flowed as cuboids
+			port : float or int
+				Ratio in (0, 1] or number of cuboids sampled
 
-		cub_frames: int
-			Number of frames contained on a cuboid
+			seed : int (default None)
+				Seed used for sampling the cuboids
+		"""
 
-		prep_fn: function (optional)
-			Function containing the preprocessing operations workflow to be
-				applied to each video frame
+		return ValidationCache(self.__cuboids, self.__batch_size,
+								self.__storage_dtype, port, seed)
 
-		max_cuboids: int (default 100)
-			Max number of consecutive cuboids to be retrieved from disk when
-			the generator flows cuboids from the videos
-	"""
+# Generator and attached batch slots of each process of the pools used by
+# SharedMemoryCuboidsGen
+_shm_worker_gen = None
+_shm_worker_slots = {}
 
-	def __init__(self, source: str, cub_frames: int, prep_fn=None,
-					batch_size=1, max_cuboids: int=300, shuffle=False,
-					seed=None, return_cub_as_label=False):
+def _shm_worker_init(cub_gen: CuboidsGenerator):
 
-		super(CuboidsGeneratorFromVid, self).__init__(source, cub_frames,
-													prep_fn, batch_size,
-													max_cuboids, shuffle,
-													seed,
-													return_cub_as_label)
+	"""Initializes a loading process of a SharedMemoryCuboidsGen with its own
+		copy of the cuboids generator
+	"""
 
-		self.__cap_opened = None # To make more efficient the video retrieval
+	global _shm_worker_gen
 
-	def _scan_source_dir(self):
+	# The threads of the OpenCV pool are not inherited by the forked
+	# processes, so that the frames are decoded and preprocessed sequentially
+	# by each loading process
+	cv2_set_num_threads(0)
 
-		"""Scans the desired video directory looking for all video files
-			and note them into cuboids for posterior loading
-		"""
+	# The copy does not share the opened captures nor the loaded window
+	_shm_worker_gen = cub_gen._partition(cub_gen._cuboids_info)
+	_shm_worker_slots.clear()
 
-		self._cuboids_info = []
+def _shm_worker_load(cuboids: list, slot_name: str) -> tuple:
 
-		for d in sorted(os.listdir(self.source)):
+	"""Loads the cuboids of a batch as they are stored on memory on the given
+		shared memory batch slot and returns the shape and type of the batch
+	"""
 
-			fname = (self.source +
-						('/' if not self.source.endswith('/') else '') + d)
+	if slot_name not in _shm_worker_slots:
+		_shm_worker_slots[slot_name] = shared_memory.SharedMemory(slot_name)
 
-			fv = VideoCapture(fname)
+	slot = _shm_worker_slots[slot_name]
+	batch = _shm_worker_gen._read_window(cuboids)
 
-			# Get video file and split its frames in cuboids
-			if not fv.isOpened():
-				warnings.warn('"{}" not a valid video file and will'\
-												' be omitted'.format(fname))
-				continue
+	if batch.nbytes > slot.size:
+		raise RuntimeError('The loaded batch takes {} bytes and overpasses'\
+							' the {} bytes of the batch slots'.format(
+														batch.nbytes, slot.size))
 
-			n_frames = int(fv.get(7))
+	np.ndarray(batch.shape, dtype=batch.dtype, buffer=slot.buf)[...] = batch
 
-			# Note the information's video
-			#self._video_info.append({'video fname': fname,
-										#'frames': n_frames})
+	return batch.shape, batch.dtype.str
 
-			# List frames and group them into cuboids
-			for i in range(0, n_frames, self.cub_frames):
-				self._cuboids_info.append((fname, i,
-										min(i + self.cub_frames, n_frames) - 1,
-											1))
+def _release_shm_loader(pool, slots: list):
 
-			fv.release()
+	"""Terminates the loading processes of a SharedMemoryCuboidsGen and
+		releases its shared memory batch slots
+	"""
 
-		# Note the information's video
-		self._update_video_info()
+	if pool is not None:
+		pool.terminate()
+		pool.join()
 
-	def _update_video_info(self):
+	for slot in slots:
 
-		video_info_list = []
+		# The slot can only be closed once its returned batches are freed
+		try:
+			slot.close()
+		except BufferError:
+			pass
 
-		video_info = None
-		for i, cub_info in enumerate(self._cuboids_info):
+		try:
+			slot.unlink()
+		except FileNotFoundError:
+			pass
 
-			if not video_info or video_info['video fname'] != cub_info[0]:
-				video_info = {'video fname': cub_info[0], 'frames': 0,
-								'first_cuboid_index': i, 'num_cuboids': 0}
-				video_info_list.append(video_info)
-			
-			video_info['num_cuboids'] += 1			
-			video_info['frames'] += np.floor((cub_info[2] - cub_info[1] + 1) / cub_info[3]).astype(int) # len(set(cub_info[1]))
+	slots.clear()
 
-		self._video_info = video_info_list
+class SharedMemoryCuboidsGen(Sequence):
 
-	def _load_cuboid(self, cuboid: tuple, prep_fn=None):
+	"""Data generator retrieving the batches of a cuboids generator loaded by
+		a pool of processes, so that the frames are decoded and preprocessed
+		out of the training process. Each process loads the batches on its
+		own copy of the generator and writes them on a ring of batch slots
+		allocated on shared memory, from which the batches are returned
+		without being copied nor pickled.
 
-		"""Loads a cuboid from its video frames files
-		"""
-		fname = cuboid[0]
-		frames_range = cuboid[1:-1]
-		stride = cuboid[-1]
+		Attributes
+		----------
 
-		cuboid_data = None
-		n_frames = frames_range[0] # Number of readen frames
+		cub_gen : CuboidsGenerator instance
+			Generator whose batches are loaded. It must be partitioned and
+			augmented before being wrapped, although it can be shuffled later
+
+		processes : int (default 2)
+			Number of loading processes
+
+		slots : int (default 4)
+			Number of batch slots on shared memory. The batches following
+			the last retrieved one are loaded in advance on the free slots
+
+		held_batches : int (default 1)
+			Number of the last retrieved batches whose slots are not reused,
+			i.e. each returned batch is overwritten after held_batches more
+			batches are retrieved. It must be greater than the number of
+			batches buffered by the consumer (e.g. max_queue_size when the
+			model is fitted with several workers or the batches prefetched
+			by a tf.data pipeline, whose tensors may share the memory of the
+			returned batches)
+
+		max_tasks_per_process : int (default None)
+			Number of batches loaded by each process before it is replaced by
+			a new one, releasing the memory it holds (e.g. the decoded frames
+			of the virtual augmented cuboids). If None, the processes are not
+			replaced
+
+		start_method : str (default None)
+			Start method of the loading processes: "fork", "forkserver" or
+			"spawn". If None, the processes are forked when supported by the
+			platform
+
+		Note: The processes forked from a process whose thread pools were
+			started (e.g. by TensorFlow or OpenCV) only inherit the thread
+			calling fork, which is a known source of deadlocks if the
+			children use those pools. The loading processes only decode and
+			preprocess frames with OpenCV, whose threading is disabled on
+			them, and never call TensorFlow, but the preprocessing functions
+			must not use TensorFlow either. The "forkserver" and "spawn"
+			start methods avoid this limitation, although they require the
+			generator and its preprocessing functions to be picklable (e.g.
+			not lambdas) and the main module to be importable without
+			running the training (guarded by if __name__ == '__main__').
+			The exceptions raised while loading a batch are raised again
+			when the batch is retrieved. The processes and the shared memory
+			are released by close().
+	"""
 
-		# Load the desired video frames
-		if (self.is_shuffled() or self.__cap_opened is None or
-								self.__cap_opened[0] != fname or
-								frames_range[0] != self.__cap_opened[2]+1):
+	def __init__(self, cub_gen: CuboidsGenerator, processes: int=2,
+					slots: int=4, held_batches: int=1,
+					max_tasks_per_process: int=None, start_method: str=None):
 
-			if self.__cap_opened is not None:
-				self.__cap_opened[1].release()
+		# Check input
+		if not isinstance(cub_gen, CuboidsGenerator):
+			raise TypeError('A valid cuboid\'s generator must be provided')
 
-			vid = VideoCapture(fname)
+		if not isinstance(processes, int) or processes <= 0:
+			raise ValueError('"processes" must be an integer greater than 0')
 
-			if not vid.isOpened():
-				raise ValueError('Cannot load frames {} from video '\
-										'file {}'.format(frames_range, fname))
+		if not isinstance(held_batches, int) or held_batches <= 0:
+			raise ValueError('"held_batches" must be an integer greater than 0')
 
-			vid.set(1, frames_range[0])
+		if not isinstance(slots, int) or slots <= held_batches:
+			raise ValueError('"slots" must be an integer greater than'\
+																' held_batches')
 
-			# Store the Video Capture for retrieval of next cuboid belonging
-			# to the same video
-			if not self.is_shuffled():
-				self.__cap_opened = [fname, vid, frames_range[1]]
-		else:
-			vid = self.__cap_opened[1]
-			self.__cap_opened[2] = frames_range[1] # Update the last frame taken
+		if max_tasks_per_process is not None and (
+							not isinstance(max_tasks_per_process, int) or
+							max_tasks_per_process <= 0):
+			raise ValueError('"max_tasks_per_process" must be None or an'\
+												' integer greater than 0')
 
-		for i in range(self.cub_frames):
+		if (start_method is not None and start_method not in
+									multiprocessing.get_all_start_methods()):
+			raise ValueError('"start_method" must be None or one of {}'.format(
+								multiprocessing.get_all_start_methods()))
 
-			if n_frames <= frames_range[1]: #readen
+		if not len(cub_gen):
+			raise ValueError('The cuboids generator has no cuboids')
 
-				# Take consecutive frames separated by the stride
-				ret, fr = vid.read()
+		# Attributes
+		self.__cub_gen = cub_gen
+		self.__processes = processes
+		self.__held_batches = held_batches
+		self.__max_tasks_per_process = max_tasks_per_process
+		self.__start_method = start_method
+
+		self.__pending = {}			# Batch index -> (slot, loading result)
+		self.__held = []			# Slots of the last retrieved batches
+		self.__next = 0				# Next batch to be loaded in advance
+
+		# The batch slots are sized from a cuboid loaded on this process
+		cub_bytes = cub_gen._read_window(cub_gen._access_cuboids[:1]).nbytes
+
+		self.__slots = []
+		self.__free = []
+		self.__pool = None
+
+		try:
+			for i in range(slots):
+				self.__slots.append(shared_memory.SharedMemory(create=True,
+									size=max(1, cub_bytes*cub_gen.batch_size)))
+				self.__free.append(i)
+
+			if start_method is None:
+				start_method = ('fork' if 'fork' in
+								multiprocessing.get_all_start_methods() else
+								None)
+
+			context = multiprocessing.get_context(start_method)
+
+			self.__pool = context.Pool(processes,
+								initializer=_shm_worker_init,
+								initargs=(cub_gen,),
+								maxtasksperchild=max_tasks_per_process)
+		except BaseException:
+			_release_shm_loader(self.__pool, self.__slots)
+			raise
+
+		# The processes and slots are also released when the generator is
+		# collected or the interpreter exits
+		self.__finalizer = weakref.finalize(self, _release_shm_loader,
+											self.__pool, self.__slots)
 
-				if not ret:
-					raise ValueError('Failed to load frame {} from video '\
-												'file {}'.format(i, fname))
+	### Observers
+	@property
+	def cub_gen(self):
+		return self.__cub_gen
 
-				n_frames += 1
+	@property
+	def processes(self):
+		return self.__processes
 
-				# Apply preprocessing function if specified
-				if prep_fn:
-					fr = prep_fn(fr)
+	@property
+	def slots(self):
+		return len(self.__slots)
 
-				# Add the frame readen to the cuboid
-				if cuboid_data is None:
-					cuboid_data = np.zeros((self.cub_frames,
-										*fr.shape), dtype=fr.dtype)
+	@property
+	def held_batches(self):
+		return self.__held_batches
 
-				cuboid_data[i] = fr
+	@property
+	def max_tasks_per_process(self):
+		return self.__max_tasks_per_process
 
-				# Exclude the next middle frames if stride
-				for _ in range(stride-1):
-					if n_frames <= frames_range[1]:
-						ret = vid.grab()
-						n_frames += 1
+	@property
+	def start_method(self):
+		return self.__start_method
 
-			else:
+	@property
+	def batch_size(self):
+		return self.__cub_gen.batch_size
 
-				# Repeat the last frame if a complete cuboid cannot be taken
-				# from the remained video frames
-				cuboid_data[i] = cuboid_data[i-1]
+	@property
+	def return_cub_as_label(self):
+		return self.__cub_gen.return_cub_as_label
 
-			# Check loaded images have the same format
-			#if frames and (frames[-1].shape != fr.shape or
-			#									frames[-1].dtype != fr.dtype):
-			#	raise ValueError('Differents sizes or types for images loaded'\
-			#					' detected for image "{}"'.format(fn))
+	def __len__(self):
+		return len(self.__cub_gen)
 
-		# Add the remaind cuboid and fill it by repetitions of last frame
-		# until make the cuboid with the derired number of frames
-		#if len(frames) < self.cub_frames:
-		#	rep = len(frames) - self.cub_frames
-		#	frames.extend([frames[-1]]*rep)
+	def __schedule(self):
 
-		#frames = np.array(frames)
-		#vid.release()
+		"""Starts the loading of the following batches on the free slots
+		"""
 
-		return cuboid_data
+		batch_size = self.__cub_gen.batch_size
 
-	def augment_data(self, rate=None, **kwargs):
+		while self.__free and self.__next < len(self):
 
-		"""Augment the retrievable by transformations applied to the original
-			cuboids wheter the rate is larger than 0. if rate is 0, disable the
-			data augmentation
+			slot = self.__free.pop(0)
+			cuboids = self.__cub_gen._access_cuboids[
+											self.__next*batch_size:
+											(self.__next + 1)*batch_size]
 
-			Parameters
-			----------
+			self.__pending[self.__next] = (slot, self.__pool.apply_async(
+												_shm_worker_load,
+												(cuboids,
+												self.__slots[slot].name)))
+			self.__next += 1
 
-			rate: float (optional)
-				Max ratio of augmented cuboids to generate. The number of augmented
-				cuboids will be (rate * # original cuboids) which will be
-				added among the original cuboids. It will be greater than 0
+	def __discard(self):
 
-			max_stride: int
-				Max stride applied between the original frames to construct the
-				generated cuboids. It will be in (0,# video frames/cuboids length]
+		"""Discards the batches loaded in advance, releasing their slots once
+			the processes have finished writing on them
 		"""
 
-		# check input
-		if rate is not None and not isinstance(rate, (float, int)):
-			raise TypeError('"rate" must be float or int')
+		for slot, result in self.__pending.values():
+			result.wait()
+			self.__free.append(slot)
 
-		if rate is not None and rate <= 0.0:
-			raise ValueError('"rate" must be greater or equal than 0')
+		self.__pending.clear()
 
-		if 'max_stride' not in kwargs:
-			raise AttributeError('"max_stride" must be provided')
+	def __getitem__(self, idx: int):
 
-		max_stride = kwargs['max_stride']
+		"""Retrieves the idx-th batch of the cuboids generator as a view of
+			its batch slot unless the frames are compactly stored (see
+			CuboidsGenerator's storage_dtype)
+		"""
 
-		if not isinstance(max_stride, int):
-			raise TypeError('"max_stride" must be int')
+		if not isinstance(idx, (int, np.integer)):
+			raise TypeError('The passed index must be integer')
 
-		if max_stride < 2:
-			raise ValueError('"max_stride" must be greater than 1')
+		if idx < 0:
+			idx += len(self)
 
-		# Procedure
-		n_aug_cuboids = int(rate * len(self._access_cuboids)) if rate else -1
+		if idx < 0 or idx >= len(self):
+			raise IndexError('Index out of range')
 
-		if n_aug_cuboids == 0 and rate > 0.0:
-			warning.warn('Rate specified is too low and no cuboid '\
-						'will be augmented')
+		if self.__pool is None:
+			raise RuntimeError('The generator has been closed')
 
-		ori_vid_idx = 0 # Current video index used for generate a cuboid
-		ori_cub_idx = 0 # First cuboid of the current video
-		stride = 2
-		start_frame_idx = 0 # First video frame to be added to the generated cuboid
-		new_cuboids = [] # New cuboids generated
-		new_cuboid = None
-		augment = True
+		# Any access other than the sequential ones discards the batches
+		# loaded in advance
+		if idx not in self.__pending:
+			self.__discard()
+			self.__next = idx
+			self.__schedule()
 
-		frame_idx = start_frame_idx + self._cuboids_info[ori_cub_idx][1]
+		slot, result = self.__pending.pop(idx)
 
-		i = 0
-		while i != n_aug_cuboids:
+		try:
+			shape, dtype = result.get()
+		except BaseException:
+			self.__free.append(slot)
+			raise
 
-			# Construct a new cuboid
-			new_cuboid = (self._video_info[ori_vid_idx]['video fname'],
-							frame_idx,
-							min(frame_idx + self.cub_frames*stride,
-								 self._video_info[ori_vid_idx]['frames'] +
-									 self._cuboids_info[ori_cub_idx][1]) -1,
-									stride)
+		# Release the slot of the oldest held batch for the following ones
+		self.__held.append(slot)
 
-			# Prepare the following cuboid
-			frame_idx = new_cuboid[2] + 1 
+		if len(self.__held) > self.__held_batches:
+			self.__free.append(self.__held.pop(0))
 
-			# Discard non-valid cuboids
-			if (new_cuboid[2] - new_cuboid[1] +1) >= new_cuboid[3]:
-				new_cuboids.append(new_cuboid)
+		self.__schedule()
 
-			if frame_idx - self._cuboids_info[ori_cub_idx][1] == self._video_info[ori_vid_idx]['frames']:
-				# Next frames must be taken from the following cuboid
-				ori_cub_idx += np.ceil(self._video_info[ori_vid_idx]['frames'] / self.cub_frames).astype(int)
-				ori_vid_idx += 1
-				frame_idx = start_frame_idx
+		ret = from_compact(np.ndarray(shape, dtype=dtype,
+										buffer=self.__slots[slot].buf),
+							self.__cub_gen.storage_dtype)
 
-			if ori_vid_idx == len(self._video_info):
-				# No more cuboids can be generated from the original
-				# cuboids so let's start again from the start with a higher
-				# stride
-				start_frame_idx += 1
-				ori_vid_idx = 0
-				ori_cub_idx = 0
-				frame_idx = start_frame_idx + self._cuboids_info[ori_cub_idx][1]
+		return ret if not self.return_cub_as_label else (ret, ret)
 
-			if start_frame_idx == stride:
-				# A next video is reached so is not posible to generate
-				# the cuboid
-				start_frame_idx = 0
-				frame_idx = start_frame_idx + self._cuboids_info[ori_cub_idx][1]
-				stride += 1
+	def on_epoch_end(self):
 
-			if stride > max_stride:
-				# No more stride can be used so let's start for the first
-				# stride value using a new start frame index
-				break
+		# The generator may change the order of the cuboids
+		self.__cub_gen.on_epoch_end()
 
-			i += 1
+		if self.__pool is not None:
+			self.__discard()
+			self.__next = 0
 
-		if n_aug_cuboids != -1 and i < n_aug_cuboids:
-			warnings.warn('Only {} new cuboids could be '\
-						'generated with the configuration'\
-						' provided'.format(i-1))
+	def close(self):
 
-		# Agregate the new cuboids generated to the info and update object
-		self._cuboids_info.extend(new_cuboids)
-		self._access_cuboids = copy(self._cuboids_info)
-		self._update_video_info()
+		"""Terminates the loading processes and releases the shared memory
+			batch slots. The batches retrieved before are not valid anymore
+		"""
 
-	def __del__(self):
-		if self.__cap_opened is not None:
-			self.__cap_opened[1].release()
-		#super(CuboidsGeneratorFromVid, self).__del__()
+		self.__finalizer()
+		self.__pool = None
+
+		self.__pending.clear()
+		self.__held.clear()
+		self.__free.clear()
 
 class ConsecutiveCuboidsGen(Sequence):
 
@@ -1151,13 +3528,27 @@ class ConsecutiveCuboidsGen(Sequence):
 		cub_gen : CuboidsGenerator instance
 			Original generator of cuboids from which the cuboids will be
 			retrieved
+
+		reuse_buffer : bool (default False)
+			Build the batches containing cuboids from several videos on the
+			same output array instead of allocating a new one for each
+			batch. When enabled, each returned batch may be overwritten by
+			the next retrieved batch.
+
+		Note: The frames of each video are loaded only once and the batches
+			of cuboids from the same video are returned as read-only views
+			of them unless the frames are compactly stored (see
+			CuboidsGenerator's storage_dtype)
 	"""
-	def __init__(self, cub_gen: CuboidsGenerator):
+	def __init__(self, cub_gen: CuboidsGenerator, reuse_buffer: bool=False):
 
 		# Check input
 		if not isinstance(cub_gen, CuboidsGenerator):
 			raise TypeError('A valid cuboid\'s generator must be provided')
 
+		if not isinstance(reuse_buffer, bool):
+			raise ValueError('"reuse_buffer" must be boolean')
+
 		# Attributes
 		self.__cub_gen = cub_gen
 		self.__video_info = copy(cub_gen.video_info)
@@ -1214,9 +3605,13 @@ class ConsecutiveCuboidsGen(Sequence):
 												cub_gen.cub_frames)
 
 
-		self.__frames = None
+		self.__frames = None	# Frames of the loaded video
+		self.__cuboids = None	# View of the consecutive cuboids of the video
 		self.__loaded_frame_range = [None, None]
 
+		self.__reuse_buffer = reuse_buffer
+		self.__buffer = None
+
 	## Observers
 	@property
 	def return_cub_as_label(self):
@@ -1226,6 +3621,10 @@ class ConsecutiveCuboidsGen(Sequence):
 	def batch_size(self):
 		return self.__batch_size
 
+	@property
+	def reuse_buffer(self):
+		return self.__reuse_buffer
+
 	def __len__(self):
 		return np.ceil(self.__access_frames[-1] / self.batch_size).astype(int)
 
@@ -1234,90 +3633,259 @@ class ConsecutiveCuboidsGen(Sequence):
 		"""Returns the real number of cuboids retrievable"""
 		return self.__access_frames[-1]
 
-	def __get_cuboid(self, idx: int):
+	def __video_cuboids(self, vid_idx: int) -> tuple:
 
-		if idx < 0:
-			idx %= self.__access_frames[-1]
+		"""Returns the range of original cuboids containing the frames of a
+			video
+		"""
 
-		if idx >= self.__access_frames[-1]:
-			raise IndexError('Index out of range')
+		start = self.__video_info[vid_idx-1]['cum frames'] // self.__cub_gen.cub_frames if vid_idx > 0 else 0
+		stop = self.__video_info[vid_idx]['cum frames'] // self.__cub_gen.cub_frames
 
-		if self.__frames is None or not (idx >= self.__loaded_frame_range[0] and
-										idx < self.__loaded_frame_range[1]):
+		return start, stop
 
-			# Look for the video containing the desired frames
-			vid_idx = np.searchsorted(self.__access_frames, idx, side='right')
-
-			self.__loaded_frame_range[0] = self.__access_frames[vid_idx -1] if vid_idx > 0 else 0
-			self.__loaded_frame_range[1] = self.__access_frames[vid_idx]
-
-			"""
-			start = (self.__video_info[vid_idx-1]['frames'] +
-						self.__cub_gen.cub_frames -
-					self.__video_info[vid_idx-1]['frames'] %
-						self.__cub_gen.cub_frames) if vid_idx > 0 else 0
-			"""
-			start = self.__video_info[vid_idx-1]['cum frames'] // self.__cub_gen.cub_frames if vid_idx > 0 else 0
-			stop = self.__video_info[vid_idx]['cum frames'] // self.__cub_gen.cub_frames
-
-			"""
-			stop = np.ceil((start + self.__video_info[vid_idx]['frames'] +
-							self.__cub_gen.cub_frames -
-							self.__video_info[vid_idx]['frames'] %
-							self.__cub_gen.cub_frames )/8).astype(int)
-			start = np.ceil(start / 8).astype(int)
-			"""
-
-			self.__frames = self.__cub_gen[start: stop]
-			self.__frames = self.__frames.reshape(self.__frames.shape[0] *
-													self.__frames.shape[1],
-												*self.__frames.shape[2:])
-
-
-		# The desired frames are already loaded on RAM so it can be returned
-		# directly
-		idx -= self.__loaded_frame_range[0]
-		ret = self.__frames[idx: idx + self.__cub_gen.cub_frames]
-
-		# The cuboid is not complete so it must be fill with repetitions
-		# of last frame
-		if ret.shape[0] != self.__cub_gen.cub_frames:
-			append = np.repeat(ret[np.newaxis, -1],
-									self.__cub_gen.cub_frames - ret.shape[0],
+	def __video_frames(self, vid_idx: int, cuboids: np.ndarray) -> np.ndarray:
+
+		"""Returns the frames of a video required for taking all its
+			consecutive cuboids from its original cuboids
+		"""
+
+		cub_frames = self.__cub_gen.cub_frames
+
+		frames = cuboids.reshape(cuboids.shape[0] * cuboids.shape[1],
+								*cuboids.shape[2:])
+
+		# The last cuboids of videos shorter than a cuboid are not complete,
+		# so they are filled with repetitions of the last frame
+		n_cuboids = (self.__access_frames[vid_idx] -
+						(self.__access_frames[vid_idx-1] if vid_idx > 0 else 0))
+		n_frames = n_cuboids + cub_frames - 1
+
+		if n_frames > frames.shape[0]:
+			frames = np.concatenate((frames,
+									np.repeat(frames[np.newaxis, -1],
+												n_frames - frames.shape[0],
+																	axis=0)),
 									axis=0)
 
-			ret = np.concatenate((ret, append),
-							axis=0)
+		return frames[:n_frames]
 
-		ret = np.expand_dims(ret, axis=0)
+	def __load_video(self, vid_idx: int):
 
-		return ret
+		"""Loads the frames of a video and builds the view of all its
+			consecutive cuboids
+		"""
+
+		self.__loaded_frame_range[0] = self.__access_frames[vid_idx -1] if vid_idx > 0 else 0
+		self.__loaded_frame_range[1] = self.__access_frames[vid_idx]
+
+		start, stop = self.__video_cuboids(vid_idx)
+
+		self.__frames = self.__video_frames(vid_idx,
+							self.__cub_gen._get_stored(slice(start, stop)))
+		self.__cuboids = np.moveaxis(sliding_window_view(self.__frames,
+												self.__cub_gen.cub_frames,
+												axis=0),
+									-1, 1)
+
+	def __get_cuboids(self, start: int, stop: int):
+
+		"""Returns a view of the consecutive cuboids from start to stop or the
+			remained cuboids of the video containing the start cuboid
+		"""
+
+		if self.__cuboids is None or not (start >= self.__loaded_frame_range[0]
+									and start < self.__loaded_frame_range[1]):
+
+			# Look for the video containing the desired frames
+			self.__load_video(np.searchsorted(self.__access_frames, start,
+																side='right'))
+
+		return self.__cuboids[start - self.__loaded_frame_range[0]:
+								stop - self.__loaded_frame_range[0]]
 
 	def __getitem__(self, idx):
 
-		if self.__batch_size == 1:
-			ret = self.__get_cuboid(idx)
-		else:
-			start = idx * self.__batch_size
-			stop = min(idx * self.__batch_size + self.__batch_size,
-						self.__access_frames[-1])
+		if idx < 0:
+			idx %= len(self)
 
-			# Get first cuboid and allocate for the remained cuboids
-			f_cub = self.__get_cuboid(start)[0]
+		if idx >= len(self):
+			raise IndexError('Index out of range')
+
+		start = idx * self.__batch_size
+		stop = min(start + self.__batch_size, self.__access_frames[-1])
+
+		ret = self.__get_cuboids(start, stop)
+
+		if ret.shape[0] != stop - start:
+
+			# The batch contains cuboids from several videos and must be
+			# built on an output array
+			shape = (stop - start, *ret.shape[1:])
+
+			if (not self.__reuse_buffer or self.__buffer is None or
+											self.__buffer.shape[1:] != shape[1:]
+											or self.__buffer.dtype != ret.dtype):
+				self.__buffer = np.empty((self.__batch_size, *shape[1:]),
+															dtype=ret.dtype)
+
+			out = self.__buffer[:shape[0]]
+			out[:ret.shape[0]] = ret
+			filled = ret.shape[0]
+
+			while filled < shape[0]:
+				ret = self.__get_cuboids(start + filled, stop)
+				out[filled: filled + ret.shape[0]] = ret
+				filled += ret.shape[0]
 
-			ret = np.zeros((stop - start, *f_cub.shape), dtype=f_cub.dtype)
-			ret[0] = f_cub
+			ret = out
 
-			# Retrieve the remain cuboids
-			for i in range(stop - start):
-				ret[i] = self.__get_cuboid(i + start)[0]
+		# Convert the compactly stored frames
+		ret = from_compact(ret, self.__cub_gen.storage_dtype)
 
 		return ret if not self.return_cub_as_label else (ret, ret)
 
+	def video_frames(self, vid_idx: int) -> np.ndarray:
+
+		"""Returns the frames of a video from which its consecutive cuboids
+			are taken, including the repetitions of its last frame
+		"""
+
+		if vid_idx < 0 or vid_idx >= len(self.__video_info):
+			raise IndexError('Video index out of range')
+
+		start, stop = self.__video_cuboids(vid_idx)
+
+		return from_compact(self.__video_frames(vid_idx,
+								self.__cub_gen._get_stored(slice(start, stop))),
+							self.__cub_gen.storage_dtype)
+
+	def to_tf_dataset(self, num_parallel_calls: int=None,
+						prefetch: int=None, interleave: int=1,
+						deterministic: bool=True):
+
+		"""Returns a tf.data.Dataset flowing the consecutive cuboids on
+			batches of batch_size cuboids (as (cuboids, cuboids) if
+			return_cub_as_label is set).
+
+			The frames of each video are loaded by a parallel map, so several
+			videos are loaded concurrently, and the consecutive cuboids of
+			each video are taken from its frames.
+
+			Parameters
+			----------
+
+			num_parallel_calls : int or None
+				Number of videos loaded concurrently. None for tuning it
+				dynamically
+
+			prefetch : int or None
+				Number of batches prefetched. None for tuning it dynamically
+				and 0 for disabling the prefetching
+
+			interleave : int (default 1)
+				Number of videos whose cuboids are flowed interleaved. With 1,
+				the cuboids are flowed in the same order as by the generator
+
+			deterministic : bool
+				Flow the loaded videos in order. If False, videos loaded first
+				are flowed first
+
+			Return
+			------
+			tf.data.Dataset
+		"""
+
+		# Check input
+		if num_parallel_calls is not None and (not isinstance(
+								num_parallel_calls, int) or num_parallel_calls <= 0):
+			raise ValueError('"num_parallel_calls" must be None or an integer'\
+															' greater than 0')
+
+		if prefetch is not None and (not isinstance(prefetch, int) or
+																prefetch < 0):
+			raise ValueError('"prefetch" must be None or a non negative integer')
+
+		if not isinstance(interleave, int) or interleave <= 0:
+			raise ValueError('"interleave" must be an integer greater than 0')
+
+		if not isinstance(deterministic, bool):
+			raise ValueError('"deterministic" must be boolean')
+
+		# Procedure
+		cub_gen = self.__cub_gen
+		cub_frames = cub_gen.cub_frames
+		cuboids = copy(cub_gen._access_cuboids)
+
+		def load_video(vid_idx):
+			start, stop = self.__video_cuboids(vid_idx)
+
+			return from_compact(self.__video_frames(vid_idx,
+									cub_gen._read_cuboids(cuboids[start:stop])),
+								cub_gen.storage_dtype)
+
+		# Take the frames format from the first cuboid
+		sample = from_compact(cub_gen._read_cuboids(cuboids[:1]),
+												cub_gen.storage_dtype)[0]
+
+		def load_tf_video(vid_idx):
+			frames = tf_numpy_function(load_video, [vid_idx], sample.dtype)
+			frames.set_shape((None, *sample.shape[1:]))
+
+			return frames
+
+		def video_cuboids(frames):
+			return tf_data.Dataset.range(
+							tf_shape(frames, out_type='int64')[0] -
+							cub_frames + 1).map(
+								lambda i: frames[i: i + cub_frames])
+
+		dataset = tf_data.Dataset.range(len(self.__video_info))
+		dataset = dataset.map(load_tf_video,
+						num_parallel_calls=(num_parallel_calls or
+														tf_data.AUTOTUNE),
+						deterministic=deterministic)
+
+		if interleave > 1:
+			dataset = dataset.interleave(video_cuboids,
+											cycle_length=interleave,
+											block_length=1)
+		else:
+			dataset = dataset.flat_map(video_cuboids)
+
+		dataset = dataset.batch(self.__batch_size)
+
+		if self.__return_cub_as_label:
+			dataset = dataset.map(lambda cub: (cub, cub))
+
+		if prefetch != 0:
+			dataset = dataset.prefetch(prefetch or tf_data.AUTOTUNE)
+
+		return dataset
+
 	@property
 	def cum_cuboids_per_video(self):
 		return tuple(self.__access_frames)
 
+	### Copy and serialization
+
+	def __getstate__(self):
+
+		"""The frames of the loaded video and the output buffer are not
+			serialized and are loaded again when the cuboids are accessed
+		"""
+
+		state = self.__dict__.copy()
+		state['_ConsecutiveCuboidsGen__frames'] = None
+		state['_ConsecutiveCuboidsGen__cuboids'] = None
+		state['_ConsecutiveCuboidsGen__loaded_frame_range'] = [None, None]
+		state['_ConsecutiveCuboidsGen__buffer'] = None
+
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+
 class FramesFromCuboidsGen(Sequence):
 
 	"""Data generator for the flowing of individuals frames from a set
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Author: Nicolás Cubero Torres
+# Description: Storage of the ground-truth anomaly labels of the test videos
+#				as anomalous frames intervals from which the labels of the
+#				cuboids supplied to the Incremental Spatio Temporal Learner
+#				architecture are derived for any cuboid length and stride.
+###############################################################################
+
+# Imported modules
+import numpy as np
+
+class FrameLabelStore:
+
+	"""Store of the anomalous frames of several videos noted as run-length
+		intervals, from which the labels of the cuboids taken from the videos
+		are derived for any number of frames per cuboid and stride between
+		cuboids.
+
+		Parameters
+		----------
+
+		n_frames : list or tuple of int
+			Number of frames of each video
+
+		intervals : list or tuple
+			Anomalous frames intervals of each video, noted as a list of
+			(first frame, last frame) pairs with the last frame included
+	"""
+
+	# Rules for labelling a cuboid as anomalous from its anomalous frames
+	RULES = ('any', 'majority', 'all')
+
+	def __init__(self, n_frames: list or tuple, intervals: list or tuple):
+
+		# Check input
+		if not isinstance(n_frames, (list, tuple, np.ndarray)):
+			raise TypeError('"n_frames" must be a list or tuple')
+
+		if (not isinstance(intervals, (list, tuple)) or
+											len(intervals) != len(n_frames)):
+			raise ValueError('"intervals" must be a list or tuple with the'\
+										' intervals of each video')
+
+		self.__n_frames = np.array(n_frames, dtype='int64')
+		self.__intervals = []
+
+		for i, (frames, ints) in enumerate(zip(self.__n_frames, intervals)):
+
+			ints = np.array(ints, dtype='int64').reshape(-1, 2)
+
+			if (ints[:, 0] > ints[:, 1]).any() or (ints < 0).any() or (
+													ints >= frames).any():
+				raise ValueError('Invalid anomalous intervals for video'\
+																' {}'.format(i))
+
+			self.__intervals.append(ints[np.argsort(ints[:, 0])])
+
+	@classmethod
+	def from_frame_labels(cls, labels: list or tuple):
+
+		"""Builds the store from the binary label of each frame of each video
+		"""
+
+		n_frames = []
+		intervals = []
+
+		for lab in labels:
+
+			lab = np.asarray(lab).astype(bool)
+
+			# Each interval starts where the labels rise and ends where
+			# they fall
+			edges = np.diff(np.concatenate(([False], lab, [False])).astype(
+																	'int8'))
+			starts = np.flatnonzero(edges == 1)
+			ends = np.flatnonzero(edges == -1) - 1
+
+			n_frames.append(len(lab))
+			intervals.append(np.stack((starts, ends), axis=1))
+
+		return cls(n_frames, intervals)
+
+	@classmethod
+	def from_file(cls, fname: str):
+
+		"""Loads the store from a text file with the space-separated frame
+			labels of each video on a line (e.g. UCSDPed1_frames_labels.txt)
+		"""
+
+		with open(fname) as f:
+			labels = [np.array(l.split(), dtype='int8') for l in f
+																if l.strip()]
+
+		return cls.from_frame_labels(labels)
+
+	### Observers
+
+	@property
+	def n_frames(self):
+		return tuple(int(n) for n in self.__n_frames)
+
+	@property
+	def intervals(self):
+		return tuple(ints.copy() for ints in self.__intervals)
+
+	def __len__(self):
+		return len(self.__n_frames)
+
+	def frame_labels(self, video: int) -> np.ndarray:
+
+		"""Returns the binary label of each frame of a video
+		"""
+
+		labels = np.zeros(self.__n_frames[video], dtype='int8')
+
+		for start, end in self.__intervals[video]:
+			labels[start:end + 1] = 1
+
+		return labels
+
+	def __anomalous_before(self, video: int, pos: np.ndarray) -> np.ndarray:
+
+		"""Returns the number of anomalous frames of a video preceding each
+			given frame position
+		"""
+
+		ints = self.__intervals[video]
+
+		return np.clip(pos[:, np.newaxis] - ints[:, 0], 0,
+									ints[:, 1] - ints[:, 0] + 1).sum(axis=1)
+
+	def cuboid_labels(self, cub_frames: int, stride: int=None,
+						rule: str='any', cum_cuboids: list or tuple=None
+																) -> np.ndarray:
+
+		"""Derives the labels of the cuboids taken from the videos. The
+			cuboids of each video start every stride frames from its first
+			frame and the last frame of the video is repeated on the cuboids
+			exceeding it, as done by the cuboids generators.
+
+			Parameters
+			----------
+
+			cub_frames : int
+				Number of frames of each cuboid
+
+			stride : int (default None)
+				Number of frames between the first frames of two consecutive
+				cuboids. If None, the cuboids are not overlapped (stride equal
+				to cub_frames)
+
+			rule : str (default 'any')
+				Rule labelling a cuboid as anomalous when any of its frames,
+				more than half of them ('majority') or all of them are
+				anomalous
+
+			cum_cuboids : list or tuple (default None)
+				Cumulative number of cuboids taken from each video, as
+				returned by the cum_cuboids_per_video of the generators. If
+				None, the cuboids starting every stride frames until the
+				whole video is covered are taken
+
+			Return: int8 numpy array with the label of each cuboid of each
+				video in order
+		"""
+
+		# Check input
+		if not isinstance(cub_frames, int) or cub_frames <= 0:
+			raise ValueError('"cub_frames" must be an integer greater than 0')
+
+		if stride is None:
+			stride = cub_frames
+
+		if not isinstance(stride, int) or stride <= 0:
+			raise ValueError('"stride" must be None or an integer greater'\
+																	' than 0')
+
+		if rule not in self.RULES:
+			raise ValueError('"rule" must be one of {}'.format(self.RULES))
+
+		if cum_cuboids is not None:
+
+			if len(cum_cuboids) != len(self):
+				raise ValueError('"cum_cuboids" must note the cuboids of each'\
+																	' video')
+
+			n_cuboids = np.diff(np.concatenate(([0], cum_cuboids))).astype(
+																	'int64')
+		else:
+			n_cuboids = (np.ceil(np.maximum(self.__n_frames - cub_frames, 0) /
+													stride).astype('int64') + 1)
+
+		labels = []
+
+		for v in range(len(self)):
+
+			starts = np.arange(n_cuboids[v], dtype='int64') * stride
+			ends = starts + cub_frames
+			last = self.__n_frames[v]
+
+			# Anomalous frames of each cuboid within the video plus the
+			# repetitions of the last frame
+			anomalous = (self.__anomalous_before(v, np.minimum(ends, last)) -
+							self.__anomalous_before(v, np.minimum(starts, last)))
+
+			if (len(self.__intervals[v]) and
+										self.__intervals[v][-1, 1] == last - 1):
+				anomalous += np.maximum(ends - np.maximum(starts, last), 0)
+
+			if rule == 'any':
+				lab = anomalous > 0
+			elif rule == 'majority':
+				lab = anomalous * 2 > cub_frames
+			else:
+				lab = anomalous == cub_frames
+
+			labels.append(lab.astype('int8'))
+
+		return (np.concatenate(labels) if labels else
+												np.empty(0, dtype='int8'))
+
+def load_cuboid_labels(fname: str, cub_frames: int,
+						cum_cuboids: list or tuple, stride: int=1,
+						rule: str='any') -> np.ndarray:
+
+	"""Loads the labels of the cuboids from a text file noting the label of
+		each cuboid on a line (e.g. UCSDPed1_labels_8T_cuboids.txt) or
+		derives them from a text file noting the frame labels of each video
+		on a line (e.g. UCSDPed1_frames_labels.txt)
+
+		Parameters
+		----------
+
+		fname : str
+			Path of the labels file
+
+		cub_frames : int
+			Number of frames of each cuboid
+
+		cum_cuboids : list or tuple
+			Cumulative number of cuboids taken from each video, as returned by
+			the cum_cuboids_per_video of the generators
+
+		stride : int (default 1)
+			Number of frames between the first frames of two consecutive
+			cuboids (1 for the consecutive cuboids)
+
+		rule : str (default 'any')
+			Rule labelling a cuboid as anomalous from its frames (see
+			FrameLabelStore.cuboid_labels)
+	"""
+
+	with open(fname) as f:
+		lines = [l.split() for l in f if l.strip()]
+
+	if all(len(l) == 1 for l in lines):
+		return np.array([l[0] for l in lines], dtype='int8')
+
+	return FrameLabelStore.from_frame_labels(
+					[np.array(l, dtype='int8') for l in lines]).cuboid_labels(
+						cub_frames, stride, rule, cum_cuboids=cum_cuboids)
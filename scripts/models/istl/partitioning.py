@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Author: Nicolás Cubero Torres
+# Description: Non-IID partitioning of the cuboids of a generator among the
+#				clients of a simulated federated learning architecture by
+#				camera, by a Dirichlet distribution or by time.
+###############################################################################
+
+# Imported modules
+import json
+import warnings
+import numpy as np
+from .generators import CuboidsGenerator, _StridedCuboid
+
+class ClientPartitioner:
+
+	"""Partitioner of the cuboids of a generator among several clients. Each
+		client receives a generator holding only the references to its
+		cuboids, which shares with the partitioned generator the cuboids
+		descriptions and the rest of its state, so that the memory taken by
+		the partitions grows with the number of clients instead of with the
+		number of clients times the dataset size.
+
+		The cuboids are grouped by camera, taking each video as a camera
+		unless a camera_fn is given, and assigned to the clients by:
+
+		- 'camera': Each camera is assigned as a whole to a client, balancing
+			the number of cuboids of each client.
+		- 'dirichlet': The cuboids of each camera are split among the
+			clients on consecutive blocks whose sizes follow a Dirichlet
+			distribution with concentration alpha. The lower the alpha, the
+			fewer the cameras seen by each client.
+		- 'time': The cuboids of each camera are split into as many
+			consecutive periods of time as clients, receiving each client the
+			same period of all the cameras.
+
+		The 'dirichlet' and 'time' strategies may leave some clients without
+		cuboids or with a few of them when the clients are many. The clients
+		holding less than min_cuboids cuboids are left out of the partitions
+		and noted as dropped on the manifest, so that every client trained
+		holds enough cuboids for taking its validation cuboids.
+
+		The assignment is noted on a manifest which can be saved as a JSON
+		document and applied later to rebuild the same partitions.
+
+		Parameters
+		----------
+
+		n_clients : int
+			Number of clients
+
+		strategy : str (default 'camera')
+			Strategy of assignment of the cuboids: 'camera', 'dirichlet' or
+			'time'
+
+		alpha : float (default 0.5)
+			Concentration of the Dirichlet distribution
+
+		camera_fn : function (default None)
+			Function returning the camera of a video from its name. If None,
+			each video is taken as a camera
+
+		seed : int (default None)
+			Seed used for the Dirichlet distribution
+
+		min_cuboids : int (default 1)
+			Minimum number of cuboids of a client for being included on the
+			partitions
+	"""
+
+	STRATEGIES = ('camera', 'dirichlet', 'time')
+
+	def __init__(self, n_clients: int, strategy: str='camera',
+					alpha: float=0.5, camera_fn=None, seed: int=None,
+					min_cuboids: int=1):
+
+		# Check input
+		if not isinstance(n_clients, int) or n_clients <= 0:
+			raise ValueError('"n_clients" must be an integer greater than 0')
+
+		if strategy not in self.STRATEGIES:
+			raise ValueError('"strategy" must be one of {}'.format(
+															self.STRATEGIES))
+
+		if not isinstance(alpha, (int, float)) or alpha <= 0:
+			raise ValueError('"alpha" must be a number greater than 0')
+
+		if camera_fn is not None and not callable(camera_fn):
+			raise TypeError('"camera_fn" must be callable')
+
+		if seed is not None and not isinstance(seed, int):
+			raise TypeError('"seed" must be None or integer')
+
+		if not isinstance(min_cuboids, int) or min_cuboids <= 0:
+			raise ValueError('"min_cuboids" must be an integer greater than 0')
+
+		self.__n_clients = n_clients
+		self.__strategy = strategy
+		self.__alpha = float(alpha)
+		self.__camera_fn = camera_fn
+		self.__seed = seed
+		self.__min_cuboids = min_cuboids
+
+		self.__manifest = None		# Manifest of the last partitioning
+
+	### Observers
+
+	@property
+	def n_clients(self):
+		return self.__n_clients
+
+	@property
+	def strategy(self):
+		return self.__strategy
+
+	@property
+	def alpha(self):
+		return self.__alpha
+
+	@property
+	def camera_fn(self):
+		return self.__camera_fn
+
+	@property
+	def seed(self):
+		return self.__seed
+
+	@property
+	def min_cuboids(self):
+		return self.__min_cuboids
+
+	@property
+	def manifest(self):
+
+		"""Manifest of the last partitioning or None if no generator was
+			partitioned yet
+		"""
+
+		return self.__manifest
+
+	def __cameras(self, cub_gen: CuboidsGenerator) -> dict:
+
+		"""Groups the indexes of the cuboids of a generator by camera, sorted
+			by the first frame of each cuboid on its video
+		"""
+
+		cameras = {}
+
+		for i, cub in enumerate(cub_gen._cuboids_info):
+
+			camera = (self.__camera_fn(cub[0]) if self.__camera_fn is not None
+																else cub[0])
+			start = (cub.start if isinstance(cub, _StridedCuboid) else
+											cub_gen._cuboid_frames(cub)[1][0])
+
+			cameras.setdefault(camera, []).append((cub[0], start, i))
+
+		return {camera: np.array([i for *_, i in sorted(cubs)],
+														dtype='int64')
+										for camera, cubs in cameras.items()}
+
+	def assign(self, cub_gen: CuboidsGenerator) -> list:
+
+		"""Assigns the cuboids of a generator to the clients
+
+			Return: List with the sorted indexes of the cuboids of the
+				generator assigned to each client
+		"""
+
+		# Check input
+		if not isinstance(cub_gen, CuboidsGenerator):
+			raise TypeError('"cub_gen" must be a CuboidsGenerator')
+
+		cameras = self.__cameras(cub_gen)
+		assigned = [[] for _ in range(self.__n_clients)]
+
+		if self.__strategy == 'camera':
+
+			if len(cameras) < self.__n_clients:
+				raise ValueError('{} cameras cannot be assigned to {} '\
+									'clients'.format(len(cameras),
+														self.__n_clients))
+
+			# The largest cameras are assigned first to the least loaded
+			# client
+			loads = np.zeros(self.__n_clients, dtype='int64')
+
+			for camera in sorted(cameras, key=lambda c: -len(cameras[c])):
+				client = int(np.argmin(loads))
+				assigned[client].append(cameras[camera])
+				loads[client] += len(cameras[camera])
+
+		elif self.__strategy == 'dirichlet':
+
+			rng = np.random.default_rng(self.__seed)
+
+			for indexes in cameras.values():
+				props = rng.dirichlet(np.full(self.__n_clients, self.__alpha))
+				bounds = np.round(np.cumsum(props) * len(indexes)).astype(
+																		'int64')
+
+				for client, block in enumerate(np.split(indexes, bounds[:-1])):
+					assigned[client].append(block)
+
+		else:
+			for indexes in cameras.values():
+				for client, block in enumerate(np.array_split(indexes,
+														self.__n_clients)):
+					assigned[client].append(block)
+
+		return [np.sort(np.concatenate(idx)) if idx else
+							np.empty(0, dtype='int64') for idx in assigned]
+
+	def partition(self, cub_gen: CuboidsGenerator) -> dict:
+
+		"""Partitions the cuboids of a generator among the clients and notes
+			the assignment on the manifest
+
+			Return: Dict holding the generator of each client holding at
+				least min_cuboids cuboids
+		"""
+
+		assigned = self.assign(cub_gen)
+
+		self.__manifest = self.__make_manifest(cub_gen, assigned)
+
+		return ClientPartitioner.__views(cub_gen, assigned,
+														self.__min_cuboids)
+
+	def __make_manifest(self, cub_gen: CuboidsGenerator,
+												assigned: list) -> dict:
+
+		"""Notes the cuboids of each client as ranges of indexes of the
+			cuboids of the generator (last index included) among the number
+			of cuboids taken from each video
+		"""
+
+		clients = []
+
+		for client, indexes in enumerate(assigned):
+
+			# Consecutive indexes are noted as a single range
+			breaks = np.flatnonzero(np.diff(indexes) != 1) + 1
+			ranges = [[int(r[0]), int(r[-1])] for r in np.split(indexes,
+															breaks) if len(r)]
+
+			videos = {}
+			for i in indexes:
+				video = cub_gen._cuboids_info[i][0]
+				videos[video] = videos.get(video, 0) + 1
+
+			clients.append({'client': client,
+							'num_cuboids': int(len(indexes)),
+							'dropped': bool(len(indexes) < self.__min_cuboids),
+							'videos': videos,
+							'cuboids': ranges})
+
+		return {'strategy': self.__strategy,
+				'n_clients': self.__n_clients,
+				'alpha': self.__alpha,
+				'seed': self.__seed,
+				'min_cuboids': self.__min_cuboids,
+				'num_cuboids': len(cub_gen._cuboids_info),
+				'clients': clients}
+
+	def save_manifest(self, fname: str):
+
+		"""Saves the manifest of the last partitioning as a JSON document
+		"""
+
+		if self.__manifest is None:
+			raise RuntimeError('No generator was partitioned yet')
+
+		with open(fname, 'w') as f:
+			json.dump(self.__manifest, f, indent=1)
+
+	@staticmethod
+	def apply_manifest(cub_gen: CuboidsGenerator, manifest) -> dict:
+
+		"""Rebuilds the partitions of a generator noted on a manifest
+
+			Parameters
+			----------
+
+			cub_gen : CuboidsGenerator
+				Generator holding the same cuboids as the partitioned one
+
+			manifest : dict or str
+				Manifest or path of the JSON document storing it
+
+			Return: Dict holding the generator of each client not dropped
+		"""
+
+		# Check input
+		if not isinstance(cub_gen, CuboidsGenerator):
+			raise TypeError('"cub_gen" must be a CuboidsGenerator')
+
+		if isinstance(manifest, str):
+			with open(manifest) as f:
+				manifest = json.load(f)
+
+		if manifest['num_cuboids'] != len(cub_gen._cuboids_info):
+			raise ValueError('The manifest notes {} cuboids but the generator'\
+								' holds {}'.format(manifest['num_cuboids'],
+											len(cub_gen._cuboids_info)))
+
+		assigned = [np.concatenate([np.arange(first, last + 1,
+												dtype='int64')
+									for first, last in c['cuboids']] or
+										[np.empty(0, dtype='int64')])
+									for c in manifest['clients']]
+
+		return ClientPartitioner.__views(cub_gen, assigned,
+									manifest.get('min_cuboids', 1))
+
+	@staticmethod
+	def __views(cub_gen: CuboidsGenerator, assigned: list,
+											min_cuboids: int) -> dict:
+
+		"""Returns the generator holding the assigned cuboids of each client
+			holding at least min_cuboids cuboids
+		"""
+
+		dropped = [client for client, indexes in enumerate(assigned)
+											if len(indexes) < min_cuboids]
+
+		if dropped:
+			warnings.warn('{} clients holding less than {} cuboids are left'\
+							' out of the partitions: {}'.format(len(dropped),
+														min_cuboids, dropped))
+
+		return {client: cub_gen._partition([cub_gen._cuboids_info[i]
+														for i in indexes])
+							for client, indexes in enumerate(assigned)
+										if len(indexes) >= min_cuboids}
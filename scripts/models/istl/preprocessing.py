@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Author: Nicolás Cubero Torres
+# Description: Preprocessing functions applied by the cuboids generators of
+#				the Incremental Spatio Temporal Learner architecture to whole
+#				stacks of video frames at once.
+###############################################################################
+
+# Imported modules
+import numpy as np
+from cv2 import resize, cvtColor, COLOR_BGR2GRAY, INTER_LINEAR
+
+class BatchResize:
+
+	"""Batch preprocessing function which resizes a stack of frames shaped
+		(frames, height, width, channels) and optionally converts them into
+		grayscale and scales their values, writing the result on a
+		preallocated array.
+
+		Produces the same frames as the frame-level function
+		lambda img: np.expand_dims(resize(cvtColor(img, COLOR_BGR2GRAY),
+										(width, height))*scale, axis=2)
+
+		Parameters
+		----------
+
+		width: int
+			Width of the resized frames
+
+		height: int
+			Height of the resized frames
+
+		grayscale: bool (default True)
+			Convert three-channel frames, ordered as BGR, into grayscale
+			frames. Single-channel frames are not converted
+
+		scale: float (default 1/255)
+			Factor by which the resized frames are multiplied. If None, the
+			resized frames keep the type of the original frames
+	"""
+
+	def __init__(self, width: int, height: int, grayscale: bool=True,
+					scale: float=1/255, interpolation: int=INTER_LINEAR):
+
+		# Check input
+		if not isinstance(width, int) or width <= 0:
+			raise ValueError('"width" must be an integer greater than 0')
+
+		if not isinstance(height, int) or height <= 0:
+			raise ValueError('"height" must be an integer greater than 0')
+
+		if not isinstance(grayscale, bool):
+			raise TypeError('"grayscale" must be boolean')
+
+		if scale is not None and not isinstance(scale, (int, float)):
+			raise TypeError('"scale" must be None, int or float')
+
+		# Private attributes
+		self.__width = width
+		self.__height = height
+		self.__grayscale = grayscale
+		self.__scale = scale
+		self.__interpolation = interpolation
+
+	### Observers
+	@property
+	def width(self):
+		return self.__width
+
+	@property
+	def height(self):
+		return self.__height
+
+	@property
+	def grayscale(self):
+		return self.__grayscale
+
+	@property
+	def scale(self):
+		return self.__scale
+
+	def __call__(self, frames: np.ndarray) -> np.ndarray:
+
+		# Check input
+		if not isinstance(frames, np.ndarray) or frames.ndim != 4:
+			raise ValueError('"frames" must be a (frames, height, width,'\
+											' channels) shaped numpy array')
+
+		channels = (1 if self.__grayscale and frames.shape[3] == 3 else
+															frames.shape[3])
+
+		# Procedure
+		resized = np.empty((frames.shape[0], self.__height, self.__width,
+										channels), dtype=frames.dtype)
+
+		for i, fr in enumerate(frames):
+
+			if channels != fr.shape[2]:
+				fr = cvtColor(fr, COLOR_BGR2GRAY)
+
+			# Single-channel frames are resized without its channel axis
+			resize(fr if fr.ndim == 2 or channels > 1 else fr[..., 0],
+					(self.__width, self.__height),
+					dst=resized[i] if channels > 1 else resized[i, ..., 0],
+					interpolation=self.__interpolation)
+
+		if self.__scale is None:
+			return resized
+
+		return np.multiply(resized, np.float32(self.__scale),
+										dtype=np.float32)
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Author: Nicolás Cubero Torres
+# Description: Utilities for the retrieval of cuboids from a continuous video
+#				stream (e.g. a surveillance camera) as soon as their frames
+#				are captured, to be supplied to the Incremental Spatio
+#				Temporal Learner architecture
+###############################################################################
+
+# Imported modules
+import threading
+import time
+import numpy as np
+from cv2 import VideoCapture
+
+class StreamCuboidSource:
+
+	"""Source of the cuboids of a continuous video stream. The frames are
+		read on background from any source supported by cv2.VideoCapture
+		(video file, device, pipe or url), preprocessed and stored on a
+		preallocated ring buffer holding the last captured frames, from
+		which the cuboids are assembled as soon as their frames arrive.
+
+		When the cuboids are not retrieved as fast as the frames arrive, the
+		frames of the oldest cuboids not retrieved yet are overwritten and
+		these cuboids are dropped, so that the capture is never delayed,
+		unless block is enabled.
+
+		Each batch of cuboids retrieved can be directly scored by
+		ScorerISTL's score_cuboids or score_stream methods.
+
+		Parameters
+		----------
+
+		source : str, int or cv2.VideoCapture
+			Video file, url, pipe or device index opened with cv2.VideoCapture
+			or an opened capture
+
+		cub_frames : int
+			Number of frames conforming the cuboids
+
+		prep_fn : function (default None)
+			Function applied to each captured frame
+
+		stride : int (default None)
+			Number of frames between the first frames of two consecutive
+			cuboids. If None, the cuboids are not overlapped (stride equal
+			to cub_frames)
+
+		batch_size : int (default 1)
+			Max number of cuboids retrieved at once
+
+		capacity : int (default None)
+			Number of frames held by the ring buffer, which must hold at least
+			a cuboid. If None, the frames of four batches are held
+
+		block : bool (default False)
+			Wait for the cuboids to be retrieved instead of dropping them when
+			the ring buffer is full, which is suitable for video files fed as
+			a stream
+	"""
+
+	def __init__(self, source, cub_frames: int, prep_fn=None,
+					stride: int=None, batch_size: int=1, capacity: int=None,
+					block: bool=False):
+
+		# Check input
+		if not isinstance(source, (str, int, VideoCapture)):
+			raise TypeError('"source" must be a str, int or cv2.VideoCapture')
+
+		if not isinstance(cub_frames, int) or cub_frames <= 0:
+			raise ValueError('"cub_frames" must be an integer greater than 0')
+
+		if prep_fn is not None and not callable(prep_fn):
+			raise TypeError('"prep_fn" must be callable')
+
+		if stride is not None and (not isinstance(stride, int) or
+																stride <= 0):
+			raise ValueError('"stride" must be None or an integer greater'\
+																	' than 0')
+
+		if not isinstance(batch_size, int) or batch_size <= 0:
+			raise ValueError('"batch_size" must be an integer greater than 0')
+
+		if stride is None:
+			stride = cub_frames
+
+		if capacity is None:
+			capacity = cub_frames + 4*batch_size*stride
+
+		if not isinstance(capacity, int) or capacity < cub_frames:
+			raise ValueError('"capacity" must be an integer not lower than'\
+																' cub_frames')
+
+		if not isinstance(block, bool):
+			raise TypeError('"block" must be boolean')
+
+		capture = (source if isinstance(source, VideoCapture) else
+														VideoCapture(source))
+
+		if not capture.isOpened():
+			raise ValueError('Cannot open the video stream {}'.format(source))
+
+		# Attributes
+		self.__capture = capture
+		self.__cub_frames = cub_frames
+		self.__prep_fn = prep_fn
+		self.__stride = stride
+		self.__batch_size = batch_size
+		self.__capacity = capacity
+		self.__block = block
+
+		self.__ring = None			# Allocated once the first frame arrives
+		self.__written = 0			# Number of frames captured
+		self.__next_start = 0		# First frame of the next cuboid
+		self.__delivered_end = 0	# Frame following the retrieved cuboids
+		self.__finished = False
+		self.__error = None
+
+		# Stream statistics
+		self.__dropped_frames = 0
+		self.__dropped_cuboids = 0
+		self.__read_cuboids = 0
+		self.__max_queue_depth = 0
+
+		self.__cond = threading.Condition()
+		self.__stop = False
+		self.__thread = threading.Thread(target=self.__capture_frames,
+										name='stream_capture', daemon=True)
+		self.__thread.start()
+
+	### Observers
+	@property
+	def cub_frames(self):
+		return self.__cub_frames
+
+	@property
+	def prep_fn(self):
+		return self.__prep_fn
+
+	@property
+	def stride(self):
+		return self.__stride
+
+	@property
+	def batch_size(self):
+		return self.__batch_size
+
+	@property
+	def capacity(self):
+		return self.__capacity
+
+	@property
+	def block(self):
+		return self.__block
+
+	@property
+	def finished(self):
+
+		"""Whether the stream has ended and all its cuboids were retrieved
+		"""
+
+		with self.__cond:
+			return self.__finished and not self.__available()
+
+	@property
+	def queue_depth(self):
+
+		"""Number of captured frames waiting for their cuboids to be retrieved
+		"""
+
+		with self.__cond:
+			return self.__queue_depth()
+
+	@property
+	def stats(self):
+
+		"""Returns the number of frames captured, the frames dropped without
+			being retrieved on any cuboid, the cuboids retrieved and dropped
+			and the current and max queue depth
+		"""
+
+		with self.__cond:
+			return {'captured_frames': self.__written,
+					'dropped_frames': self.__dropped_frames,
+					'read_cuboids': self.__read_cuboids,
+					'dropped_cuboids': self.__dropped_cuboids,
+					'queue_depth': self.__queue_depth(),
+					'max_queue_depth': self.__max_queue_depth}
+
+	def __queue_depth(self) -> int:
+		return max(0, self.__written - self.__next_start)
+
+	def __available(self) -> int:
+
+		"""Returns the number of cuboids whose frames have been captured and
+			were not retrieved yet
+		"""
+
+		if self.__written < self.__next_start + self.__cub_frames:
+			return 0
+
+		return ((self.__written - self.__next_start - self.__cub_frames) //
+															self.__stride + 1)
+
+	def __capture_frames(self):
+
+		"""Reads the frames of the stream and stores them on the ring buffer
+			until the stream ends or the source is closed
+		"""
+
+		try:
+			while not self.__stop:
+
+				ok, frame = self.__capture.read()
+
+				if not ok:
+					break
+
+				if self.__prep_fn is not None:
+					frame = self.__prep_fn(frame)
+
+				with self.__cond:
+
+					if self.__ring is None:
+						self.__ring = np.empty((self.__capacity, *frame.shape),
+														dtype=frame.dtype)
+
+					# The slot of the new frame holds a frame still required
+					oldest = self.__written - self.__capacity
+
+					if self.__block:
+						while (oldest >= self.__next_start and
+															not self.__stop):
+							self.__cond.wait()
+
+						if self.__stop:
+							break
+
+					elif oldest >= self.__next_start:
+
+						# Drop the cuboids starting on the overwritten frame
+						skipped = ((oldest - self.__next_start) //
+														self.__stride + 1)
+						next_start = self.__next_start + skipped*self.__stride
+
+						# The frames of the dropped cuboids which are not
+						# part of any other retrieved cuboid are dropped
+						self.__dropped_cuboids += skipped
+						self.__dropped_frames += max(0, next_start -
+												max(self.__next_start,
+													self.__delivered_end))
+						self.__next_start = next_start
+
+					self.__ring[self.__written % self.__capacity] = frame
+					self.__written += 1
+
+					self.__max_queue_depth = max(self.__max_queue_depth,
+														self.__queue_depth())
+					self.__cond.notify_all()
+
+		except BaseException as e:
+			self.__error = e
+
+		finally:
+			with self.__cond:
+				self.__finished = True
+				self.__cond.notify_all()
+
+	def read(self, timeout: float=None) -> tuple:
+
+		"""Retrieves the cuboids whose frames have been captured, up to
+			batch_size, waiting for a cuboid to be captured if none is
+			available
+
+			Parameters
+			----------
+
+			timeout : float (default None)
+				Max seconds waited for a cuboid. If None, waits indefinitely
+
+			Raise
+			-----
+
+			TimeoutError: No cuboid was captured before the timeout expired
+			Any exception raised while capturing the frames
+
+			Return: The index of the first frame of each cuboid on the stream
+				and the cuboids stacked as a numpy array, which are empty
+				when the stream has ended
+		"""
+
+		deadline = time.monotonic() + timeout if timeout is not None else None
+
+		with self.__cond:
+
+			while not self.__available() and not self.__finished:
+
+				remaining = (deadline - time.monotonic() if deadline is not None
+																	else None)
+				if remaining is not None and remaining <= 0:
+					raise TimeoutError('No cuboid was captured in {}'\
+												' seconds'.format(timeout))
+
+				self.__cond.wait(remaining)
+
+			n_cuboids = min(self.__available(), self.__batch_size)
+
+			if not n_cuboids:
+
+				if self.__error is not None:
+					raise self.__error
+
+				return (np.empty(0, dtype='int64'),
+							np.empty((0, self.__cub_frames,
+										*(self.__ring.shape[1:] if self.__ring
+													is not None else ())),
+									dtype=self.__ring.dtype if self.__ring
+												is not None else 'float64'))
+
+			starts = self.__next_start + self.__stride*np.arange(n_cuboids)
+			frames = (starts[:, np.newaxis] +
+							np.arange(self.__cub_frames)) % self.__capacity
+			cuboids = self.__ring[frames]
+
+			self.__next_start += n_cuboids*self.__stride
+			self.__delivered_end = int(starts[-1]) + self.__cub_frames
+			self.__read_cuboids += n_cuboids
+
+			# Release the frames of the retrieved cuboids to the capture
+			self.__cond.notify_all()
+
+		return starts, cuboids
+
+	def __iter__(self):
+
+		"""Iterates over the batches of cuboids of the stream until it ends
+		"""
+
+		while True:
+			_, cuboids = self.read()
+
+			if not len(cuboids):
+				return
+
+			yield cuboids
+
+	def close(self):
+
+		"""Stops the capture of the stream and releases the source
+		"""
+
+		with self.__cond:
+			self.__stop = True
+			self.__cond.notify_all()
+
+		if self.__thread is not threading.current_thread():
+			self.__thread.join()
+
+		self.__capture.release()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Author: Nicolás Cubero Torres
+# Description: Export of the reconstruction error model of the Incremental
+#				Spatio Temporal Learner architecture (ISTL) to TensorFlow Lite
+#				with optional dynamic-range or full-int8 quantization, and
+#				scoring of the cuboids through the TensorFlow Lite interpreter.
+###############################################################################
+
+# Imported modules
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import Model
+from tensorflow.keras.layers import ConvLSTM2D, Lambda
+from tensorflow.keras.models import clone_model
+from tensorflow.keras.utils import Sequence
+from .__istl import ScorerISTL, root_sum_squared_error
+from .generators import CuboidsGenerator
+from .cache import from_compact
+
+# Quantizations supported by the export
+QUANTIZATIONS = (None, 'dynamic', 'int8')
+
+def _export_model(model: Model) -> tuple:
+
+	"""Builds the reconstruction error model to be exported from a copy of
+		an ISTL model whose ConvLSTM2D layers are unrolled over the fixed
+		length of the cuboids, so that the exported model only requires the
+		built-in operators of TensorFlow Lite instead of the TensorFlow
+		while loops of the recurrent layers
+
+		Return: The model to be exported and whether the recurrent layers
+			could be unrolled
+	"""
+
+	def clone_layer(layer):
+		config = layer.get_config()
+
+		if isinstance(layer, ConvLSTM2D):
+			config['unroll'] = True
+
+		return layer.__class__.from_config(config)
+
+	try:
+		clone = clone_model(model, clone_function=clone_layer)
+		unrolled = True
+	except (ValueError, TypeError):
+		# Some Keras versions do not allow unrolling the convolutional
+		# recurrent layers
+		clone = clone_model(model)
+		unrolled = False
+
+	clone.set_weights(model.get_weights())
+
+	rec_error = Lambda(root_sum_squared_error)([clone.layers[0].input,
+													clone.layers[-1].output])
+
+	return Model(inputs=clone.layers[0].input, outputs=rec_error), unrolled
+
+def _sample_cuboids(calib_data, calib_cuboids: int, seed: int=None):
+
+	"""Yields calib_cuboids cuboids taken at random from an array of cuboids
+		or from a cuboids generator, one by one as required by the
+		representative dataset of the converter. The cuboids of a
+		CuboidsGenerator are loaded alone, by batches of the sampled cuboids,
+		instead of the whole window of each batch retrieved
+	"""
+
+	rng = np.random.default_rng(seed)
+
+	if isinstance(calib_data, CuboidsGenerator):
+
+		cuboids = calib_data._access_cuboids
+		taken = np.sort(rng.choice(len(cuboids), min(calib_cuboids,
+											len(cuboids)), replace=False))
+
+		for i in range(0, len(taken), calib_data.batch_size):
+
+			batch = from_compact(calib_data._read_window([cuboids[idx] for
+								idx in taken[i:i + calib_data.batch_size]]),
+								calib_data.storage_dtype)
+
+			for cuboid in batch:
+				yield [np.expand_dims(cuboid, axis=0).astype('float32')]
+
+	elif isinstance(calib_data, Sequence):
+
+		taken = 0
+
+		for idx in rng.permutation(len(calib_data)):
+
+			batch = calib_data[int(idx)]
+
+			# Take the cuboids of the (cuboids, labels) batches
+			if isinstance(batch, tuple):
+				batch = batch[0]
+
+			for cuboid in batch[rng.permutation(len(batch))]:
+
+				yield [np.expand_dims(cuboid, axis=0).astype('float32')]
+				taken += 1
+
+				if taken == calib_cuboids:
+					return
+	else:
+		for idx in rng.choice(len(calib_data), min(calib_cuboids,
+											len(calib_data)), replace=False):
+			yield [np.expand_dims(calib_data[idx], axis=0).astype('float32')]
+
+def export_tflite(scorer: ScorerISTL or Model, fname: str=None,
+					quantization: str=None, calib_data=None,
+					calib_cuboids: int=100, seed: int=None) -> bytes:
+
+	"""Exports the reconstruction error model of an ISTL model to a
+		TensorFlow Lite model
+
+		Parameters
+		----------
+
+		scorer : ScorerISTL or tf.keras.Model
+			Scorer or ISTL model whose reconstruction error model is exported
+
+		fname : str (default None)
+			Path of the file in which the exported model is saved. If None,
+			the model is only returned
+
+		quantization : str (default None)
+			Quantization of the exported model: None for keeping the float
+			weights, 'dynamic' for quantizing the weights to int8 while
+			computing on float and 'int8' for computing on int8 with the
+			activations ranges calibrated on calib_data. The inputs and
+			outputs of the model are float on every case. Note that the
+			dynamic quantization only reduces the size of the model, since
+			the interpreter lacks fast hybrid kernels for the 3D and
+			transposed convolutions and scores much slower than on float
+
+		calib_data : array or generator of cuboids (default None)
+			Cuboids on which the activations ranges are calibrated for the
+			'int8' quantization, usually the training cuboids
+
+		calib_cuboids : int (default 100)
+			Number of cuboids of calib_data taken at random for the
+			calibration
+
+		seed : int (default None)
+			Seed of the sampling of the calibration cuboids
+
+		Return: The serialized TensorFlow Lite model
+	"""
+
+	# Check input
+	if isinstance(scorer, ScorerISTL):
+		model = scorer.model
+	elif isinstance(scorer, Model):
+		model = scorer
+	else:
+		raise TypeError('"scorer" must be a ScorerISTL or a Keras model')
+
+	if quantization not in QUANTIZATIONS:
+		raise ValueError('"quantization" must be one of {}'.format(
+																QUANTIZATIONS))
+
+	if quantization == 'int8' and calib_data is None:
+		raise ValueError('"calib_data" is required for the int8 quantization')
+
+	if calib_data is not None and (not hasattr(calib_data, '__getitem__') or
+										not hasattr(calib_data, '__len__')):
+		raise TypeError('"calib_data" must be an array or a generator of'\
+																	' cuboids')
+
+	if not isinstance(calib_cuboids, int) or calib_cuboids <= 0:
+		raise ValueError('"calib_cuboids" must be an integer greater than 0')
+
+	if seed is not None and not isinstance(seed, int):
+		raise TypeError('"seed" must be None or integer')
+
+	rec_model, unrolled = _export_model(model)
+
+	converter = tf.lite.TFLiteConverter.from_keras_model(rec_model)
+
+	if quantization is not None:
+		converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+	if quantization == 'int8':
+		converter.representative_dataset = lambda: _sample_cuboids(calib_data,
+															calib_cuboids, seed)
+		converter.target_spec.supported_ops = [
+										tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+	if not unrolled:
+		# The recurrent layers require the TensorFlow operators
+		converter.target_spec.supported_ops = list(
+						converter.target_spec.supported_ops) + [
+										tf.lite.OpsSet.SELECT_TF_OPS]
+
+	tflite_model = converter.convert()
+
+	if fname is not None:
+		with open(fname, 'wb') as f:
+			f.write(tflite_model)
+
+	return tflite_model
+
+class TFLiteRecModel:
+
+	"""Reconstruction error model exported to TensorFlow Lite (see
+		export_tflite) run through the TensorFlow Lite interpreter, which
+		scores the cuboids as the predict and predict_on_batch methods of the
+		reconstruction error model of ScorerISTL do, so that it can be used as
+		the scoring backend of ScorerISTL (see ScorerISTL.tflite_model)
+
+		Parameters
+		----------
+
+		model : str or bytes
+			Path of the TensorFlow Lite model or the serialized model
+
+		num_threads : int (default None)
+			Number of threads used by the interpreter. If None, the default
+			of the interpreter is used
+
+		batch_size : int (default 32)
+			Number of cuboids scored at once by predict
+	"""
+
+	def __init__(self, model: str or bytes, num_threads: int=None,
+														batch_size: int=32):
+
+		# Check input
+		if not isinstance(model, (str, bytes)):
+			raise TypeError('"model" must be the path of a TensorFlow Lite'\
+										' model or the serialized model')
+
+		if num_threads is not None and (not isinstance(num_threads, int) or
+															num_threads <= 0):
+			raise ValueError('"num_threads" must be None or an integer'\
+														' greater than 0')
+
+		if not isinstance(batch_size, int) or batch_size <= 0:
+			raise ValueError('"batch_size" must be an integer greater than 0')
+
+		if isinstance(model, str):
+			self.__interpreter = tf.lite.Interpreter(model_path=model,
+													num_threads=num_threads)
+		else:
+			self.__interpreter = tf.lite.Interpreter(model_content=model,
+													num_threads=num_threads)
+
+		self.__num_threads = num_threads
+		self.__batch_size = batch_size
+
+		self.__input = self.__interpreter.get_input_details()[0]
+		self.__output = self.__interpreter.get_output_details()[0]
+		self.__batch_shape = None	# Input shape of the allocated tensors
+
+	### Observers
+
+	@property
+	def num_threads(self):
+		return self.__num_threads
+
+	@property
+	def batch_size(self):
+		return self.__batch_size
+
+	@property
+	def input_shape(self):
+		return tuple(None if d < 0 else int(d)
+								for d in self.__input['shape_signature'])
+
+	def predict_on_batch(self, x: np.ndarray) -> np.ndarray:
+
+		"""Returns the reconstruction error of a batch of cuboids
+		"""
+
+		x = np.asarray(x, dtype=self.__input['dtype'])
+
+		# The tensors are allocated again only when the batch shape changes
+		if x.shape != self.__batch_shape:
+			self.__interpreter.resize_tensor_input(self.__input['index'],
+																	x.shape)
+			self.__interpreter.allocate_tensors()
+			self.__batch_shape = x.shape
+
+		self.__interpreter.set_tensor(self.__input['index'], x)
+		self.__interpreter.invoke()
+
+		return self.__interpreter.get_tensor(self.__output['index']).copy()
+
+	def predict(self, x, verbose=0) -> np.ndarray:
+
+		"""Returns the reconstruction error of the cuboids of an array or of
+			the batches of a cuboids generator
+		"""
+
+		if isinstance(x, Sequence):
+			batches = (x[i] for i in range(len(x)))
+		else:
+			batches = (x[i:i + self.__batch_size]
+								for i in range(0, len(x), self.__batch_size))
+
+		scores = []
+
+		for batch in batches:
+
+			# Take the cuboids of the (cuboids, labels) batches
+			if isinstance(batch, tuple):
+				batch = batch[0]
+
+			if len(batch):
+				scores.append(self.predict_on_batch(batch))
+
+		return (np.concatenate(scores) if scores else
+												np.empty(0, dtype='float32'))
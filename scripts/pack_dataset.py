@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+
+@author: Nicolás Cubero Torres
+@description: Packs the preprocessed frames of a video dataset into a few
+			large shard files which can be read by the
+			CuboidsGeneratorFromShards generator.
+
+@usage: pack_dataset.py -d <Directory Path containing the dataset to pack>
+					-o <Output directory>
+					[-v] The dataset is made up of video files
+					[--storage_dtype <Compact dtype of the packed frames>]
+					[--shard_size <Max size in MB of each shard file>]
+"""
+# Modules imported
+import sys
+import argparse
+import numpy as np
+from cv2 import resize, cvtColor, COLOR_BGR2GRAY
+from models import istl
+
+# Constants
+CUBOIDS_LENGTH = 8
+CUBOIDS_WIDTH = 224
+CUBOIDS_HEIGHT = 224
+
+# Image resize function
+resize_fn = lambda img: np.expand_dims(resize(cvtColor(img, COLOR_BGR2GRAY),
+						(CUBOIDS_WIDTH, CUBOIDS_HEIGHT))/255, axis=2)
+
+### Input Arguments
+parser = argparse.ArgumentParser(description='Pack the preprocessed frames'\
+							' of a video dataset into shard files')
+parser.add_argument('-d', '--data_folder', help='Path to folder'\
+					' containing the dataset to pack', type=str)
+parser.add_argument('-o', '--output', help='Output folder in which the'\
+					' packed dataset will be located', type=str)
+parser.add_argument('-v', '--video_files', help='The dataset is made up of'\
+					' video files instead of frames folders',
+					action='store_true')
+parser.add_argument('--storage_dtype', help='Store the frames compactly as'\
+					' "uint8" or "float16"', type=str, nargs='?')
+parser.add_argument('--shard_size', help='Max size in MB of each shard file',
+					type=int, default=1024)
+
+args = parser.parse_args()
+
+data_dir = args.data_folder
+output = args.output
+video_files = args.video_files
+storage_dtype = args.storage_dtype
+shard_size = args.shard_size
+
+### Load the dataset
+try:
+	if video_files:
+		data = istl.generators.CuboidsGeneratorFromVid(source=data_dir,
+										cub_frames=CUBOIDS_LENGTH,
+										prep_fn=resize_fn,
+										storage_dtype=storage_dtype)
+	else:
+		data = istl.generators.CuboidsGeneratorFromImgs(source=data_dir,
+										cub_frames=CUBOIDS_LENGTH,
+										prep_fn=resize_fn,
+										storage_dtype=storage_dtype)
+except Exception as e:
+	print('Cannot load {}: '.format(data_dir), str(e), file=sys.stderr)
+	exit(-1)
+
+### Pack the dataset
+try:
+	istl.generators.pack_cuboids_dataset(data, output,
+										shard_size=shard_size*2**20)
+except Exception as e:
+	print('Cannot pack the dataset into {}: '.format(output), str(e),
+															file=sys.stderr)
+	exit(-1)
+
+print('Packed {} videos ({} cuboids) into {}'.format(len(data.video_info),
+													len(data), output))
@@ -30,7 +30,8 @@
 	  		Directory path containing the test set
 
 	  "test_label": (str)
-	  		Filepath locating the test cuboids labels (as txt format).
+	  		Filepath locating the test cuboids labels (as txt format) or
+			the frame labels of each test video on a line.
 
 	  "batch_size": (int)|(list of int)
 	  		Values to be used as batch size for each experiment.
@@ -77,6 +78,66 @@
 	  "seed": (int)
 	  		Value used as seed for the generator.
 
+	  "cache_dir": (str)
+	  		Directory in which the preprocessed video frames are stored the
+			first time they are loaded, so that later runs don't need to decode
+			the frames again.
+
+	  "loading_workers": (int)
+	  		Number of threads used for decoding the video frames concurrently
+			(1 by default).
+
+	  "manifest": (bool)
+	  		Store the frames list of each video folder on a manifest file on
+			the dataset directories so that only the changed folders are
+			scanned again (false by default).
+
+	  "storage_dtype": (str)
+	  		Store the video frames on memory as "uint8" or "float16" instead
+			of float64 (by default) to reduce the memory usage.
+
+	  "max_window_mb": (int)
+	  		Max memory in MB taken by the cuboids loaded at once from each
+			dataset, which bounds the number of cuboids loaded at once
+			(unbounded by default).
+
+	  "val_storage_dtype": (str)
+	  		Store the validation cuboids on memory as "uint8", "float16" (by
+			default) or as they are loaded (null).
+
+	  "val_sample": (float or int)
+	  		Ratio or number of the validation cuboids randomly sampled for
+			validating the models (all of them by default).
+
+	  "label_rule": (str)
+	  		Rule labelling the test cuboids as anomalous when the test labels
+			file notes the label of each frame: "any", "majority" or "all"
+			of its frames are anomalous ("any" by default).
+
+	  "frame_cache_mb": (int)
+	  		Max memory in MB taken by the preprocessed frames kept on memory
+			and shared by all the datasets, so that the frames shared by
+			several cuboids are only decoded once (disabled by default).
+
+	  "score_batch_size": (int)
+	  		Number of cuboids scored at once when evaluating the model,
+			regardless of the batches in which the cuboids are loaded
+			(by default, the cuboids are scored on the loaded batches).
+
+	  "batch_prep": (bool)
+	  		Decode the video frames directly as grayscale and resize the
+			frames of the cuboids loaded together at once instead of frame
+			by frame (false by default).
+
+	  "virtual_augment": (bool)
+	  		Assemble the augmented cuboids from the decoded frames of the
+			videos held on memory instead of loading each augmented cuboid
+			from disk (false by default).
+
+	  "prefetch": (bool)
+	  		Load the next cuboids of the training set on background while
+			the current ones are used for training (false by default).
+
 	  "lr": (float), default: 1e-4
 	  		Initial learning rate used for training
 
@@ -118,7 +179,7 @@ from tensorflow.keras.callbacks import EarlyStopping
 from tensorflow import config
 from tensorflow import random as tf_random
 from tensorflow import __version__ as tf_version
-from cv2 import resize, cvtColor, COLOR_BGR2GRAY
+from cv2 import resize, cvtColor, COLOR_BGR2GRAY, IMREAD_GRAYSCALE
 from utils import extract_experiments_parameters, plot_results, root_sum_squared_error
 from fedLearn import SynFedAvgLearnModel
 from models import istl
@@ -133,6 +194,9 @@ CUBOIDS_HEIGHT = 224
 resize_fn = lambda img: np.expand_dims(resize(cvtColor(img, COLOR_BGR2GRAY),
 						(CUBOIDS_WIDTH, CUBOIDS_HEIGHT))/255, axis=2)
 
+# Batch resize function applied at once to the grayscale decoded frames
+batch_resize_fn = istl.preprocessing.BatchResize(CUBOIDS_WIDTH, CUBOIDS_HEIGHT)
+
 ### Input Arguments
 parser = argparse.ArgumentParser(description='Trains an Incremental Spatio'\
 							' Temporal Learner model for the UCSD Ped 1/2'\
@@ -173,19 +237,61 @@ else:
 train_video_dir = exp_data['train_video_dir']
 test_video_dir = exp_data['test_video_dir']
 test_label = exp_data['test_label']
+cache_dir = exp_data['cache_dir'] if 'cache_dir' in exp_data else None
+loading_workers = (exp_data['loading_workers'] if 'loading_workers' in exp_data
+															else 1)
+prefetch = exp_data['prefetch'] if 'prefetch' in exp_data else False
+manifest = exp_data['manifest'] if 'manifest' in exp_data else False
+storage_dtype = (exp_data['storage_dtype'] if 'storage_dtype' in exp_data
+															else None)
+batch_prep = exp_data['batch_prep'] if 'batch_prep' in exp_data else False
+virtual_augment = (exp_data['virtual_augment'] if 'virtual_augment' in exp_data
+															else False)
+label_rule = exp_data['label_rule'] if 'label_rule' in exp_data else 'any'
+val_storage_dtype = (exp_data['val_storage_dtype'] if 'val_storage_dtype' in
+													exp_data else 'float16')
+val_sample = exp_data['val_sample'] if 'val_sample' in exp_data else None
+max_window_bytes = (int(exp_data['max_window_mb']*2**20)
+					if 'max_window_mb' in exp_data else None)
+
+# Frames shared by all the datasets
+if 'frame_cache_mb' in exp_data:
+	istl.cache.shared_frames_cache().max_bytes = int(
+										exp_data['frame_cache_mb']*2**20)
+
+score_batch_size = (exp_data['score_batch_size'] if 'score_batch_size' in
+															exp_data else None)
+
+# Preprocess the frames one by one or the grayscale decoded frames at once
+prep_kwargs = ({'batch_prep_fn': batch_resize_fn,
+				'imread_flags': IMREAD_GRAYSCALE} if batch_prep else
+				{'prep_fn': resize_fn})
 
 data_train = istl.generators.CuboidsGeneratorFromImgs(
 		source=train_video_dir,
 		cub_frames=CUBOIDS_LENGTH,
-		prep_fn=resize_fn,
+		**prep_kwargs,
+		cache_dir=cache_dir,
+		workers=loading_workers,
+		manifest=manifest,
+		storage_dtype=storage_dtype,
+		max_bytes=max_window_bytes,
+		prefetch=prefetch,
 		max_cuboids=100000)
 
 data_test = istl.generators.CuboidsGeneratorFromImgs(source=test_video_dir,
 									cub_frames=CUBOIDS_LENGTH,
-									prep_fn=resize_fn,
+									**prep_kwargs,
+									cache_dir=cache_dir,
+									workers=loading_workers,
+									manifest=manifest,
+									storage_dtype=storage_dtype,
+									max_bytes=max_window_bytes,
 									max_cuboids=100000)
 data_test = istl.generators.ConsecutiveCuboidsGen(data_test)
-test_labels = np.loadtxt(test_label, dtype='int8')
+test_labels = istl.labels.load_cuboid_labels(test_label, CUBOIDS_LENGTH,
+							data_test.cum_cuboids_per_video,
+							rule=label_rule)
 
 ## Configure GPU usage
 physical_devices = config.experimental.list_physical_devices('GPU')
@@ -245,8 +351,14 @@ for p in params:
 									p['port_val'] if 'port_val' in p else 0.1,
 									p['seed'] if 'seed' in p else None)
 
+		val_data[c] = istl.generators.ValidationCache(val_data[c],
+								storage_dtype=val_storage_dtype,
+								port=val_sample,
+								seed=p['seed'] if 'seed' in p else None)
+
 		# Set data augmentation
-		data[c].augment_data(max_stride=3)
+		data[c].augment_data(max_stride=3,
+							virtual=virtual_augment)
 		data[c].shuffle(shuf=bool(p['shuffle']) if 'shuffle' in p else False,
 								seed=p['seed'] if 'seed' in p else time.time())
 
@@ -347,7 +459,9 @@ for p in params:
 		evaluator = istl.EvaluatorISTL(model=istl_fed_model_copy.global_model,
 										cub_frames=CUBOIDS_LENGTH,
 										anom_thresh=q['anom_thresh'],
-										temp_thresh=q['temp_thresh'])
+										temp_thresh=q['temp_thresh'],
+										fp_dtype=storage_dtype)
+		evaluator.score_batch_size = score_batch_size
 
 		for split in (train_split[0], train_split[1]):
 			split.batch_size = 1
@@ -414,15 +528,16 @@ for p in params:
 									p['port_val'] if 'port_val' in p else 0.1,
 									p['seed'] if 'seed' in p else None)
 
-			if len(val_data[c]) > 1:
-				val_data[c] = np.array([val_data[c][i][0] for i in range(len(val_data[c]))])
-			else:
-				val_data[c] = val_data[c][0]
-
-			val_data[c] = (val_data[c],)*2
+			# Validation cuboids are loaded once and stored compactly
+			val_data[c] = istl.generators.ValidationCache(val_data[c],
+								batch_size=q['batch_size'] if 'batch_size' in q else 1,
+								storage_dtype=val_storage_dtype,
+								port=val_sample,
+								seed=p['seed'] if 'seed' in p else None)
 
 			# Set data augmentation
-			data[c].augment_data(max_stride=3)
+			data[c].augment_data(max_stride=3,
+								virtual=virtual_augment)
 
 		for c in data:
 			evaluator.clear()
@@ -595,15 +710,16 @@ for p in params:
 									p['port_val'] if 'port_val' in p else 0.1,
 									p['seed'] if 'seed' in p else None)
 
-			if len(val_data[c]) > 1:
-				val_data[c] = np.array([val_data[c][i][0] for i in range(len(val_data[c]))])
-			else:
-				val_data[c] = val_data[c][0]
-
-			val_data[c] = (val_data[c],)*2
+			# Validation cuboids are loaded once and stored compactly
+			val_data[c] = istl.generators.ValidationCache(val_data[c],
+								batch_size=q['batch_size'] if 'batch_size' in q else 1,
+								storage_dtype=val_storage_dtype,
+								port=val_sample,
+								seed=p['seed'] if 'seed' in p else None)
 
 			# Set data augmentation
-			data[c].augment_data(max_stride=3)
+			data[c].augment_data(max_stride=3,
+								virtual=virtual_augment)
 
 		# Evaluate performance and retrieve false positive cuboids
 		# to train with them
@@ -29,7 +29,8 @@
 	  		Directory path containing the test set
 
 	  "test_label": (str)
-	  		Filepath locating the test cuboids labels (as txt format).
+	  		Filepath locating the test cuboids labels (as txt format) or
+			the frame labels of each test video on a line.
 
 	  "batch_size": (int)|(list of int)
 	  		Values to be used as batch size for each experiment.
@@ -51,6 +52,90 @@
 	  "seed": (int)
 	  		Value used as seed for the generator.
 
+	  "cache_dir": (str)
+	  		Directory in which the preprocessed video frames are stored the
+			first time they are loaded, so that later runs don't need to decode
+			the frames again.
+
+	  "loading_workers": (int)
+	  		Number of threads used for decoding the video frames concurrently
+			(1 by default).
+
+	  "manifest": (bool)
+	  		Store the frames list of each video folder on a manifest file on
+			the dataset directories so that only the changed folders are
+			scanned again (false by default).
+
+	  "storage_dtype": (str)
+	  		Store the video frames on memory as "uint8" or "float16" instead
+			of float64 (by default) to reduce the memory usage.
+
+	  "max_window_mb": (int)
+	  		Max memory in MB taken by the cuboids loaded at once from each
+			dataset, which bounds the number of cuboids loaded at once
+			(unbounded by default).
+
+	  "label_rule": (str)
+	  		Rule labelling the test cuboids as anomalous when the test labels
+			file notes the label of each frame: "any", "majority" or "all"
+			of its frames are anomalous ("any" by default).
+
+	  "frame_cache_mb": (int)
+	  		Max memory in MB taken by the preprocessed frames kept on memory
+			and shared by all the datasets, so that the frames shared by
+			several cuboids are only decoded once (disabled by default).
+
+	  "score_batch_size": (int)
+	  		Number of cuboids scored at once when evaluating the model,
+			regardless of the batches in which the cuboids are loaded
+			(by default, the cuboids are scored on the loaded batches).
+
+	  "batch_prep": (bool)
+	  		Decode the video frames directly as grayscale and resize the
+			frames of the cuboids loaded together at once instead of frame
+			by frame (false by default).
+
+	  "virtual_augment": (bool)
+	  		Assemble the augmented cuboids from the decoded frames of the
+			videos held on memory instead of loading each augmented cuboid
+			from disk (false by default).
+
+	  "tf_data": (bool)
+	  		Feed the training and validation cuboids to the model through a
+			tf.data pipeline loading the cuboids concurrently (false by
+			default).
+
+	  "loader_processes": (int)
+	  		Number of processes loading the training and validation cuboids
+			on shared memory out of the training process (0 by default,
+			the cuboids are loaded by the training process).
+
+	  "loader_held_batches": (int)
+	  		Number of the last batches fed to the model which are not
+			overwritten by the loading processes. It must be greater than the
+			batches buffered while training (8 by default).
+
+	  "prefetch": (bool)
+	  		Load the next cuboids of the training set on background while
+			the current ones are used for training (false by default).
+
+	  "client_partitioning": (dict)
+	  		Partition the training set among "n_clients" clients by "camera",
+			"dirichlet" or "time" ("strategy") instead of splitting it into
+			two halves, with the optional "alpha" concentration of the
+			Dirichlet distribution and "seed" (see
+			models.istl.partitioning.ClientPartitioner). The clients holding
+			less than "min_cuboids" cuboids, by default the cuboids required
+			for taking a validation cuboid, are left out of the training. The
+			assignment of the cuboids to the clients is saved as a JSON
+			manifest along with the results.
+
+	  "shared_client_model": (bool)
+	  		Train the clients in turn on a single working model instead of
+			holding a model for each client, which is suitable for many
+			clients (false by default). The clients share then a single set
+			of callbacks which does not restore the best weights.
+
 	  "lr": (float), default: 1e-4
 	  		Initial learning rate used for training
 
@@ -86,7 +171,7 @@ from tensorflow.keras.models import clone_model
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.losses import MeanSquaredError
 from tensorflow import config, random
-from cv2 import resize, cvtColor, COLOR_BGR2GRAY
+from cv2 import resize, cvtColor, COLOR_BGR2GRAY, IMREAD_GRAYSCALE
 from utils import extract_experiments_parameters, plot_results
 from fedLearn import SynFedAvgLearnModel
 from models import istl
@@ -102,6 +187,9 @@ CUBOIDS_HEIGHT = 224
 resize_fn = lambda img: np.expand_dims(resize(cvtColor(img, COLOR_BGR2GRAY),
 						(CUBOIDS_WIDTH, CUBOIDS_HEIGHT))/255, axis=2)
 
+# Batch resize function applied at once to the grayscale decoded frames
+batch_resize_fn = istl.preprocessing.BatchResize(CUBOIDS_WIDTH, CUBOIDS_HEIGHT)
+
 
 ### Input Arguments
 parser = argparse.ArgumentParser(description='Trains an Incremental Spatio'\
@@ -143,17 +231,65 @@ else:
 train_video_dir = exp_data['train_video_dir']
 test_video_dir = exp_data['test_video_dir']
 test_label = exp_data['test_label']
+cache_dir = exp_data['cache_dir'] if 'cache_dir' in exp_data else None
+loading_workers = (exp_data['loading_workers'] if 'loading_workers' in exp_data
+															else 1)
+prefetch = exp_data['prefetch'] if 'prefetch' in exp_data else False
+manifest = exp_data['manifest'] if 'manifest' in exp_data else False
+storage_dtype = (exp_data['storage_dtype'] if 'storage_dtype' in exp_data
+															else None)
+batch_prep = exp_data['batch_prep'] if 'batch_prep' in exp_data else False
+virtual_augment = (exp_data['virtual_augment'] if 'virtual_augment' in exp_data
+															else False)
+label_rule = exp_data['label_rule'] if 'label_rule' in exp_data else 'any'
+max_window_bytes = (int(exp_data['max_window_mb']*2**20)
+					if 'max_window_mb' in exp_data else None)
+
+# Frames shared by all the datasets
+if 'frame_cache_mb' in exp_data:
+	istl.cache.shared_frames_cache().max_bytes = int(
+										exp_data['frame_cache_mb']*2**20)
+
+score_batch_size = (exp_data['score_batch_size'] if 'score_batch_size' in
+															exp_data else None)
+
+# Preprocess the frames one by one or the grayscale decoded frames at once
+prep_kwargs = ({'batch_prep_fn': batch_resize_fn,
+				'imread_flags': IMREAD_GRAYSCALE} if batch_prep else
+				{'prep_fn': resize_fn})
+tf_data = exp_data['tf_data'] if 'tf_data' in exp_data else False
+loader_processes = (exp_data['loader_processes'] if 'loader_processes' in
+															exp_data else 0)
+loader_held_batches = (exp_data['loader_held_batches'] if 'loader_held_batches'
+													in exp_data else 8)
+client_partitioning = (exp_data['client_partitioning'] if 'client_partitioning'
+													in exp_data else None)
+shared_client_model = (exp_data['shared_client_model'] if 'shared_client_model'
+													in exp_data else False)
 
 data_train = istl.generators.CuboidsGeneratorFromImgs(
 		source=train_video_dir,
 		cub_frames=CUBOIDS_LENGTH,
-		prep_fn=resize_fn)
+		**prep_kwargs,
+		cache_dir=cache_dir,
+		workers=loading_workers,
+		manifest=manifest,
+		storage_dtype=storage_dtype,
+		max_bytes=max_window_bytes,
+		prefetch=prefetch)
 
 data_test = istl.generators.CuboidsGeneratorFromImgs(source=test_video_dir,
 									cub_frames=CUBOIDS_LENGTH,
-									prep_fn=resize_fn)
+									**prep_kwargs,
+									cache_dir=cache_dir,
+									workers=loading_workers,
+									manifest=manifest,
+									storage_dtype=storage_dtype,
+									max_bytes=max_window_bytes)
 data_test = istl.generators.ConsecutiveCuboidsGen(data_test)
-test_labels = np.loadtxt(test_label, dtype='int8')
+test_labels = istl.labels.load_cuboid_labels(test_label, CUBOIDS_LENGTH,
+							data_test.cum_cuboids_per_video,
+							rule=label_rule)
 
 ## Configure GPU usage
 physical_devices = config.experimental.list_physical_devices('GPU')
@@ -179,10 +315,27 @@ for p in params:
 	data_train.batch_size = p['batch_size'] if 'batch_size' in p else 1
 
 	# Split data for each client
-	train_split = data_train.make_partitions((0.5, 0.5))
+	if client_partitioning:
+		# Each client must hold enough cuboids for its validation cuboids
+		min_cuboids = int(np.ceil(1 / (p['port_val'] if 'port_val' in p
+																else 0.1)))
+
+		partitioner = istl.partitioning.ClientPartitioner(
+									**{'min_cuboids': min_cuboids,
+										**client_partitioning})
+		data = partitioner.partition(data_train)
+		partitioner.save_manifest(model_base_filename +
+						'_partitions_exp={}.json'.format(len(results)+1))
+
+		# The clients left out by the partitioner are not trained
+		n_clients = partitioner.n_clients
+	else:
+		train_split = data_train.make_partitions((0.5, 0.5))
+
+		data = {0: train_split[0],
+				1: train_split[1]}
+		n_clients = len(data)
 
-	data = {0: train_split[0],
-			1: train_split[1]}
 	val_data = {}
 
 	# Augment the cuboids corresponding to the first partition
@@ -190,7 +343,8 @@ for p in params:
 		val_data[c], data[c] = data[c].take_subpartition(
 									p['port_val'] if 'port_val' in p else 0.1,
 									p['seed'] if 'seed' in p else None)
-		data[c].augment_data(max_stride=p['max_stride'] if 'max_stride' in p else 1)
+		data[c].augment_data(max_stride=p['max_stride'] if 'max_stride' in p else 1,
+							virtual=virtual_augment)
 		data[c].shuffle(shuf=bool(p['shuffle']) if 'shuffle' in p else False,
 								seed=p['seed'] if 'seed' in p else time.time())
 
@@ -205,7 +359,9 @@ for p in params:
 				epsilon=1e-6)
 
 
-	istl_fed_model = SynFedAvgLearnModel(build_fn=istl.build_ISTL, n_clients=2,
+	istl_fed_model = SynFedAvgLearnModel(build_fn=istl.build_ISTL,
+										n_clients=n_clients,
+										shared_client_model=shared_client_model,
 										cub_length=CUBOIDS_LENGTH)
 	istl_fed_model.compile(optimizer=adam, loss=MeanSquaredError(),
 							metrics=[root_sum_squared_error])
@@ -218,22 +374,48 @@ for p in params:
 
 	patience = p['patience'] if 'patience' in p else 0
 	epochs = p['epochs'] if 'epochs' in p else 1
-	callbacks = {c:[LearningRateImprover(
+	lr_improver = lambda: [LearningRateImprover(
 								parameter='val_loss',
 								min_lr=1e-7, factor=0.9,
 								patience=patience,
 								min_delta=1e-6, verbose=1,
-								restore_best_weights=True,
-								acumulate_epochs=True)] for c in range(2)}
-
-	hist = istl_fed_model.fit(x=data,
-						validation_data=val_data,
+								restore_best_weights=not shared_client_model,
+								acumulate_epochs=True)]
+
+	# The clients sharing the working model share its optimizer, so that
+	# a single set of callbacks is used
+	if shared_client_model:
+		callbacks = dict.fromkeys(data, lr_improver())
+	else:
+		callbacks = {c: lr_improver() for c in data}
+
+	loader_fn = None
+
+	if tf_data:
+		data_fit = {c: data[c].to_tf_dataset() for c in data}
+		val_data_fit = {c: val_data[c].to_tf_dataset() for c in val_data}
+	elif loader_processes:
+		# The loaders of each client are created when the client is trained
+		# and closed after its local training
+		loader_fn = lambda gen: istl.generators.SharedMemoryCuboidsGen(gen,
+								processes=loader_processes,
+								slots=loader_held_batches + loader_processes,
+								held_batches=loader_held_batches)
+		data_fit = data
+		val_data_fit = val_data
+	else:
+		data_fit = data
+		val_data_fit = val_data
+
+	hist = istl_fed_model.fit(x=data_fit,
+						validation_data=val_data_fit,
 						epochs=epochs,
 						#early_stop_monitor='val_loss',
 						#early_stop_patience=p['early_stop_patience'] if 'early_stop_patience' in p else 5,
 						#early_stop_delta=p['early_stop_delta'] if 'early_stop_delta' in p else 1e-6,
 						#early_stop_rest_best_weights = True,
 						callbacks=callbacks,
+						loader_fn=loader_fn,
 						backup_filename='backup.h5',
 						backup_epochs=10,
 						backup_save_only_weights=False,
@@ -246,7 +428,7 @@ for p in params:
 															['Training']))
 
 	# Plot MSE
-	for c in range(2):
+	for c in hist:
 		# Plot MSE
 		plot_results({'MSE - training': hist[c]['loss'],
 						'MSE - validation': hist[c]['val_loss']},
@@ -298,7 +480,9 @@ for p in params:
 										cub_frames=CUBOIDS_LENGTH,
 										# It's required to put any value
 										anom_thresh=0.1,
-										temp_thresh=1)
+										temp_thresh=1,
+										fp_dtype=storage_dtype)
+	evaluator.score_batch_size = score_batch_size
 
 	data_train.return_cub_as_label = False
 	data_train.batch_size = 1
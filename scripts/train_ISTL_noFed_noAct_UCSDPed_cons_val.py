@@ -24,7 +24,8 @@
 	  		Directory path containing the test set
 
 	  "test_label": (str)
-	  		Filepath locating the test cuboids labels (as txt format).
+	  		Filepath locating the test cuboids labels (as txt format) or
+			the frame labels of each test video on a line.
 
 	  "batch_size": (int)|(list of int)
 	  		Values to be used as batch size for each experiment.
@@ -46,6 +47,58 @@
 	  "seed": (int)
 	  		Value used as seed for the generator.
 
+	  "cache_dir": (str)
+	  		Directory in which the preprocessed video frames are stored the
+			first time they are loaded, so that later runs don't need to decode
+			the frames again.
+
+	  "loading_workers": (int)
+	  		Number of threads used for decoding the video frames concurrently
+			(1 by default).
+
+	  "manifest": (bool)
+	  		Store the frames list of each video folder on a manifest file on
+			the dataset directories so that only the changed folders are
+			scanned again (false by default).
+
+	  "storage_dtype": (str)
+	  		Store the video frames on memory as "uint8" or "float16" instead
+			of float64 (by default) to reduce the memory usage.
+
+	  "max_window_mb": (int)
+	  		Max memory in MB taken by the cuboids loaded at once from each
+			dataset, which bounds the number of cuboids loaded at once
+			(unbounded by default).
+
+	  "label_rule": (str)
+	  		Rule labelling the test cuboids as anomalous when the test labels
+			file notes the label of each frame: "any", "majority" or "all"
+			of its frames are anomalous ("any" by default).
+
+	  "frame_cache_mb": (int)
+	  		Max memory in MB taken by the preprocessed frames kept on memory
+			and shared by all the datasets, so that the frames shared by
+			several cuboids are only decoded once (disabled by default).
+
+	  "score_batch_size": (int)
+	  		Number of cuboids scored at once when evaluating the model,
+			regardless of the batches in which the cuboids are loaded
+			(by default, the cuboids are scored on the loaded batches).
+
+	  "batch_prep": (bool)
+	  		Decode the video frames directly as grayscale and resize the
+			frames of the cuboids loaded together at once instead of frame
+			by frame (false by default).
+
+	  "virtual_augment": (bool)
+	  		Assemble the augmented cuboids from the decoded frames of the
+			videos held on memory instead of loading each augmented cuboid
+			from disk (false by default).
+
+	  "prefetch": (bool)
+	  		Load the next cuboids of the training set on background while
+			the current ones are used for training (false by default).
+
 	  "lr": (float), default: 1e-4
 	  		Initial learning rate used for training
 
@@ -84,7 +137,7 @@ from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.losses import MeanSquaredError
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
 from tensorflow import config, random
-from cv2 import resize, cvtColor, COLOR_BGR2GRAY
+from cv2 import resize, cvtColor, COLOR_BGR2GRAY, IMREAD_GRAYSCALE
 from utils import extract_experiments_parameters, plot_results, root_sum_squared_error
 from fedLearn import SynFedAvgLearnModel
 from models import istl
@@ -99,6 +152,9 @@ CUBOIDS_HEIGHT = 224
 resize_fn = lambda img: np.expand_dims(resize(cvtColor(img, COLOR_BGR2GRAY),
 						(CUBOIDS_WIDTH, CUBOIDS_HEIGHT))/255, axis=2)
 
+# Batch resize function applied at once to the grayscale decoded frames
+batch_resize_fn = istl.preprocessing.BatchResize(CUBOIDS_WIDTH, CUBOIDS_HEIGHT)
+
 ### Input Arguments
 parser = argparse.ArgumentParser(description='Trains an Incremental Spatio'\
 							' Temporal Learner model for the UCSD Ped 1 and'\
@@ -138,13 +194,46 @@ else:
 train_video_dir = exp_data['train_video_dir']
 test_video_dir = exp_data['test_video_dir']
 test_label = exp_data['test_label']
+cache_dir = exp_data['cache_dir'] if 'cache_dir' in exp_data else None
+loading_workers = (exp_data['loading_workers'] if 'loading_workers' in exp_data
+															else 1)
+prefetch = exp_data['prefetch'] if 'prefetch' in exp_data else False
+manifest = exp_data['manifest'] if 'manifest' in exp_data else False
+storage_dtype = (exp_data['storage_dtype'] if 'storage_dtype' in exp_data
+															else None)
+batch_prep = exp_data['batch_prep'] if 'batch_prep' in exp_data else False
+virtual_augment = (exp_data['virtual_augment'] if 'virtual_augment' in exp_data
+															else False)
+label_rule = exp_data['label_rule'] if 'label_rule' in exp_data else 'any'
+max_window_bytes = (int(exp_data['max_window_mb']*2**20)
+					if 'max_window_mb' in exp_data else None)
+
+# Frames shared by all the datasets
+if 'frame_cache_mb' in exp_data:
+	istl.cache.shared_frames_cache().max_bytes = int(
+										exp_data['frame_cache_mb']*2**20)
+
+score_batch_size = (exp_data['score_batch_size'] if 'score_batch_size' in
+															exp_data else None)
+
+# Preprocess the frames one by one or the grayscale decoded frames at once
+prep_kwargs = ({'batch_prep_fn': batch_resize_fn,
+				'imread_flags': IMREAD_GRAYSCALE} if batch_prep else
+				{'prep_fn': resize_fn})
 
 data_test = istl.generators.CuboidsGeneratorFromImgs(source=test_video_dir,
 									cub_frames=CUBOIDS_LENGTH,
-									prep_fn=resize_fn,
+									**prep_kwargs,
+									cache_dir=cache_dir,
+									workers=loading_workers,
+									manifest=manifest,
+									storage_dtype=storage_dtype,
+									max_bytes=max_window_bytes,
 									max_cuboids=10000)
 data_test = istl.generators.ConsecutiveCuboidsGen(data_test)
-test_labels = np.loadtxt(test_label, dtype='int8')
+test_labels = istl.labels.load_cuboid_labels(test_label, CUBOIDS_LENGTH,
+							data_test.cum_cuboids_per_video,
+							rule=label_rule)
 
 ## Configure GPU usage
 physical_devices = config.experimental.list_physical_devices('GPU')
@@ -170,7 +259,13 @@ for p in params:
 		data_train = istl.generators.CuboidsGeneratorFromImgs(
 													source=train_video_dir,
 													cub_frames=CUBOIDS_LENGTH,
-													prep_fn=resize_fn,
+													**prep_kwargs,
+													cache_dir=cache_dir,
+													workers=loading_workers,
+													manifest=manifest,
+													storage_dtype=storage_dtype,
+													max_bytes=max_window_bytes,
+													prefetch=prefetch,
 													max_cuboids=10000)
 		data_train.return_cub_as_label = True
 		data_train.batch_size = p['batch_size'] if 'batch_size' in p else 1
@@ -178,7 +273,8 @@ for p in params:
 									p['port_val'] if 'port_val' in p else 0.1)
 
 		# Augment the cuboids
-		data_train.augment_data(max_stride=p['max_stride'] if 'max_stride' in p else 3)
+		data_train.augment_data(max_stride=p['max_stride'] if 'max_stride' in p else 3,
+							virtual=virtual_augment)
 
 		amp_data_train = istl.generators.ConsecutiveCuboidsGen(data_train)
 		amp_data_val = istl.generators.ConsecutiveCuboidsGen(data_val)
@@ -275,7 +371,9 @@ for p in params:
 											cub_frames=CUBOIDS_LENGTH,
 											# It's required to put any value
 											anom_thresh=0.1,
-											temp_thresh=1)
+											temp_thresh=1,
+											fp_dtype=storage_dtype)
+		evaluator.score_batch_size = score_batch_size
 
 		data_train.return_cub_as_label = False
 		data_train.batch_size = 1